@@ -1,2 +1,4 @@
 from pydantic_mongo.pm_model import PydanticMongoModel
+from pydantic_mongo.embedded_model import EmbeddedModel
 from pydantic_mongo.extensions import PydanticMongo
+from pydantic_mongo.instrumentation import Instrumentation
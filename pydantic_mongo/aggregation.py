@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Mapping, Optional, Union
+
+from pydantic_mongo.query import FieldPath, QueryExpression
+
+# stages which keep documents of a model, filter dicts of `$match` stages before other stages are normalised
+DOCUMENT_STAGES = ("$match", "$sort", "$limit", "$skip", "$sample")
+
+
+class FieldName(str):
+    """
+    `$` path of a field given by name to `group`, e.g. "$created_at". It is renamed to the stored key
+    of the field by `prepare_pipeline` while the pipeline keeps documents of the model
+    """
+
+
+def match(filter: Union[Mapping[str, Any], QueryExpression]) -> Dict[str, Any]:
+    """
+    Get `$match` stage from filter dict or query expression, e.g. `match(User.q.age > 30)`
+
+    Args:
+        filter: filter dict or query expression
+
+    Returns:
+        stage dict
+    """
+    return {"$match": filter.compile() if isinstance(filter, QueryExpression) else dict(filter)}
+
+
+def group(by: Any, **accumulators: Any) -> Dict[str, Any]:
+    """
+    Get `$group` stage, e.g. `group(Order.q.customer, total={"$sum": Order.q.amount}, count={"$sum": 1})`
+
+    Args:
+        by: group key: field name, field of a query (`User.q.owner`), dict with such keys or None for all documents
+        **accumulators: output fields with accumulator expressions, fields of a query are replaced with their paths
+
+    Returns:
+        stage dict
+    """
+    return {"$group": {"_id": _get_group_key(by), **_get_expression(accumulators)}}
+
+
+def facet(**pipelines: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Get `$facet` stage running several pipelines over the same documents in one query
+
+    Args:
+        **pipelines: output fields with pipelines
+
+    Returns:
+        stage dict
+    """
+    return {"$facet": {name: list(pipeline) for name, pipeline in pipelines.items()}}
+
+
+def _get_group_key(by: Any) -> Any:
+    if isinstance(by, str):
+        return FieldName(by if by.startswith("$") else f"${by}")
+    if isinstance(by, Mapping):
+        return {key: _get_group_key(value) for key, value in by.items()}
+    return _get_expression(by)
+
+
+def _get_expression(value: Any) -> Any:
+    """
+    Replace fields of queries in aggregation expression with `$` paths
+
+    Args:
+        value: aggregation expression
+
+    Returns:
+        expression
+    """
+    if isinstance(value, FieldPath):
+        return f"${value.key}"
+    if isinstance(value, Mapping):
+        return {key: _get_expression(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_get_expression(item) for item in value]
+    return value
+
+
+def keeps_documents(pipeline: List[Mapping[str, Any]]) -> bool:
+    """
+    Check if pipeline returns documents of the model, see `DOCUMENT_STAGES`
+
+    Args:
+        pipeline: list with stages
+
+    Returns:
+        True if all stages keep documents
+    """
+    return all(operator in DOCUMENT_STAGES for stage in pipeline for operator in stage)
+
+
+def prepare_pipeline(pipeline: List[Mapping[str, Any]],
+                     prepare_filter: Optional[Callable[[Any], Dict[str, Any]]] = None,
+                     get_stored_key: Optional[Callable[[str], str]] = None) -> List[Dict[str, Any]]:
+    """
+    Compile query expressions of `$match` stages, also in `$facet` pipelines. Filter dicts are prepared with
+    `prepare_filter`, `$sort` keys and group keys given by field names (see `FieldName`) are renamed
+    with `get_stored_key` only while the pipeline keeps documents of the model, see `DOCUMENT_STAGES`
+
+    Args:
+        pipeline: list with stages
+        prepare_filter: function preparing filter of a model
+        get_stored_key: function getting key a field of a model is stored with
+
+    Returns:
+        list with stages
+    """
+    stages = []
+    for stage in pipeline:
+        stage = dict(stage)
+        if "$match" in stage:
+            filter = stage["$match"]
+            if isinstance(filter, QueryExpression):
+                stage["$match"] = prepare_filter(filter) if prepare_filter is not None else filter.compile()
+            elif prepare_filter is not None:
+                stage["$match"] = prepare_filter(filter)
+        elif "$sort" in stage and get_stored_key is not None:
+            stage["$sort"] = {get_stored_key(key): direction for key, direction in stage["$sort"].items()}
+        elif "$group" in stage and get_stored_key is not None:
+            stage["$group"] = {**stage["$group"], "_id": _rename_fields(stage["$group"].get("_id"), get_stored_key)}
+        elif "$facet" in stage:
+            stage["$facet"] = {
+                name: prepare_pipeline(sub_pipeline, prepare_filter, get_stored_key)
+                for name, sub_pipeline in stage["$facet"].items()
+            }
+        if any(operator not in DOCUMENT_STAGES for operator in stage):
+            prepare_filter = get_stored_key = None
+        stages.append(stage)
+    return stages
+
+
+def _rename_fields(value: Any, get_stored_key: Callable[[str], str]) -> Any:
+    if isinstance(value, FieldName):
+        return f"${get_stored_key(value[1:])}"
+    if isinstance(value, Mapping):
+        return {key: _rename_fields(item, get_stored_key) for key, item in value.items()}
+    return value
@@ -1,6 +1,6 @@
 import logging
 import re
-from typing import Optional, TypeVar, Type, List
+from typing import Optional, TypeVar, Type, List, Any
 
 from pydantic import BaseModel, Field
 from pymongo import IndexModel
@@ -31,19 +31,21 @@ class __Base(BaseModel, metaclass=BaseMeta):
         return f"{name}s" if not name.endswith("s") else name
 
     @classmethod
-    def _init_indexes(cls):
+    def _get_indexes(cls) -> Optional[List[IndexModel]]:
         if cls._MongoConfig is None:
-            return
+            return None
         cls_indexes: Optional[List[IndexModel]] = getattr(cls._MongoConfig, "indexes", None)
 
         if not cls_indexes:
-            return
+            return None
 
         if not isinstance(cls_indexes, list):
             raise TypeError(f"Indexes must be a list of dict, got {type(cls_indexes)}")
 
-        collection = PydanticMongo().db[cls.collection_name]
-        existing_indexes = [index['name'] for index in collection.list_indexes()]
+        return cls_indexes
+
+    @classmethod
+    def _get_indexes_to_create(cls, cls_indexes: List[IndexModel], existing_indexes: List[str]) -> List[IndexModel]:
         indexes_to_create = []
         for index in cls_indexes:
             if not isinstance(index, IndexModel):
@@ -54,10 +56,55 @@ class __Base(BaseModel, metaclass=BaseMeta):
 
             indexes_to_create.append(index)
 
+        return indexes_to_create
+
+    @classmethod
+    def _init_indexes(cls):
+        cls_indexes = cls._get_indexes()
+        if not cls_indexes:
+            return
+
+        collection = PydanticMongo().db[cls.collection_name]
+        existing_indexes = [index['name'] for index in collection.list_indexes()]
+        indexes_to_create = cls._get_indexes_to_create(cls_indexes, existing_indexes)
+
         if indexes_to_create:
             collection.create_indexes(indexes_to_create)
             logger.info(f"Indexes {indexes_to_create} created for {cls.collection_name}")
 
+    @classmethod
+    async def _ainit_indexes(cls):
+        engine = PydanticMongo()
+        if cls.collection_name in engine.async_indexed_collections:
+            return
+        cls_indexes = cls._get_indexes()
+        if cls_indexes:
+            collection = engine.async_db[cls.collection_name]
+            existing_indexes = [index['name'] async for index in collection.list_indexes()]
+            indexes_to_create = cls._get_indexes_to_create(cls_indexes, existing_indexes)
+
+            if indexes_to_create:
+                await collection.create_indexes(indexes_to_create)
+                logger.info(f"Indexes {indexes_to_create} created for {cls.collection_name}")
+
+        engine.async_indexed_collections.add(cls.collection_name)
+
+    @classmethod
+    def _get_mongo_config(cls, name: str, default: Any = None) -> Any:
+        """
+        Get option from `_MongoConfig` of a class
+
+        Args:
+            name: option name
+            default: value returned if option or `_MongoConfig` is not set
+
+        Returns:
+            option value
+        """
+        if cls._MongoConfig is None:
+            return default
+        return getattr(cls._MongoConfig, name, default)
+
     @classmethod
     @property
     def __mongo__(cls) -> PydanticMongo:
@@ -81,3 +128,17 @@ class __Base(BaseModel, metaclass=BaseMeta):
         if cls.__mongo__.db is None:
             raise ValueError("Make sure that PydanticMongo is initialized by calling PydanticMongo.init_app(app) first")
         return cls.__mongo__.db[cls.collection_name]
+
+    @classmethod
+    async def acollection(cls) -> Any:
+        """
+        Get async collection of a class, indexes are created on the first call
+
+        Returns:
+            motor collection or a compatible async collection
+        """
+        engine = PydanticMongo()
+        if engine.async_db is None:
+            raise ValueError("Make sure that PydanticMongo is initialized by calling PydanticMongo.init_async() first")
+        await cls._ainit_indexes()
+        return engine.async_db[cls.collection_name]
@@ -1,21 +1,43 @@
 from __future__ import annotations
 
+import asyncio
+import functools
 import inspect
 import logging
 import typing
+from collections import Counter, defaultdict
 from typing import Optional, Any, Type, Mapping
 
 from bson import DBRef, ObjectId
-from pydantic import ValidationError as PydanticValidationError, create_model
+from pydantic import BaseModel, ValidationError as PydanticValidationError, create_model, model_validator
+from pymongo import IndexModel, ReturnDocument, UpdateMany, UpdateOne
 
+from pydantic_mongo.aggregation import keeps_documents, prepare_pipeline
 from pydantic_mongo.base import __Base as Base
 from pydantic_mongo.db_ref_model import DbRefModel
+from pydantic_mongo.embedded_model import EmbeddedModel
+from pydantic_mongo.extensions import PydanticMongo
 from pydantic_mongo.helpers import get_refs_from_data, find_instance_in_data_and_replace, \
-    find_data_with_fields_in_data_and_replace
+    find_data_with_fields_in_data_and_replace, get_data_digest, get_instances_from_data, get_subtypes, \
+    has_subtypes_in_dict
+from pydantic_mongo.instrumentation import Instrumentation
+from pydantic_mongo.query import QueryExpression, normalize_filter
+from pydantic_mongo.query_cache import QueryCache
+from pydantic_mongo.read_cache import ReadCache
+from pydantic_mongo.replica import CollectionReplica
+from pydantic_mongo.ref_loader import AsyncRefLoader, gather_unloaded
+from pydantic_mongo.session import IdentityMap
+from pydantic_mongo.unit_of_work import UnitOfWork
+from pydantic_mongo.write_behind import WriteBehindBuffer
+from pydantic_mongo.meta import BaseMeta, module_types
 from pydantic_mongo.mongo_model import MongoModel
 
 logger = logging.getLogger(__name__)
 T = typing.TypeVar("T", bound="BasePydanticMongoModel")
+OnDeleteRule = typing.Literal["cascade", "nullify", "pull"]
+Filter = typing.Union[typing.Dict[str, Any], QueryExpression]
+# times a patch is retried when fields read for computed fields or counter caches are changed concurrently
+MAX_PATCH_RETRIES = 10
 
 
 class BasePydanticMongoModel(Base):
@@ -26,6 +48,27 @@ class BasePydanticMongoModel(Base):
         self._MongoModel = MongoModel.from_model(self.__class__)
         self.__is_loaded__ = __is_loaded__
         self.__db_ref__ = None
+        self.__digest__ = None
+        self.__unloaded__: typing.Set[str] = set()
+        # refs of counter cache fields as stored in db, a field is missing if they are unknown
+        self.__counted__: typing.Dict[str, Counter] = {}
+
+    @model_validator(mode="before")
+    @classmethod
+    def _drop_computed_fields(cls, data: Any) -> Any:
+        """
+        Computed fields are stored in db and returned by `model_dump`, but they are not validated as input
+
+        Args:
+            data: input data
+
+        Returns:
+            data without computed fields
+        """
+        computed = cls.__pydantic_decorators__.computed_fields
+        if computed and isinstance(data, dict):
+            return {field: value for field, value in data.items() if field not in computed}
+        return data
 
     def __getattribute__(self, item: str) -> Any:
         """
@@ -54,8 +97,38 @@ class BasePydanticMongoModel(Base):
             return attr
         if not getattr(self, "__is_loaded__", True):
             return self._load_from_db(item)
+        if item in getattr(self, "__unloaded__", ()):
+            self._load_unloaded(item)
+            return getattr(self, item)
         return attr
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        """
+        Set attribute value. An assigned field which was not loaded yet (deferred or out of summary)
+        is loaded from now on, so `save()` writes it
+
+        Args:
+            name: attribute name
+            value: attribute value
+
+        Returns:
+            None
+        """
+        super().__setattr__(name, value)
+        unloaded = self.__dict__.get("__unloaded__")
+        if unloaded and name in unloaded:
+            unloaded.discard(name)
+
+    def __await__(self) -> typing.Generator[Any, None, T]:
+        """
+        Models are awaitable: awaiting an unloaded model loads it with async engine,
+        loads of models awaited during one event loop tick are batched by collection
+
+        Returns:
+            loaded model
+        """
+        return self._aload().__await__()
+
     @classmethod
     def _get_with_parse_db_refs(cls: Type[T], data: dict) -> T:
         """
@@ -117,189 +190,2488 @@ class BasePydanticMongoModel(Base):
         Returns:
             attribute value
         """
+        summary = self._get_summary_fields()
+        if summary and (item == "id" or item in summary) and not self._is_cached():
+            logger.debug(f"Loading summary of {self.__class__.__name__} from db with {item}")
+            mongo_doc = self.__class__.collection().find_one(
+                {"_id": ObjectId(self.db_ref.id)}, {self._get_stored_key(field): True for field in summary}
+            )
+            data = self._process_mongo_doc(mongo_doc, as_dict=True) if mongo_doc else None
+            unloaded = {field for field in self.__class__.model_fields if field not in summary}
+            self._set_loaded_data(data, unloaded=unloaded)
+            return getattr(self, item)
+
         logger.debug(f"Loading {self.__class__.__name__} from db with {item}")
         data: Optional[dict] = self._get_by_filter({"_id": self.db_ref.id}, as_dict=True)
+        self._set_loaded_data(data)
+
+        return getattr(self, item)
+
+    async def _aload_from_db(self) -> T:
+        """
+        Async version of `_load_from_db`, loads the whole model with AsyncRefLoader
+
+        Returns:
+            PydanticMongoModel
+        """
+        logger.debug(f"Loading {self.__class__.__name__} from db")
+        data: Optional[dict] = await AsyncRefLoader.get().load(self.__class__, self.db_ref.id)
+        self._set_loaded_data(data)
+
+        return self
+
+    async def _aload(self) -> T:
+        """
+        Load model with async engine if it is not loaded
+
+        Returns:
+            PydanticMongoModel
+        """
+        if self.__is_loaded__:
+            deferred = self._get_deferred_fields()
+            return await self._aload_fields(*(field for field in self.__unloaded__ if field not in deferred))
+        return await self._aload_from_db()
+
+    @classmethod
+    async def _aget_docs_by_ids(cls, ids: typing.List[typing.Union[str, ObjectId]]) -> typing.Dict[str, dict]:
+        """
+        Get documents by ids with one query with async engine
+
+        Args:
+            ids: list with ids as str or ObjectId
+
+        Returns:
+            dict with str id as key and dict with db refs as models as value
+        """
+        replica = cls._get_replica()
+        if replica is not None and replica.is_fresh:
+            mongo_docs = [replica.find_one({"_id": ObjectId(_id)}) for _id in ids]
+            return {
+                str(mongo_doc["_id"]): cls._process_mongo_doc(mongo_doc, as_dict=True)
+                for mongo_doc in mongo_docs if mongo_doc is not None
+            }
+
+        cursor = (await cls.acollection()).find(
+            {"_id": {"$in": [ObjectId(_id) for _id in ids]}}, **cls._get_find_options()
+        )
+        return {str(mongo_doc["_id"]): cls._process_mongo_doc(mongo_doc, as_dict=True) async for mongo_doc in cursor}
+
+    @classmethod
+    async def _afetch_related(cls, instances: typing.List[T], *fields: str) -> typing.List[T]:
+        """
+        Load models referenced in given fields of instances concurrently, batched by collection
+
+        Args:
+            instances: list with models of the class
+            *fields: field names with refs
+
+        Returns:
+            list with models
+        """
+        wrong_fields = [field for field in fields if field not in cls.model_fields]
+        if wrong_fields:
+            raise ValueError(f"Fields {wrong_fields} are not defined in {cls.__name__}")
+
+        await gather_unloaded(instances)
+        await gather_unloaded(
+            model
+            for instance in instances
+            for field in fields
+            for model in get_instances_from_data(instance.__dict__.get(field), BasePydanticMongoModel)
+        )
+
+        return instances
+
+    def _set_loaded_data(self, data: Optional[dict], unloaded: Optional[typing.Set[str]] = None) -> None:
+        """
+        Fill unloaded model with data loaded from db
+
+        Args:
+            data: dict with db refs as models or None if model is not found
+            unloaded: fields which were not requested from db; deferred fields by default
+
+        Returns:
+            None
+        """
         if data is None:
             logger.warning(f"Can't load {self.__class__.__name__} from db. Check if it is saved")
             self.__dict__ = self.__class__.model_construct().__dict__
             self.__is_loaded__ = True
-            return getattr(self, item)
+            self.__unloaded__ = set()
+            self.__counted__ = {}
+            return
         try:
             self.__dict__ = dict(self.__class__.__dict__)
             self.__init__(**data)
         except PydanticValidationError as e:
-            logger.warning(f"Failed to load {self.__class__.__name__} from db with {item}: {e}")
+            logger.warning(f"Failed to load {self.__class__.__name__} from db: {e}")
             self.__dict__ = self.__class__.model_construct(**data).__dict__
 
         self.__is_loaded__ = True
-        return getattr(self, item)
+        self.__counted__ = self._get_counted_refs(data)
+        if unloaded is None:
+            unloaded = set(self._get_deferred_fields())
+        self.__unloaded__ = {field for field in unloaded if field not in data and field != "id"}
+
+    def _load_unloaded(self, item: str) -> None:
+        """
+        Load a field which is not loaded yet: a deferred field is loaded alone,
+        any other field is loaded with the rest of the document except deferred fields
+
+        Args:
+            item: field name
+
+        Returns:
+            None
+        """
+        deferred = self._get_deferred_fields()
+        if item in deferred:
+            self._load_fields(item)
+        else:
+            self._load_fields(*(field for field in self.__unloaded__ if field not in deferred))
 
-    def _save(self) -> T:
+    def _load_fields(self, *fields: str) -> T:
         """
-        Save model to database
+        Load fields which are not loaded yet with one `find_one` projected to these fields
+
+        Args:
+            *fields: field names
 
         Returns:
             PydanticMongoModel
         """
-        # for loading from db if model is not loaded
-        self.__str__()
+        if not self.__is_loaded__:
+            self._load_from_db("id")
+        fields = tuple(field for field in fields if field in self.__unloaded__)
+        if not fields:
+            return self
 
-        data = self._MongoModel(**self.model_dump()).model_dump_db()
-        collection = self.collection()
-        if self.id is None:
-            result = collection.insert_one(data)
-            self.id = str(result.inserted_id)
-        else:
-            obj_id = ObjectId(self.id)
-            collection.update_one({"_id": obj_id}, {"$set": data})
+        logger.debug(f"Loading fields {fields} of {self.__class__.__name__}")
+        mongo_doc = self.collection().find_one(
+            {"_id": ObjectId(self.db_ref.id)}, {self._get_stored_key(field): True for field in fields}
+        )
+        self._set_fields_data(mongo_doc, fields)
 
         return self
 
-    @classmethod
-    def _from_ref(cls: Type[T], ref: DBRef, unloaded: bool = True) -> T:
+    async def _aload_fields(self, *fields: str) -> T:
         """
-        Get model from DBRef.
-        The Model won't be loaded from db until you try to access its public attribute if unloaded is True.
-        Else model will be loaded from db immediately
+        Async version of `_load_fields`
+        """
+        if not self.__is_loaded__:
+            await self._aload_from_db()
+        fields = tuple(field for field in fields if field in self.__unloaded__)
+        if not fields:
+            return self
+
+        logger.debug(f"Loading fields {fields} of {self.__class__.__name__}")
+        collection = await self.acollection()
+        mongo_doc = await collection.find_one(
+            {"_id": ObjectId(self.db_ref.id)}, {self._get_stored_key(field): True for field in fields}
+        )
+        self._set_fields_data(mongo_doc, fields)
+
+        return self
+
+    def _set_fields_data(self, mongo_doc: Optional[Mapping[str, Any]], fields: typing.Sequence[str]) -> None:
+        """
+        Validate and set values of loaded fields, missing fields keep their defaults
 
         Args:
-            ref: bson.DBRef(collection: str, id: str)
-            unloaded: if True, a model will be unloaded (by default), else it will be loaded from db
+            mongo_doc: document projected to the fields or None if it is not found
+            fields: field names
 
         Returns:
-            Model, created by pydantic `create_model`
+            None
         """
-        if unloaded:
-            model_fields_dict = dict(cls.model_fields.items())
-            model_dict = {field: (value.annotation, value) for field, value in model_fields_dict.items()}
-            for field_value in model_dict.values():
-                field_value[1].default = None
-            Model = create_model(cls.__name__, __base__=cls, **model_dict)
-            instance = Model(False, **{})
-            instance.__db_ref__ = ref
-        else:
-            instance = cls._get_by_filter({"_id": ref.id})
-            if instance is None:
-                raise ValueError(f"Can't get {cls.__name__} with id {ref.id}")
+        if mongo_doc is None:
+            logger.warning(f"Can't load fields of {self.__class__.__name__}. Check if it is saved")
+        mongo_doc = self._from_stored(mongo_doc) if mongo_doc else {}
+        data = self._replace_refs_with_models({field: mongo_doc[field] for field in fields if field in mongo_doc})
+        self.__counted__.update(self._get_counted_refs({field: data.get(field) for field in fields}))
+        for field in fields:
+            if field in data:
+                try:
+                    self.__pydantic_validator__.validate_assignment(self, field, data[field])
+                except PydanticValidationError as e:
+                    logger.warning(f"Failed to load {self.__class__.__name__}.{field} from db: {e}")
+                    self.__dict__[field] = data[field]
+            self.__unloaded__.discard(field)
 
-        return instance
+    @classmethod
+    def _get_deferred_fields(cls) -> typing.Tuple[str, ...]:
+        """
+        Get fields set in `_MongoConfig.deferred`. They are not loaded with the document,
+        but on first access, and aren't written by `save()` until they are loaded or assigned
+
+        Returns:
+            tuple with field names
+        """
+        deferred = tuple(cls._get_mongo_config("deferred", ()))
+        wrong_fields = [
+            field for field in deferred
+            if field not in cls.model_fields or field == "id" or cls.model_fields[field].is_required()
+        ]
+        if wrong_fields:
+            raise ValueError(f"Fields {wrong_fields} of {cls.__name__} can't be deferred, they need a default")
+
+        return deferred
 
     @classmethod
-    def _objects(cls, filter: Optional[typing.Dict[str, Any]] = None) -> typing.Iterator[T]:
+    def _get_summary_fields(cls) -> typing.Tuple[str, ...]:
         """
-        Get all models from database
+        Get fields set in `_MongoConfig.summary_fields`. Accessing one of them on a model created from DBRef
+        loads only these fields, the rest of the document is loaded when any other field is accessed
+
+        Returns:
+            tuple with field names
+        """
+        summary = tuple(cls._get_mongo_config("summary_fields", ()))
+        wrong_fields = [field for field in summary if field not in cls.model_fields]
+        if wrong_fields:
+            raise ValueError(f"Summary fields {wrong_fields} are not defined in {cls.__name__}")
+
+        return summary
+
+    @classmethod
+    def _get_computed_fields(cls) -> typing.Dict[str, Optional[typing.Tuple[str, ...]]]:
+        """
+        Get computed fields (pydantic `computed_field`) which are stored with the document, so that they can be
+        queried and indexed. They are recomputed on every write. Fields they depend on can be set in
+        `_MongoConfig.computed_depends_on`, otherwise a computed field depends on all fields
+
+        Returns:
+            dict with computed field name as key and tuple with fields it depends on (None for all fields) as value
+        """
+        computed = cls.__pydantic_decorators__.computed_fields
+        if not computed:
+            return {}
+        depends_on = cls._get_mongo_config("computed_depends_on") or {}
+        for field, fields in depends_on.items():
+            wrong_fields = [item for item in fields if item not in cls.model_fields]
+            if field not in computed or wrong_fields:
+                raise ValueError(f"Wrong computed field dependencies {field}: {fields} in {cls.__name__}")
+
+        return {field: tuple(depends_on[field]) if field in depends_on else None for field in computed}
+
+    def _get_computed_values(self, fields: typing.Iterable[str]) -> typing.Dict[str, Any]:
+        """
+        Compute values of computed fields, fields they read are loaded if needed
 
         Args:
-            filter: filter dict
+            fields: computed field names
 
         Returns:
-            iterator with models
+            dict with computed field name as key and value as value
         """
-        filter = filter or {}
-        if filter.get("_id"):
-            filter["_id"] = ObjectId(filter["_id"])
+        return {field: getattr(self, field) for field in fields}
 
-        for mongo_doc in cls.collection().find(filter or {}):
-            yield cls._process_mongo_doc(mongo_doc)
+    @classmethod
+    def _get_find_options(cls) -> typing.Dict[str, Any]:
+        """
+        Get options for `find` and `find_one` of the whole documents: projection which excludes deferred fields
+
+        Returns:
+            dict with kwargs, empty if there are no deferred fields
+        """
+        deferred = cls._get_deferred_fields()
+        if not deferred:
+            return {}
+
+        return {"projection": {cls._get_stored_key(field): False for field in deferred}}
 
     @classmethod
-    def _get_by_filter(cls, filter: typing.Dict[str, Any], as_dict: bool = False) -> Optional[typing.Union[T, dict]]:
+    def _get_storage_aliases(cls) -> typing.Dict[str, str]:
         """
-        Get model by filter from database
+        Get fields set in `_MongoConfig.storage_aliases`: dict with field name as key and shorter key
+        the field is stored with as value, e.g. {"created_at": "ca"}. Only top-level fields can be aliased
+
+        Returns:
+            dict with field name as key and stored key as value
+        """
+        aliases: typing.Dict[str, str] = cls._get_mongo_config("storage_aliases") or {}
+        if not aliases:
+            return {}
+        wrong_fields = [field for field in aliases if field not in cls.model_fields or field == "id"]
+        if wrong_fields:
+            raise ValueError(f"Fields {wrong_fields} of storage aliases are not defined in {cls.__name__}")
+        wrong_aliases = [
+            alias for alias in aliases.values()
+            if not alias or alias == "_id" or "." in alias or alias.startswith("$")
+            or (alias in cls.model_fields and aliases.get(alias, alias) == alias)
+            or alias in cls.__pydantic_decorators__.computed_fields
+            or list(aliases.values()).count(alias) > 1
+        ]
+        if wrong_aliases:
+            raise ValueError(f"Storage aliases {wrong_aliases} of {cls.__name__} are not unique keys")
+
+        return dict(aliases)
+
+    @classmethod
+    def _get_stored_key(cls, key: str) -> str:
+        """
+        Get key a field is stored with, see `_get_storage_aliases`
 
         Args:
-            filter: filter dict
-            as_dict: if True, return dict instead of a model
+            key: field name, dotted for sub-fields
 
         Returns:
-            None if not found
-            Model if as_dict is False
-            Dict with db refs as models otherwise
+            key in documents
         """
-        if filter.get("_id"):
-            filter["_id"] = ObjectId(filter["_id"])
+        aliases = cls._get_storage_aliases()
+        if not aliases:
+            return key
+        field, dot, rest = key.partition(".")
+        return f"{aliases.get(field, field)}{dot}{rest}"
 
-        mongo_doc = cls.collection().find_one(filter)
-        if not mongo_doc:
-            return None
+    @classmethod
+    def _get_indexes(cls) -> Optional[typing.List[IndexModel]]:
+        """
+        Get `_MongoConfig.indexes` with fields renamed to their stored keys, also in `partialFilterExpression`.
+        Indexes without explicit names get names generated from stored keys
 
-        return cls._process_mongo_doc(mongo_doc, as_dict=as_dict)
+        Returns:
+            list with IndexModels or None if there are no indexes
+        """
+        indexes = super()._get_indexes()
+        if not indexes or not cls._get_storage_aliases():
+            return indexes
 
-    def _get_ref_objects(self, mongo_doc: dict) -> typing.List[Optional[Base]]:
+        return [cls._get_stored_index(index) if isinstance(index, IndexModel) else index for index in indexes]
+
+    @classmethod
+    def _get_stored_index(cls, index: IndexModel) -> IndexModel:
+        document = dict(index.document)
+        keys = list(document.pop("key").items())
+        stored_keys = [(cls._get_stored_key(key), direction) for key, direction in keys]
+        if document["name"] == "_".join(f"{key}_{direction}" for key, direction in keys):
+            document["name"] = "_".join(f"{key}_{direction}" for key, direction in stored_keys)
+        if "partialFilterExpression" in document:
+            document["partialFilterExpression"] = cls._prepare_filter(document["partialFilterExpression"])
+
+        return IndexModel(stored_keys, **document)
+
+    @classmethod
+    def _to_stored(cls, data: typing.Dict[str, Any]) -> dict:
         """
-        Get all ref objects from a model.
+        Rename fields of encoded model data to their stored keys
 
         Args:
-            mongo_doc: dict with data from mongo
+            data: dict with field names as keys
 
         Returns:
-            list with ref objects
+            dict with stored keys, the same dict if there are no storage aliases
         """
-        return [self._get_type_by_collection(ref.collection)._from_ref(ref) for ref in get_refs_from_data(mongo_doc)]
+        aliases = cls._get_storage_aliases()
+        if not aliases:
+            return data
+        return {aliases.get(key, key): value for key, value in data.items()}
 
     @classmethod
-    def _replace_refs_with_models(cls,
-                                  mongo_doc: dict,
-                                  model: typing.Literal['base', 'dict'] = 'base',
-                                  unloaded: bool = True
-                                  ) -> dict:
+    def _from_stored(cls, mongo_doc: Mapping[str, Any]) -> dict:
         """
-        Replace DBRef with model data or None if not found
+        Rename stored keys of a document to field names
 
         Args:
-            mongo_doc: dict with raw data from mongo db_refs should be bson.DBRef(collection: str, id: str)
-            model: 'base' or 'dict'; if 'dict', return dict with DbRefModel
-            unloaded: if True, models will be unloaded (by default), else they will be loaded from db
+            mongo_doc: document from mongo
 
         Returns:
-            dict with replaced refs
+            new dict with field names as keys
         """
-        def replace(ref):
-            if model == 'base':
-                instance = cls._get_type_by_collection(ref.collection)._from_ref(ref, unloaded)
-                instance.__is_loaded__ = not unloaded
-                return instance
-            else:
-                return DbRefModel(**ref.as_doc()).model_dump()
+        aliases = cls._get_storage_aliases()
+        if not aliases:
+            return dict(mongo_doc)
+        fields = {alias: field for field, alias in aliases.items()}
+        return {fields.get(key, key): value for key, value in mongo_doc.items()}
 
-        result = find_instance_in_data_and_replace(mongo_doc, DBRef, replace)
+    @classmethod
+    def _migrate_storage_aliases(cls, previous: Optional[typing.Dict[str, str]] = None) -> int:
+        """
+        Rename keys of existing documents after `_MongoConfig.storage_aliases` changed, with one `$rename` update.
+        Indexes with aliased fields get new names and are created on first access, old ones should be dropped
 
-        return result
+        Args:
+            previous: storage aliases documents were written with, none by default
 
-    @classmethod
-    def _process_mongo_doc(cls, mongo_doc: Mapping[str, Any], as_dict: bool = False) -> typing.Union[T, dict]:
+        Returns:
+            number of modified documents
         """
-        Process mongo doc and replace refs with models
+        previous = previous or {}
+        renames = {
+            previous.get(field, field): cls._get_stored_key(field)
+            for field in cls.model_fields if field != "id" and previous.get(field, field) != cls._get_stored_key(field)
+        }
+        if not renames:
+            return 0
+        if renames.keys() & set(renames.values()):
+            raise ValueError(f"Keys {renames} of {cls.__name__} can't be renamed with one update, "
+                             f"migrate with an intermediate alias")
+
+        collection = cls.collection()
+        rename_filter = {"$or": [{key: {"$exists": True}} for key in renames]}
+        changed_ids = collection.distinct("_id", rename_filter) if cls._is_cached() else []
+        modified_count = collection.update_many(rename_filter, {"$rename": renames}).modified_count
+        cls._invalidate_cached(changed_ids)
+
+        return modified_count
+
+    def _model_dump_db(self, inserted: bool = False) -> dict:
+        """
+        Encode model with the save-path encoder: refs as DBRefs, dates as strings, without id,
+        fields with storage aliases renamed. Referenced models are not loaded, only their DBRefs are used
+
         Args:
-            mongo_doc: dict with raw data from mongo db_refs should be bson.DBRef(collection: str, id: str)
-            as_dict: if True, return dict instead of a model
+            inserted: True if data is written as a new document, counter cache fields are written only then
 
         Returns:
-            dict or model
+            dict with model data ready for mongo
         """
-        mongo_doc = dict(mongo_doc)
-        data_with_models = cls._replace_refs_with_models(mongo_doc)
-        if data_with_models.get("_id"):
-            data_with_models["_id"] = str(data_with_models["_id"])
-        return data_with_models if as_dict else cls(**data_with_models)
+        if not self.__is_loaded__:
+            self._load_from_db("id")
 
-    def _model_dump(self, as_mongo_model: bool = False, **kwargs) -> dict[str, Any]:
+        counter_fields = frozenset() if inserted else self._get_counter_fields()
+        if self.__unloaded__ or counter_fields:
+            # fields that were not loaded are left as they are in db, as well as computed fields depending on them;
+            # counter cache fields of existing documents are changed only with `$inc`
+            computed = self._get_computed_values(
+                field for field, depends_on in self._get_computed_fields().items()
+                if depends_on is None or any(item not in self.__unloaded__ for item in depends_on)
+            )
+            fields = frozenset(
+                field for field in self.model_fields if field not in self.__unloaded__ and field not in counter_fields
+            )
+            data = {field: self.__dict__.get(field) for field in fields}
+            return self._to_stored(self._get_partial_mongo_model(fields | frozenset(computed))(
+                **self._convert_fields_refs_to_dicts(data), **self._convert_refs_to_dicts(computed)
+            ).model_dump_db())
+
+        data = {field: self.__dict__.get(field) for field in self.model_fields}
+        computed = self._get_computed_values(self._get_computed_fields())
+        return self._to_stored(self._MongoModel(
+            **self._convert_fields_refs_to_dicts(data), **self._convert_refs_to_dicts(computed)
+        ).model_dump_db())
+
+    def _save(self, cascade: bool = False) -> T:
         """
-        Dump model to dict
+        Save model to database, within a unit of work saving is only recorded
 
         Args:
-            as_mongo_model: if True, return dict with MongoModel
-            **kwargs: kwargs for super().model_dump
+            cascade: if True, unsaved referenced models are saved too, see `_get_cascade_unit_of_work`
 
         Returns:
-            dict with model data
+            PydanticMongoModel
         """
-        # for loading from db if model is not loaded
-        self.__str__()
-        self_dict = super().model_dump(**kwargs)
-        if as_mongo_model:
-            return self._MongoModel(**self_dict).model_dump_db(convert_to_db=False)
-        return self_dict
+        unit_of_work = UnitOfWork.current()
+        if unit_of_work is not None:
+            unit_of_work.register_save(self)
+            return self
+
+        unit_of_work = self._get_cascade_unit_of_work() if cascade else None
+        if unit_of_work is not None:
+            try:
+                unit_of_work.flush()
+            except Exception:
+                unit_of_work.rollback()
+                raise
+            return self
+
+        data = self._model_dump_db(inserted=self.id is None)
+        buffer = self._get_write_behind_buffer()
+        if self.id is None and buffer is not None:
+            obj_id = ObjectId()
+            buffer.put({**data, "_id": obj_id})
+            self._apply_counter_changes(self._set_saved(data, obj_id, invalidate=False, inserted=True))
+            return self
+
+        collection = self.collection()
+        if self.id is None:
+            result = collection.insert_one(data)
+            self._apply_counter_changes(self._set_saved(data, result.inserted_id, inserted=True))
+        elif not self._is_unchanged(data):
+            collection.update_one({"_id": ObjectId(self.id)}, {"$set": data})
+            self._apply_counter_changes(self._set_saved(data, ObjectId(self.id)))
+
+        return self
+
+    async def _asave(self, cascade: bool = False) -> T:
+        """
+        Async version of `_save`
+
+        Returns:
+            PydanticMongoModel
+        """
+        if not self.__is_loaded__:
+            await self._aload_from_db()
+
+        unit_of_work = self._get_cascade_unit_of_work() if cascade else None
+        if unit_of_work is not None:
+            try:
+                await unit_of_work.aflush()
+            except Exception:
+                unit_of_work.rollback()
+                raise
+            return self
+
+        data = self._model_dump_db(inserted=self.id is None)
+        buffer = self._get_write_behind_buffer()
+        if self.id is None and buffer is not None:
+            obj_id = ObjectId()
+            if not buffer.try_put({**data, "_id": obj_id}):
+                await asyncio.to_thread(buffer.put, {**data, "_id": obj_id})
+            await self._aapply_counter_changes(self._set_saved(data, obj_id, invalidate=False, inserted=True))
+            return self
+
+        collection = await self.acollection()
+        if self.id is None:
+            result = await collection.insert_one(data)
+            await self._aapply_counter_changes(self._set_saved(data, result.inserted_id, inserted=True))
+        elif not self._is_unchanged(data):
+            await collection.update_one({"_id": ObjectId(self.id)}, {"$set": data})
+            await self._aapply_counter_changes(self._set_saved(data, ObjectId(self.id)))
+
+        return self
+
+    def _get_cascade_unit_of_work(self) -> Optional[UnitOfWork]:
+        """
+        Record saving of the model and of all unsaved models reachable from it through refs in a new unit of work.
+        Unsaved models get client-side ids, so refs between them (cycles included) can be encoded before writing,
+        and the unit of work writes them with one bulk write per collection
+
+        Returns:
+            UnitOfWork or None if there are no unsaved referenced models
+        """
+        if not self._get_unsaved_refs():
+            return None
+
+        unit_of_work = UnitOfWork()
+        unit_of_work.register_save(self)
+        return unit_of_work
+
+    @classmethod
+    def _get_write_behind_buffer(cls) -> Optional[WriteBehindBuffer]:
+        """
+        Get write-behind buffer of a model if `write_behind` is set in `_MongoConfig`.
+        Buffer is configured with `write_behind_max_size`, `write_behind_batch_size`, `write_behind_interval`,
+        `write_behind_put_timeout` and `write_behind_on_error` options
+
+        Returns:
+            WriteBehindBuffer or None
+        """
+        if not cls._get_mongo_config("write_behind"):
+            return None
+
+        return WriteBehindBuffer.for_collection(
+            cls.collection_name,
+            cls.collection,
+            max_size=cls._get_mongo_config("write_behind_max_size", 10000),
+            batch_size=cls._get_mongo_config("write_behind_batch_size", 1000),
+            flush_interval=cls._get_mongo_config("write_behind_interval", 1.0),
+            put_timeout=cls._get_mongo_config("write_behind_put_timeout"),
+            on_error=cls._get_mongo_config("write_behind_on_error"),
+            on_written=lambda ids: cls._invalidate_cached(ids, inserted=True),
+        )
+
+    def _get_unsaved_refs(self) -> typing.List[BasePydanticMongoModel]:
+        """
+        Get referenced models that were never saved (have no id), the model itself is not loaded for that
+
+        Returns:
+            list of PydanticMongoModel
+        """
+        if not self.__is_loaded__:
+            return []
+        data = {field: self.__dict__.get(field) for field in self.model_fields if field != "id"}
+        return [
+            ref for ref in get_instances_from_data(data, BasePydanticMongoModel)
+            if ref.__db_ref__ is None and ref.id is None
+        ]
+
+    def _is_unchanged(self, data: dict) -> bool:
+        """
+        Check if encoded model data is the same as when it was loaded or saved last time
+
+        Args:
+            data: dict with encoded model data
+
+        Returns:
+            True if saving can be skipped
+        """
+        digest = self._get_digest({**data, "_id": ObjectId(self.id)})
+        if digest is None or digest != self.__digest__:
+            return False
+
+        logger.debug(f"Skipping save of unchanged {self.__class__.__name__} with id {self.id}")
+        Instrumentation().increment("writes_skipped", self.collection_name)
+        return True
+
+    def _is_changed(self) -> bool:
+        """
+        Check if loaded model was changed after it was read from db or saved, models without digest are changed
+
+        Returns:
+            True if model has unsaved changes
+        """
+        if self.__digest__ is None or self.id is None:
+            return True
+        data = self._model_dump_db()
+        return self._get_digest({**data, "_id": ObjectId(self.id)}, force=True) != self.__digest__
+
+    def _set_saved(self, data: dict, obj_id: ObjectId, invalidate: bool = True, inserted: bool = False) -> Counter:
+        """
+        Update model state after its data was written to db
+
+        Args:
+            data: dict with encoded model data
+            obj_id: id of the document
+            invalidate: if False, caller invalidates cached document itself, e.g. once for a bulk write
+            inserted: True if the document is new
+
+        Returns:
+            changes of counter caches to apply with `_apply_counter_changes`
+        """
+        counted = self._get_counted_refs(data)
+        if inserted:
+            changes = self._get_counter_changes(counted, {field: Counter() for field in counted})
+        else:
+            changes = self._get_counter_changes(
+                counted, {field: self.__counted__[field] for field in counted if field in self.__counted__}
+            )
+        self.__counted__.update(counted)
+        self.id = str(obj_id)
+        self.__digest__ = self._get_digest({**data, "_id": obj_id}, force=IdentityMap.current() is not None)
+        if invalidate:
+            self._invalidate_cached([obj_id], inserted=inserted)
+
+        identity_map = IdentityMap.current()
+        if identity_map is not None:
+            identity_map.add(self.collection_name, obj_id, self)
+
+        return changes
+
+    def _delete(self, cascade: bool = False) -> None:
+        """
+        Delete model from database, within a unit of work deleting is only recorded
+
+        Args:
+            cascade: if True, apply `on_delete` rules of models referencing the document, see `_apply_delete_rules`
+
+        Returns:
+            None
+        """
+        unit_of_work = UnitOfWork.current()
+        if unit_of_work is not None and (self.__db_ref__ is not None or self.id is not None):
+            unit_of_work.register_delete(self, cascade=cascade)
+        elif self.id is not None:
+            obj_id = ObjectId(self.id)
+            self.collection().delete_one({"_id": obj_id})
+            self._apply_counter_changes(self._set_deleted())
+            if cascade:
+                self._apply_delete_rules([obj_id], {(self.collection_name, str(obj_id))})
+
+    async def _adelete(self) -> None:
+        """
+        Async version of `_delete`
+
+        Returns:
+            None
+        """
+        if self.id is not None:
+            await (await self.acollection()).delete_one({"_id": ObjectId(self.id)})
+            await self._aapply_counter_changes(self._set_deleted())
+
+    def _set_deleted(self, invalidate: bool = True) -> Counter:
+        """
+        Update model state after its document was deleted from db
+
+        Args:
+            invalidate: if False, caller invalidates cached document itself, e.g. once for a bulk write
+
+        Returns:
+            changes of counter caches to apply with `_apply_counter_changes`
+        """
+        changes = self._get_counter_changes({}, self.__counted__)
+        self.__counted__ = {}
+        obj_id = self.db_ref.id
+        if invalidate:
+            self._invalidate_cached([obj_id])
+        identity_map = IdentityMap.current()
+        if identity_map is not None:
+            identity_map.remove(self.collection_name, obj_id)
+
+        return changes
+
+    @classmethod
+    def _delete_many(cls, filter: Optional[Filter] = None, cascade: bool = False) -> int:
+        """
+        Delete documents by filter, without loading them
+
+        Args:
+            filter: filter dict or query expression
+            cascade: if True, apply `on_delete` rules of models referencing deleted documents
+
+        Returns:
+            number of deleted documents of the class
+        """
+        collection = cls.collection()
+        mongo_docs = list(collection.find(cls._prepare_filter(filter), cls._get_delete_projection()))
+        ids = [mongo_doc["_id"] for mongo_doc in mongo_docs]
+        if not ids:
+            return 0
+
+        deleted_count = collection.delete_many({"_id": {"$in": ids}}).deleted_count
+        cls._set_deleted_ids(ids)
+        cls._apply_counter_changes(cls._get_deleted_counter_changes(mongo_docs))
+        if cascade:
+            cls._apply_delete_rules(ids, {(cls.collection_name, str(_id)) for _id in ids})
+
+        return deleted_count
+
+    @classmethod
+    def _apply_delete_rules(cls, ids: typing.List[ObjectId], deleted: typing.Set[typing.Tuple[str, str]]) -> None:
+        """
+        Apply `on_delete` rules of models referencing deleted documents of the class with set-based writes:
+        "cascade" deletes referencing documents (and applies their rules), "nullify" sets refs to None,
+        "pull" removes refs from lists
+
+        Args:
+            ids: ids of deleted documents
+            deleted: (collection, str id) of all documents deleted so far, to stop on cycles
+
+        Returns:
+            None
+        """
+        # refs are matched as whole values, ids may be stored as str or ObjectId, with or without database
+        refs = [
+            DBRef(cls.collection_name, ref_id, database)
+            for _id in ids for ref_id in (str(_id), ObjectId(_id)) for database in ("", None)
+        ]
+        ref_ids = [ref_id for _id in ids for ref_id in (str(_id), ObjectId(_id))]
+        for model, field, rule, in_list in cls._get_delete_rules():
+            # refs with snapshots have extra fields, so they are matched by `$id` only
+            snapshotted = field in model._get_ref_snapshots()
+            field = model._get_stored_key(field)
+            ref_filter = {f"{field}.$id": {"$in": ref_ids}} if snapshotted else {field: {"$in": refs}}
+            element_filter = {"ref.$id": {"$in": ref_ids}} if snapshotted else {"ref": {"$in": refs}}
+            collection = model.collection()
+
+            if rule == "cascade":
+                mongo_docs = [
+                    mongo_doc for mongo_doc in collection.find(ref_filter, model._get_delete_projection())
+                    if (model.collection_name, str(mongo_doc["_id"])) not in deleted
+                ]
+                if not mongo_docs:
+                    continue
+                cascade_ids = [mongo_doc["_id"] for mongo_doc in mongo_docs]
+                collection.delete_many({"_id": {"$in": cascade_ids}})
+                model._set_deleted_ids(cascade_ids)
+                model._apply_counter_changes(model._get_deleted_counter_changes(mongo_docs))
+                deleted.update((model.collection_name, str(_id)) for _id in cascade_ids)
+                model._apply_delete_rules(cascade_ids, deleted)
+                continue
+
+            if rule == "pull" and snapshotted:
+                changed_ids = collection.distinct("_id", ref_filter)
+                collection.update_many(ref_filter, {"$set": {f"{field}.$[ref]": None}}, array_filters=[element_filter])
+                collection.update_many({"_id": {"$in": changed_ids}}, {"$pull": {field: None}})
+                model._invalidate_cached(changed_ids)
+                model._remove_from_identity_map(changed_ids)
+                continue
+
+            track_ids = model._is_cached() or IdentityMap.current() is not None
+            changed_ids = collection.distinct("_id", ref_filter) if track_ids else []
+            if rule == "pull":
+                collection.update_many(ref_filter, {"$pull": ref_filter})
+            elif in_list:
+                collection.update_many(ref_filter, {"$set": {f"{field}.$[ref]": None}}, array_filters=[element_filter])
+            else:
+                collection.update_many(ref_filter, {"$set": {field: None}})
+            model._invalidate_cached(changed_ids)
+            model._remove_from_identity_map(changed_ids)
+
+    @classmethod
+    def _get_delete_rules(cls) -> typing.List[typing.Tuple[Type[BasePydanticMongoModel], str, OnDeleteRule, bool]]:
+        """
+        Get `on_delete` rules of all models with ref fields which can reference the class.
+        Rules are set in `_MongoConfig.on_delete` as dict with field name as key and rule as value
+
+        Returns:
+            list with referencing model, field name, rule and True if field is a list of refs
+        """
+        rules = []
+        for model in list(BaseMeta.collection_type_map.values()):
+            if not issubclass(model, BasePydanticMongoModel):
+                continue
+            on_delete: typing.Dict[str, OnDeleteRule] = model._get_mongo_config("on_delete") or {}
+            for field, rule in on_delete.items():
+                if field not in model.model_fields:
+                    raise ValueError(f"Field {field} of on_delete rule is not defined in {model.__name__}")
+                if rule not in typing.get_args(OnDeleteRule):
+                    raise ValueError(f"Unknown on_delete rule {rule} of {model.__name__}.{field}")
+                ref_types = list(get_subtypes(model.model_fields[field].annotation, Base))
+                if has_subtypes_in_dict(model.model_fields[field].annotation, Base):
+                    raise ValueError(f"on_delete rule of {model.__name__}.{field} can't be applied to a dict of refs")
+                if rule == "pull" and not all(in_list for _, in_list in ref_types):
+                    raise ValueError(f"on_delete rule pull of {model.__name__}.{field} needs a list of refs")
+                for ref_type, in_list in ref_types:
+                    if ref_type.__name__ in module_types or ref_type.collection_name == cls.collection_name:
+                        rules.append((model, field, rule, in_list))
+                        break
+
+        return rules
+
+    @classmethod
+    def _set_deleted_ids(cls, ids: typing.List[ObjectId]) -> None:
+        """
+        Update caches and identity map after documents were deleted from db
+
+        Args:
+            ids: ids of deleted documents
+
+        Returns:
+            None
+        """
+        cls._invalidate_cached(ids)
+        cls._remove_from_identity_map(ids)
+
+    @classmethod
+    def _remove_from_identity_map(cls, ids: typing.List[typing.Union[str, ObjectId]]) -> None:
+        """
+        Remove models of documents written without reading them back from identity map of the current session,
+        so that they are read from db next time
+
+        Args:
+            ids: list with ids as str or ObjectId
+
+        Returns:
+            None
+        """
+        identity_map = IdentityMap.current()
+        if identity_map is not None:
+            for _id in ids:
+                identity_map.remove(cls.collection_name, _id)
+
+    @classmethod
+    def _get_counter_caches(cls) -> typing.Dict[str, str]:
+        """
+        Get fields set in `_MongoConfig.counter_caches`: dict with ref field name as key and name of a counter field
+        of referenced models as value. Counter fields are changed with `$inc` when a document of the class
+        is inserted, deleted or its refs change. Fields are validated once until more models are registered
+
+        Returns:
+            dict with ref field name as key and counter field name as value, it should not be changed
+        """
+        return cls._find_counter_caches(len(BaseMeta.collection_type_map))
+
+    @classmethod
+    @functools.lru_cache(maxsize=1024)
+    def _find_counter_caches(cls, registered: int) -> typing.Dict[str, str]:
+        """
+        Validate fields of `_MongoConfig.counter_caches`, see `_get_counter_caches`
+
+        Args:
+            registered: number of registered models, refs may point to models registered later
+
+        Returns:
+            dict with ref field name as key and counter field name as value
+        """
+        counter_caches: typing.Dict[str, str] = cls._get_mongo_config("counter_caches") or {}
+        for field, counter in counter_caches.items():
+            if field not in cls.model_fields:
+                raise ValueError(f"Field {field} of counter cache is not defined in {cls.__name__}")
+            for ref_type, _ in get_subtypes(cls.model_fields[field].annotation, Base):
+                if ref_type.__name__ not in module_types and counter not in ref_type.model_fields:
+                    raise ValueError(f"Counter field {counter} of {cls.__name__}.{field} is not defined "
+                                     f"in {ref_type.__name__}")
+
+        return dict(counter_caches)
+
+    @classmethod
+    def _get_counter_fields(cls) -> typing.FrozenSet[str]:
+        """
+        Get fields of the class which are counter caches of other models. They are changed only with `$inc`,
+        so `save()` writes them only when a document is inserted.
+        Fields are found once until more models are registered
+
+        Returns:
+            frozenset with field names
+        """
+        return cls._find_counter_fields(len(BaseMeta.collection_type_map))
+
+    @classmethod
+    @functools.lru_cache(maxsize=1024)
+    def _find_counter_fields(cls, registered: int) -> typing.FrozenSet[str]:
+        """
+        Find counter caches of registered models which reference the class, see `_get_counter_fields`
+
+        Args:
+            registered: number of registered models
+
+        Returns:
+            frozenset with field names
+        """
+        counter_fields = set()
+        for model in list(BaseMeta.collection_type_map.values()):
+            if not issubclass(model, BasePydanticMongoModel) or not model._get_mongo_config("counter_caches"):
+                continue
+            for field, counter in model._get_counter_caches().items():
+                for ref_type, _ in get_subtypes(model.model_fields[field].annotation, Base):
+                    if ref_type.__name__ not in module_types and ref_type.collection_name == cls.collection_name:
+                        counter_fields.add(counter)
+
+        return frozenset(counter_fields)
+
+    @classmethod
+    def _get_counted_refs(cls, data: Mapping[str, Any]) -> typing.Dict[str, Counter]:
+        """
+        Get refs of counter cache fields in model data
+
+        Args:
+            data: dict with encoded or decoded data, refs as DBRefs or models, fields can have stored keys
+
+        Returns:
+            dict with field name as key and Counter of (collection, str id) as value, only for fields in data
+        """
+        counted = {}
+        for field in cls._get_counter_caches():
+            key = field if field in data else cls._get_stored_key(field)
+            if key not in data:
+                continue
+            refs = get_instances_from_data(data[key], (DBRef, BasePydanticMongoModel))
+            counted[field] = Counter(
+                (ref.collection, str(ref.id))
+                for ref in (ref.db_ref if isinstance(ref, BasePydanticMongoModel) else ref for ref in refs)
+            )
+
+        return counted
+
+    @classmethod
+    def _get_counter_changes(cls, new: typing.Dict[str, Counter], old: typing.Dict[str, Counter]) -> Counter:
+        """
+        Get increments of counter fields from refs of a document before and after a write.
+        Fields which are not in old are skipped, since their refs in db are unknown
+
+        Args:
+            new: refs after the write, see `_get_counted_refs`
+            old: refs before the write
+
+        Returns:
+            Counter with (collection, str id, counter field) as key and increment as value
+        """
+        counter_caches = cls._get_counter_caches()
+        changes = Counter()
+        for field, old_refs in old.items():
+            new_refs = new.get(field, Counter())
+            for ref in set(old_refs) | set(new_refs):
+                if new_refs[ref] != old_refs[ref]:
+                    changes[(*ref, counter_caches[field])] += new_refs[ref] - old_refs[ref]
+
+        return changes
+
+    def _set_counted_from_doc(self, mongo_doc: Optional[Mapping[str, Any]]) -> None:
+        """
+        Remember refs of counter cache fields which are unknown yet from a document, e.g. before an upsert
+
+        Args:
+            mongo_doc: document with counter cache fields or None if there is no document
+
+        Returns:
+            None
+        """
+        fields = [field for field in self._get_counter_caches() if field not in self.__counted__]
+        mongo_doc = mongo_doc or {}
+        self.__counted__.update(self._get_counted_refs({
+            field: mongo_doc.get(self._get_stored_key(field)) for field in fields
+        }))
+
+    @classmethod
+    def _get_delete_projection(cls) -> typing.Dict[str, bool]:
+        """
+        Get projection to read documents before deleting them by filter: ids and refs of counter cache fields
+
+        Returns:
+            projection dict
+        """
+        return {"_id": True, **{cls._get_stored_key(field): True for field in cls._get_counter_caches()}}
+
+    @classmethod
+    def _get_deleted_counter_changes(cls, mongo_docs: typing.Iterable[Mapping[str, Any]]) -> Counter:
+        """
+        Get decrements of counter fields for deleted documents
+
+        Args:
+            mongo_docs: deleted documents read with `_get_delete_projection`
+
+        Returns:
+            Counter from `_get_counter_changes`
+        """
+        changes = Counter()
+        for mongo_doc in mongo_docs:
+            changes.update(cls._get_counter_changes({}, cls._get_counted_refs(mongo_doc)))
+
+        return changes
+
+    @classmethod
+    def _get_counter_requests(cls, changes: Counter
+                              ) -> typing.Dict[str, typing.Tuple[typing.List[ObjectId], typing.List[UpdateOne]]]:
+        """
+        Get `$inc` updates of counter fields grouped by collection
+
+        Args:
+            changes: Counter from `_get_counter_changes`
+
+        Returns:
+            dict with collection name as key and tuple with ids and requests as value
+        """
+        requests = defaultdict(lambda: ([], []))
+        for (collection, _id, counter), increment in changes.items():
+            if increment:
+                model = cls._get_type_by_collection(collection)
+                if issubclass(model, BasePydanticMongoModel):
+                    counter = model._get_stored_key(counter)
+                ids, updates = requests[collection]
+                ids.append(ObjectId(_id))
+                updates.append(UpdateOne({"_id": ObjectId(_id)}, {"$inc": {counter: increment}}))
+
+        return dict(requests)
+
+    @classmethod
+    def _apply_counter_changes(cls, changes: Counter) -> None:
+        """
+        Change counter fields of referenced documents, with one unordered `bulk_write` per collection
+
+        Args:
+            changes: Counter from `_get_counter_changes`
+
+        Returns:
+            None
+        """
+        for collection, (ids, requests) in cls._get_counter_requests(changes).items():
+            model = cls._get_type_by_collection(collection)
+            model.collection().bulk_write(requests, ordered=False)
+            if issubclass(model, BasePydanticMongoModel):
+                model._invalidate_cached(ids)
+        cls._set_mapped_counters(changes)
+
+    @classmethod
+    async def _aapply_counter_changes(cls, changes: Counter) -> None:
+        """
+        Async version of `_apply_counter_changes`
+        """
+        for collection, (ids, requests) in cls._get_counter_requests(changes).items():
+            model = cls._get_type_by_collection(collection)
+            await (await model.acollection()).bulk_write(requests, ordered=False)
+            if issubclass(model, BasePydanticMongoModel):
+                model._invalidate_cached(ids)
+        cls._set_mapped_counters(changes)
+
+    @staticmethod
+    def _set_mapped_counters(changes: Counter) -> None:
+        """
+        Apply increments of counter fields to loaded models in identity map of the current session,
+        other changes of these models are kept
+
+        Args:
+            changes: Counter from `_get_counter_changes`
+
+        Returns:
+            None
+        """
+        identity_map = IdentityMap.current()
+        if identity_map is None:
+            return
+        for (collection, _id, counter), increment in changes.items():
+            instance = identity_map.get(collection, _id)
+            if isinstance(instance, BasePydanticMongoModel) and instance.__is_loaded__ \
+                    and counter not in instance.__unloaded__ and isinstance(instance.__dict__.get(counter), int):
+                instance.__dict__[counter] += increment
+
+    @classmethod
+    def _recount_counter_caches(cls, batch_size: int = 1000) -> int:
+        """
+        Recount counter caches of the class refs with aggregation and fix counter fields which drifted,
+        e.g. after writes bypassing models
+
+        Args:
+            batch_size: number of counter updates per bulk write
+
+        Returns:
+            number of fixed documents
+        """
+        modified_count = 0
+        for field, counter in cls._get_counter_caches().items():
+            counts: typing.Dict[typing.Tuple[str, str], int] = Counter()
+            key = cls._get_stored_key(field)
+            pipeline = [{"$match": {key: {"$ne": None}}}]
+            if any(in_list for _, in_list in get_subtypes(cls.model_fields[field].annotation, Base)):
+                pipeline.append({"$unwind": f"${key}"})
+            pipeline.append({"$group": {"_id": f"${key}", "count": {"$sum": 1}}})
+            for group in cls.collection().aggregate(pipeline):
+                if isinstance(group["_id"], DBRef):
+                    counts[(group["_id"].collection, str(group["_id"].id))] += group["count"]
+
+            for ref_type, _ in get_subtypes(cls.model_fields[field].annotation, Base):
+                if ref_type.__name__ in module_types:
+                    continue
+                modified_count += cls._write_recounted(ref_type, counter, counts, batch_size)
+
+        return modified_count
+
+    @staticmethod
+    def _write_recounted(model: Type[Base], counter: str, counts: typing.Dict[typing.Tuple[str, str], int],
+                         batch_size: int) -> int:
+        """
+        Set recounted values of a counter field of a model, documents which are not referenced get 0
+
+        Args:
+            model: referenced model
+            counter: counter field name
+            counts: dict with (collection, str id) as key and number of refs as value
+            batch_size: number of updates per bulk write
+
+        Returns:
+            number of fixed documents
+        """
+        collection = model.collection()
+        if issubclass(model, BasePydanticMongoModel):
+            counter = model._get_stored_key(counter)
+        values = {
+            ObjectId(_id): count for (ref_collection, _id), count in counts.items()
+            if ref_collection == model.collection_name
+        }
+        values.update(
+            (mongo_doc["_id"], 0) for mongo_doc in collection.find({counter: {"$nin": [0, None]}}, {"_id": True})
+            if (model.collection_name, str(mongo_doc["_id"])) not in counts
+        )
+        ids = list(values)
+        modified_count = 0
+        for start in range(0, len(ids), batch_size):
+            requests = [
+                UpdateOne({"_id": _id, counter: {"$ne": values[_id]}}, {"$set": {counter: values[_id]}})
+                for _id in ids[start:start + batch_size]
+            ]
+            modified_count += collection.bulk_write(requests, ordered=False).modified_count
+        if modified_count and issubclass(model, BasePydanticMongoModel):
+            model._invalidate_cached(ids)
+
+        return modified_count
+
+    @classmethod
+    def _get_digest(cls, mongo_doc: Mapping[str, Any], force: bool = False) -> Optional[str]:
+        """
+        Get digest of encoded document if `_MongoConfig.skip_unchanged_writes` is set for a class
+
+        Args:
+            mongo_doc: dict with encoded data and `_id`
+            force: if True, digest is returned without the config, e.g. to find changes of identity map models
+
+        Returns:
+            digest or None if unchanged writes are not skipped
+        """
+        if not force and not cls._get_mongo_config("skip_unchanged_writes", False):
+            return None
+        # counter cache fields are not written by updates, so they don't make a document changed
+        counter_keys = {cls._get_stored_key(field) for field in cls._get_counter_fields()}
+        return get_data_digest({key: value for key, value in mongo_doc.items() if key not in counter_keys})
+
+    @classmethod
+    @functools.lru_cache(maxsize=256)
+    def _get_partial_mongo_model(cls, fields: typing.FrozenSet[str]) -> Type[MongoModel]:
+        """
+        Get MongoModel built only from given fields of a class, cached by set of fields
+
+        Args:
+            fields: frozenset with field names
+
+        Returns:
+            MongoModel as a type
+        """
+        return MongoModel.from_model(cls, include=fields)
+
+    @classmethod
+    def _convert_refs_to_dicts(cls, value: Any, snapshot_fields: typing.Sequence[str] = ()) -> Any:
+        """
+        Replace models and DBRefs in value with DbRefModel dicts without changing the value itself
+
+        Args:
+            value: any data
+            snapshot_fields: fields of referenced models to store in refs, see `_get_ref_snapshots`
+
+        Returns:
+            data with refs as dicts with three keys: collection, id, database (and snapshot if there is one)
+        """
+        snapshot = None
+        if isinstance(value, BasePydanticMongoModel):
+            snapshot = value._get_snapshot(snapshot_fields) if snapshot_fields else None
+            value = value.db_ref
+        if isinstance(value, DBRef):
+            return DbRefModel(
+                collection=value.collection, id=value.id, database=value.database or "", snapshot=snapshot
+            ).model_dump()
+        if isinstance(value, EmbeddedModel):
+            return cls._convert_refs_to_dicts(dict(value))
+        if isinstance(value, dict):
+            return {key: cls._convert_refs_to_dicts(item, snapshot_fields) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return type(value)(cls._convert_refs_to_dicts(item, snapshot_fields) for item in value)
+        return value
+
+    @classmethod
+    def _convert_fields_refs_to_dicts(cls, data: typing.Dict[str, Any]) -> dict:
+        """
+        Replace models and DBRefs in model data with DbRefModel dicts, refs of `_MongoConfig.ref_snapshots` fields
+        get snapshots of referenced models
+
+        Args:
+            data: dict with field names as keys
+
+        Returns:
+            dict with refs as dicts
+        """
+        snapshots = cls._get_ref_snapshots()
+        return {field: cls._convert_refs_to_dicts(value, snapshots.get(field, ())) for field, value in data.items()}
+
+    @classmethod
+    def _get_ref_snapshots(cls) -> typing.Dict[str, typing.Tuple[str, ...]]:
+        """
+        Get fields set in `_MongoConfig.ref_snapshots`: dict with ref field name as key
+        and list of fields of referenced model, which are stored next to `$ref` and `$id`, as value
+
+        Returns:
+            dict with ref field name as key and tuple with snapshot fields as value
+        """
+        ref_snapshots = cls._get_mongo_config("ref_snapshots") or {}
+        wrong_fields = [field for field in ref_snapshots if field not in cls.model_fields]
+        if wrong_fields:
+            raise ValueError(f"Fields {wrong_fields} of ref snapshots are not defined in {cls.__name__}")
+
+        return {field: tuple(fields) for field, fields in ref_snapshots.items()}
+
+    def _get_snapshot(self, fields: typing.Sequence[str]) -> Optional[dict]:
+        """
+        Get encoded values of loaded fields to store them in refs to the model, the model is not loaded for that
+
+        Args:
+            fields: snapshot field names
+
+        Returns:
+            dict with encoded values or None if none of the fields is loaded
+        """
+        if not self.__is_loaded__:
+            return None
+        data = {field: self.__dict__.get(field) for field in fields if field not in self.__unloaded__}
+
+        return self._encode_partial(data) if data else None
+
+    def _set_snapshot(self, ref: DBRef, snapshot: Mapping[str, Any]) -> None:
+        """
+        Fill unloaded model with snapshot stored in a ref to it, other fields are loaded on first access
+
+        Args:
+            ref: bson.DBRef with snapshot
+            snapshot: dict with encoded values of snapshot fields
+
+        Returns:
+            None
+        """
+        data = self._replace_refs_with_models({**self._from_stored(snapshot), "_id": str(ref.id)})
+        self._set_loaded_data(data, unloaded={field for field in self.__class__.model_fields if field not in data})
+        self.__db_ref__ = ref
+
+    @classmethod
+    def _refresh_snapshots(cls, ids: Optional[typing.List[typing.Union[str, ObjectId]]] = None,
+                           batch_size: int = 1000) -> int:
+        """
+        Copy current values of snapshot fields from referenced documents into refs stored in documents of the class,
+        with one `bulk_write` of set-based updates per batch of referenced documents
+
+        Args:
+            ids: ids of referenced documents which changed; if None, all referenced documents are read
+            batch_size: number of referenced documents per bulk write
+
+        Returns:
+            number of modified documents
+        """
+        collection = cls.collection()
+        modified_count = 0
+        for field, fields in cls._get_ref_snapshots().items():
+            for ref_type, in_list in get_subtypes(cls.model_fields[field].annotation, Base):
+                if ref_type.__name__ in module_types:
+                    continue
+                ref_filter = {} if ids is None else {"_id": {"$in": [ObjectId(_id) for _id in ids]}}
+                projection = {ref_type._get_stored_key(snapshot_field): True for snapshot_field in fields}
+                cursor = ref_type.collection().find(ref_filter, projection)
+                key = cls._get_stored_key(field)
+                requests, ref_ids = [], []
+                for mongo_doc in cursor.batch_size(batch_size):
+                    requests.append(cls._get_snapshot_update(key, in_list, ref_type.collection_name, mongo_doc))
+                    ref_ids.extend((str(mongo_doc["_id"]), mongo_doc["_id"]))
+                    if len(requests) >= batch_size:
+                        modified_count += cls._write_snapshot_updates(collection, key, requests, ref_ids)
+                        requests, ref_ids = [], []
+                if requests:
+                    modified_count += cls._write_snapshot_updates(collection, key, requests, ref_ids)
+
+        return modified_count
+
+    @staticmethod
+    def _get_snapshot_update(field: str, in_list: bool, ref_collection: str, mongo_doc: dict) -> UpdateMany:
+        """
+        Get update which sets snapshot values next to `$ref` and `$id` of refs to a document
+
+        Args:
+            field: stored key of ref field
+            in_list: True if field is a list of refs
+            ref_collection: collection of referenced document
+            mongo_doc: referenced document with snapshot fields
+
+        Returns:
+            UpdateMany request
+        """
+        ref_ids = [str(mongo_doc["_id"]), mongo_doc["_id"]]
+        snapshot = {key: value for key, value in mongo_doc.items() if key != "_id"}
+        if in_list:
+            return UpdateMany(
+                {f"{field}.$id": {"$in": ref_ids}},
+                {"$set": {f"{field}.$[ref].{key}": value for key, value in snapshot.items()}},
+                array_filters=[{"ref.$ref": ref_collection, "ref.$id": {"$in": ref_ids}}]
+            )
+        return UpdateMany(
+            {f"{field}.$ref": ref_collection, f"{field}.$id": {"$in": ref_ids}},
+            {"$set": {f"{field}.{key}": value for key, value in snapshot.items()}}
+        )
+
+    @classmethod
+    def _write_snapshot_updates(cls, collection: Any, field: str, requests: typing.List[UpdateMany],
+                                ref_ids: typing.List[typing.Union[str, ObjectId]]) -> int:
+        changed_ids = collection.distinct("_id", {f"{field}.$id": {"$in": ref_ids}}) if cls._is_cached() else []
+        modified_count = collection.bulk_write(requests, ordered=False).modified_count
+        cls._invalidate_cached(changed_ids)
+
+        return modified_count
+
+    @classmethod
+    def _encode_partial(cls, data: typing.Dict[str, Any]) -> dict:
+        """
+        Validate only given fields against model annotations and encode them with the save-path encoder
+
+        Args:
+            data: dict with field names as keys
+
+        Returns:
+            dict with model data ready for mongo `$set`
+        """
+        wrong_fields = [field for field in data if field not in cls.model_fields or field == "id"]
+        if wrong_fields:
+            raise ValueError(f"Fields {wrong_fields} can't be patched in {cls.__name__}")
+
+        PartialMongoModel = cls._get_partial_mongo_model(frozenset(data))
+        return cls._to_stored(PartialMongoModel(**cls._convert_fields_refs_to_dicts(data)).model_dump_db())
+
+    @classmethod
+    def _patch(cls: Type[T], _id: typing.Union[str, ObjectId], data: typing.Dict[str, Any],
+               return_model: bool = False) -> typing.Union[Optional[T], bool]:
+        """
+        Update only given fields of a document with one `$set` without loading it first
+
+        Args:
+            _id: id as str or ObjectId
+            data: dict with field names as keys
+            return_model: if True, return updated model instead of a flag
+
+        Returns:
+            updated Model or None if not found if return_model is True
+            True if document was found otherwise
+        """
+        collection = cls.collection()
+        computed, projection = cls._get_patch_dependencies(data)
+        for _ in range(MAX_PATCH_RETRIES):
+            current = collection.find_one({"_id": ObjectId(_id)}, projection) if projection is not None else None
+            obj_filter, update = cls._get_patch_update(_id, data, computed, current, projection)
+            if return_model:
+                result = collection.find_one_and_update(obj_filter, update, return_document=ReturnDocument.AFTER)
+            else:
+                result = collection.update_one(obj_filter, update).matched_count > 0
+            if result or current is None:
+                break
+        else:
+            raise ValueError(f"Can't patch {cls.__name__} with id {_id}, read fields are changed concurrently")
+
+        cls._invalidate_cached([obj_filter["_id"]])
+        cls._apply_counter_changes(cls._get_patch_counter_changes(update, current))
+        if not return_model:
+            cls._remove_from_identity_map([obj_filter["_id"]])
+            return result
+
+        return cls._process_mongo_doc(result) if result else None
+
+    @classmethod
+    async def _apatch(cls: Type[T], _id: typing.Union[str, ObjectId], data: typing.Dict[str, Any],
+                      return_model: bool = False) -> typing.Union[Optional[T], bool]:
+        """
+        Async version of `_patch`
+        """
+        collection = await cls.acollection()
+        computed, projection = cls._get_patch_dependencies(data)
+        for _ in range(MAX_PATCH_RETRIES):
+            current = await collection.find_one({"_id": ObjectId(_id)}, projection) if projection is not None else None
+            obj_filter, update = cls._get_patch_update(_id, data, computed, current, projection)
+            if return_model:
+                result = await collection.find_one_and_update(obj_filter, update, return_document=ReturnDocument.AFTER)
+            else:
+                result = (await collection.update_one(obj_filter, update)).matched_count > 0
+            if result or current is None:
+                break
+        else:
+            raise ValueError(f"Can't patch {cls.__name__} with id {_id}, read fields are changed concurrently")
+
+        cls._invalidate_cached([obj_filter["_id"]])
+        await cls._aapply_counter_changes(cls._get_patch_counter_changes(update, current))
+        if not return_model:
+            cls._remove_from_identity_map([obj_filter["_id"]])
+            return result
+
+        return cls._process_mongo_doc(result) if result else None
+
+    @classmethod
+    def _get_patch_update(cls, _id: typing.Union[str, ObjectId], data: typing.Dict[str, Any],
+                          computed: typing.Sequence[str] = (), mongo_doc: Optional[Mapping[str, Any]] = None,
+                          projection: Optional[Mapping[str, Any]] = None) -> typing.Tuple[dict, dict]:
+        """
+        Get filter and `$set` update for a partial update of a document.
+        Read fields are added to the filter, so the update doesn't match if they were changed after reading
+
+        Args:
+            _id: id as str or ObjectId
+            data: dict with field names as keys
+            computed: computed fields to recompute, see `_get_patch_computed_fields`
+            mongo_doc: document with fields computed fields depend on, if they are not all patched
+            projection: projection the document was read with, see `_get_patch_dependencies`
+
+        Returns:
+            tuple with filter and update dicts
+        """
+        if not data:
+            raise ValueError(f"Nothing to patch in {cls.__name__} with id {_id}")
+
+        update = cls._encode_partial(data)
+        if computed:
+            # model is built from patched and read fields only, to compute values without validating the rest
+            instance = cls.model_construct()
+            instance.__is_loaded__, instance.__unloaded__, instance.__counted__ = True, set(), {}
+            if mongo_doc is not None:
+                fields = [
+                    field for field in cls._from_stored(mongo_doc) if field in cls.model_fields and field not in data
+                ]
+                instance._set_fields_data(mongo_doc, fields)
+            for field, value in data.items():
+                cls.__pydantic_validator__.validate_assignment(instance, field, value)
+            computed_values = cls._convert_refs_to_dicts(instance._get_computed_values(computed))
+            update.update(cls._get_partial_mongo_model(frozenset(computed))(**computed_values).model_dump_db())
+
+        obj_filter = {"_id": ObjectId(_id)}
+        if mongo_doc is not None and projection:
+            # missing fields are matched by None as well
+            obj_filter.update({key: mongo_doc.get(key) for key in projection})
+
+        return obj_filter, {"$set": update}
+
+    @classmethod
+    def _get_patch_dependencies(cls, data: typing.Dict[str, Any]
+                                ) -> typing.Tuple[typing.Tuple[str, ...], Optional[dict]]:
+        """
+        Get computed fields which depend on patched fields and projection to read the document before patching:
+        fields computed fields depend on which are not patched (computed fields without
+        `_MongoConfig.computed_depends_on` need the whole document) and patched counter cache fields
+
+        Args:
+            data: dict with field names as keys
+
+        Returns:
+            tuple with computed field names and projection dict or None if nothing should be read
+        """
+        computed, read_fields = [], set()
+        for field, depends_on in cls._get_computed_fields().items():
+            if depends_on is None:
+                computed.append(field)
+                read_fields.update(cls.model_fields)
+            elif any(item in data for item in depends_on):
+                computed.append(field)
+                read_fields.update(depends_on)
+        read_fields = {field for field in read_fields if field not in data and field != "id"}
+        read_fields.update(field for field in cls._get_counter_caches() if field in data)
+
+        return tuple(computed), {cls._get_stored_key(field): True for field in read_fields} if read_fields else None
+
+    @classmethod
+    def _get_patch_counter_changes(cls, update: dict, current: Optional[Mapping[str, Any]]) -> Counter:
+        """
+        Get increments of counter fields for patched refs
+
+        Args:
+            update: update dict from `_get_patch_update`
+            current: document read before patching or None if it is not found or not read
+
+        Returns:
+            Counter from `_get_counter_changes`
+        """
+        new = cls._get_counted_refs(update["$set"])
+        if not new or current is None:
+            return Counter()
+
+        return cls._get_counter_changes(
+            new, cls._get_counted_refs({field: current.get(cls._get_stored_key(field)) for field in new})
+        )
+
+    @classmethod
+    def _get_natural_key_filter(cls, data: dict, on: typing.Sequence[str]) -> dict:
+        """
+        Get filter by natural key fields from encoded model data
+
+        Args:
+            data: dict with encoded model data
+            on: natural key field names
+
+        Returns:
+            filter dict
+        """
+        if not on:
+            raise ValueError(f"Natural key fields for {cls.__name__} upsert are not set")
+        wrong_fields = [field for field in on if cls._get_stored_key(field) not in data]
+        if wrong_fields:
+            raise ValueError(f"Fields {wrong_fields} can't be used as a natural key of {cls.__name__}")
+
+        return {cls._get_stored_key(field): data[cls._get_stored_key(field)] for field in on}
+
+    def _upsert(self, on: typing.Sequence[str]) -> T:
+        """
+        Insert model or update a document with the same natural key and set model id
+
+        Args:
+            on: natural key field names
+
+        Returns:
+            PydanticMongoModel
+        """
+        data = self._model_dump_db()
+        obj_filter = self._get_natural_key_filter(data, on)
+        projection = self._get_unknown_counted_projection()
+        if projection is not None:
+            self._set_counted_from_doc(self.collection().find_one(obj_filter, projection))
+        mongo_doc = self.collection().find_one_and_update(
+            obj_filter,
+            self._get_upsert_update(data),
+            projection={"_id": True},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self._apply_counter_changes(self._set_saved(data, mongo_doc["_id"]))
+
+        return self
+
+    async def _aupsert(self, on: typing.Sequence[str]) -> T:
+        """
+        Async version of `_upsert`
+        """
+        if not self.__is_loaded__:
+            await self._aload_from_db()
+
+        data = self._model_dump_db()
+        obj_filter = self._get_natural_key_filter(data, on)
+        collection = await self.acollection()
+        projection = self._get_unknown_counted_projection()
+        if projection is not None:
+            self._set_counted_from_doc(await collection.find_one(obj_filter, projection))
+        mongo_doc = await collection.find_one_and_update(
+            obj_filter,
+            self._get_upsert_update(data),
+            projection={"_id": True},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        await self._aapply_counter_changes(self._set_saved(data, mongo_doc["_id"]))
+
+        return self
+
+    def _get_upsert_update(self, data: dict) -> dict:
+        """
+        Get update of an upsert: encoded data is set, counter cache fields are set only if a document is inserted
+
+        Args:
+            data: dict with encoded model data
+
+        Returns:
+            update dict
+        """
+        fields = [field for field in self._get_counter_fields() if field not in self.__unloaded__]
+        if not fields:
+            return {"$set": data}
+
+        defaults = self._encode_partial({field: self.__dict__.get(field) for field in fields})
+        return {"$set": data, "$setOnInsert": defaults}
+
+    @classmethod
+    def _upsert_many(cls, instances: typing.List[T], on: typing.Sequence[str]) -> typing.List[T]:
+        """
+        Upsert models by natural key with one bulk write and set their ids
+
+        Args:
+            instances: list with models of the class
+            on: natural key field names
+
+        Returns:
+            list with models
+        """
+        if not instances:
+            return instances
+
+        datas, filters = cls._get_upsert_many_data(instances, on)
+        collection = cls.collection()
+        unknown = [index for index, instance in enumerate(instances) if instance._get_unknown_counted_projection()]
+        if unknown:
+            current_docs = collection.find(
+                {"$or": [filters[index] for index in unknown]}, cls._get_upsert_counted_projection(on)
+            )
+            cls._set_counted_from_docs(instances, filters, unknown, list(current_docs), on)
+        result = collection.bulk_write(
+            [
+                UpdateOne(obj_filter, instance._get_upsert_update(data), upsert=True)
+                for instance, obj_filter, data in zip(instances, filters, datas)
+            ],
+            ordered=False
+        )
+        changes = Counter()
+        matched = cls._set_upserted_ids(instances, datas, result.upserted_ids, changes)
+        if matched:
+            matched_docs = collection.find(
+                {"$or": [filters[index] for index in matched]},
+                {cls._get_stored_key(field): True for field in ["_id", *on]}
+            )
+            cls._set_matched_ids(instances, datas, filters, matched, list(matched_docs), on, changes)
+        cls._apply_counter_changes(changes)
+
+        return instances
+
+    @classmethod
+    async def _aupsert_many(cls, instances: typing.List[T], on: typing.Sequence[str]) -> typing.List[T]:
+        """
+        Async version of `_upsert_many`
+        """
+        if not instances:
+            return instances
+
+        for instance in instances:
+            if isinstance(instance, cls) and not instance.__is_loaded__:
+                await instance._aload_from_db()
+
+        datas, filters = cls._get_upsert_many_data(instances, on)
+        collection = await cls.acollection()
+        unknown = [index for index, instance in enumerate(instances) if instance._get_unknown_counted_projection()]
+        if unknown:
+            current_docs = collection.find(
+                {"$or": [filters[index] for index in unknown]}, cls._get_upsert_counted_projection(on)
+            )
+            cls._set_counted_from_docs(instances, filters, unknown, [doc async for doc in current_docs], on)
+        result = await collection.bulk_write(
+            [
+                UpdateOne(obj_filter, instance._get_upsert_update(data), upsert=True)
+                for instance, obj_filter, data in zip(instances, filters, datas)
+            ],
+            ordered=False
+        )
+        changes = Counter()
+        matched = cls._set_upserted_ids(instances, datas, result.upserted_ids, changes)
+        if matched:
+            matched_docs = collection.find(
+                {"$or": [filters[index] for index in matched]},
+                {cls._get_stored_key(field): True for field in ["_id", *on]}
+            )
+            cls._set_matched_ids(instances, datas, filters, matched, [doc async for doc in matched_docs], on, changes)
+        await cls._aapply_counter_changes(changes)
+
+        return instances
+
+    @classmethod
+    def _get_upsert_many_data(cls, instances: typing.List[T], on: typing.Sequence[str]
+                              ) -> typing.Tuple[typing.List[dict], typing.List[dict]]:
+        """
+        Encode models for bulk upsert and get their natural key filters
+
+        Args:
+            instances: list with models of the class
+            on: natural key field names
+
+        Returns:
+            tuple with list of encoded data and list of filters
+        """
+        datas, filters = [], []
+        for instance in instances:
+            if not isinstance(instance, cls):
+                raise TypeError(f"Can't upsert {instance.__class__.__name__} as {cls.__name__}")
+            datas.append(instance._model_dump_db())
+            filters.append(cls._get_natural_key_filter(datas[-1], on))
+
+        return datas, filters
+
+    @classmethod
+    def _set_upserted_ids(cls, instances: typing.List[T], datas: typing.List[dict],
+                          upserted_ids: typing.Dict[int, Any], changes: Optional[Counter] = None) -> typing.List[int]:
+        """
+        Set ids of inserted documents to models after bulk upsert
+
+        Args:
+            instances: list with models
+            datas: list with encoded data of models
+            upserted_ids: dict with operation index as key and inserted id as value
+            changes: Counter to collect changes of counter caches
+
+        Returns:
+            list with indexes of models which matched existing documents
+        """
+        changes = Counter() if changes is None else changes
+        for index, obj_id in upserted_ids.items():
+            changes.update(instances[index]._set_saved(datas[index], obj_id, invalidate=False, inserted=True))
+        cls._invalidate_cached(list(upserted_ids.values()), inserted=True)
+
+        return [index for index in range(len(instances)) if index not in upserted_ids]
+
+    @classmethod
+    def _set_matched_ids(cls, instances: typing.List[T], datas: typing.List[dict], filters: typing.List[dict],
+                         matched: typing.List[int], matched_docs: typing.List[dict], on: typing.Sequence[str],
+                         changes: Optional[Counter] = None) -> None:
+        """
+        Set ids of matched documents to models after bulk upsert
+
+        Args:
+            instances: list with models
+            datas: list with encoded data of models
+            filters: list with natural key filters of models
+            matched: list with indexes of models which matched existing documents
+            matched_docs: documents found by natural key filters of matched models
+            on: natural key field names
+            changes: Counter to collect changes of counter caches
+
+        Returns:
+            None
+        """
+        changes = Counter() if changes is None else changes
+        ids = {cls._get_natural_key(doc, on): doc["_id"] for doc in matched_docs}
+        for index in matched:
+            key = cls._get_natural_key(filters[index], on)
+            if key in ids:
+                changes.update(instances[index]._set_saved(datas[index], ids[key], invalidate=False))
+        cls._invalidate_cached(list(ids.values()))
+
+    @classmethod
+    def _get_natural_key(cls, mongo_doc: Mapping[str, Any], on: typing.Sequence[str]) -> typing.Tuple[str, ...]:
+        return tuple(repr(mongo_doc.get(cls._get_stored_key(field))) for field in on)
+
+    def _get_unknown_counted_projection(self) -> Optional[typing.Dict[str, bool]]:
+        """
+        Get projection to read refs of counter cache fields which are not known, e.g. before an upsert
+
+        Returns:
+            projection dict or None if all refs are known
+        """
+        fields = [field for field in self._get_counter_caches() if field not in self.__counted__]
+        return {self._get_stored_key(field): True for field in fields} if fields else None
+
+    @classmethod
+    def _get_upsert_counted_projection(cls, on: typing.Sequence[str]) -> typing.Dict[str, bool]:
+        return {cls._get_stored_key(field): True for field in ["_id", *on, *cls._get_counter_caches()]}
+
+    @classmethod
+    def _set_counted_from_docs(cls, instances: typing.List[T], filters: typing.List[dict], indexes: typing.List[int],
+                               current_docs: typing.List[dict], on: typing.Sequence[str]) -> None:
+        """
+        Remember refs of counter cache fields of models from documents read by natural key before bulk upsert
+
+        Args:
+            instances: list with models
+            filters: list with natural key filters of models
+            indexes: indexes of models with unknown refs
+            current_docs: documents found by natural key filters
+            on: natural key field names
+
+        Returns:
+            None
+        """
+        docs = {cls._get_natural_key(doc, on): doc for doc in current_docs}
+        for index in indexes:
+            instances[index]._set_counted_from_doc(docs.get(cls._get_natural_key(filters[index], on)))
+
+    @classmethod
+    def _from_ref(cls: Type[T], ref: DBRef, unloaded: bool = True) -> T:
+        """
+        Get model from DBRef.
+        The Model won't be loaded from db until you try to access its public attribute if unloaded is True.
+        Else model will be loaded from db immediately
+
+        Args:
+            ref: bson.DBRef(collection: str, id: str)
+            unloaded: if True, a model will be unloaded (by default), else it will be loaded from db
+
+        Returns:
+            Model, created by pydantic `create_model`
+        """
+        if unloaded:
+            identity_map = IdentityMap.current()
+            instance = identity_map.get(ref.collection, ref.id) if identity_map is not None else None
+            if isinstance(instance, cls):
+                return instance
+            model_fields_dict = dict(cls.model_fields.items())
+            model_dict = {field: (value.annotation, value) for field, value in model_fields_dict.items()}
+            for field_value in model_dict.values():
+                field_value[1].default = None
+            Model = create_model(cls.__name__, __base__=cls, **model_dict)
+            instance = Model(False, **{})
+            instance.__db_ref__ = ref
+            snapshot = {key: value for key, value in ref.as_doc().items() if not key.startswith("$")}
+            if snapshot:
+                instance._set_snapshot(ref, snapshot)
+            if identity_map is not None:
+                identity_map.add(ref.collection, ref.id, instance)
+        else:
+            instance = cls._get_by_filter({"_id": ref.id})
+            if instance is None:
+                raise ValueError(f"Can't get {cls.__name__} with id {ref.id}")
+
+        return instance
+
+    @classmethod
+    async def _afrom_ref(cls: Type[T], ref: DBRef, unloaded: bool = True) -> T:
+        """
+        Async version of `_from_ref`
+        """
+        if unloaded:
+            return cls._from_ref(ref)
+
+        instance = await cls._aget_by_filter({"_id": ref.id})
+        if instance is None:
+            raise ValueError(f"Can't get {cls.__name__} with id {ref.id}")
+
+        return instance
+
+    @classmethod
+    def _objects(cls, filter: Optional[Filter] = None) -> typing.Iterator[T]:
+        """
+        Get all models from database
+
+        Args:
+            filter: filter dict or query expression
+
+        Returns:
+            iterator with models
+        """
+        filter = cls._prepare_filter(filter)
+        query_key = cls._get_query_key("find", filter)
+        mongo_docs = QueryCache().get(cls.collection_name, query_key) if query_key is not None else None
+        if mongo_docs is not None:
+            for mongo_doc in mongo_docs:
+                yield cls._process_mongo_doc(mongo_doc)
+            return
+
+        version = QueryCache().version(cls.collection_name)
+        raw_docs = [] if query_key is not None else None
+        for mongo_doc in cls.collection().find(filter, **cls._get_find_options()):
+            raw_docs = cls._collect_raw_doc(raw_docs, mongo_doc)
+            yield cls._process_mongo_doc(mongo_doc)
+        if raw_docs is not None:
+            QueryCache().set(cls.collection_name, query_key, raw_docs, version)
+
+    @classmethod
+    async def _aobjects(cls, filter: Optional[Filter] = None) -> typing.AsyncIterator[T]:
+        """
+        Async version of `_objects`
+        """
+        filter = cls._prepare_filter(filter)
+        query_key = cls._get_query_key("find", filter)
+        mongo_docs = QueryCache().get(cls.collection_name, query_key) if query_key is not None else None
+        if mongo_docs is not None:
+            for mongo_doc in mongo_docs:
+                yield cls._process_mongo_doc(mongo_doc)
+            return
+
+        version = QueryCache().version(cls.collection_name)
+        raw_docs = [] if query_key is not None else None
+        async for mongo_doc in (await cls.acollection()).find(filter, **cls._get_find_options()):
+            raw_docs = cls._collect_raw_doc(raw_docs, mongo_doc)
+            yield cls._process_mongo_doc(mongo_doc)
+        if raw_docs is not None:
+            QueryCache().set(cls.collection_name, query_key, raw_docs, version)
+
+    @classmethod
+    def _aggregate(cls, pipeline: typing.List[Mapping[str, Any]], output_model: Optional[Type[BaseModel]] = None,
+                   batch_size: Optional[int] = None, allow_disk_use: Optional[bool] = None
+                   ) -> typing.Iterator[typing.Union[BaseModel, dict]]:
+        """
+        Run aggregation pipeline on the class collection and stream results
+
+        Args:
+            pipeline: list with stages, `$match` stages can have query expressions, see `prepare_pipeline`
+            output_model: model to validate rows with; PydanticMongoModel classes are built from rows as documents
+            batch_size: number of rows in a cursor batch
+            allow_disk_use: if True, stages can write temporary data to disk on the server
+
+        Returns:
+            iterator with output models or dicts with refs as unloaded models
+        """
+        cursor = cls.collection().aggregate(
+            prepare_pipeline(pipeline, cls._prepare_filter, cls._get_stored_key),
+            **cls._get_aggregate_options(batch_size, allow_disk_use)
+        )
+        documents = keeps_documents(pipeline)
+        for row in cursor:
+            yield cls._process_aggregate_row(row, output_model, documents)
+
+    @classmethod
+    async def _aaggregate(cls, pipeline: typing.List[Mapping[str, Any]], output_model: Optional[Type[BaseModel]] = None,
+                          batch_size: Optional[int] = None, allow_disk_use: Optional[bool] = None
+                          ) -> typing.AsyncIterator[typing.Union[BaseModel, dict]]:
+        """
+        Async version of `_aggregate`
+        """
+        cursor = (await cls.acollection()).aggregate(
+            prepare_pipeline(pipeline, cls._prepare_filter, cls._get_stored_key),
+            **cls._get_aggregate_options(batch_size, allow_disk_use)
+        )
+        documents = keeps_documents(pipeline)
+        async for row in cursor:
+            yield cls._process_aggregate_row(row, output_model, documents)
+
+    @staticmethod
+    def _get_aggregate_options(batch_size: Optional[int], allow_disk_use: Optional[bool]) -> typing.Dict[str, Any]:
+        """
+        Get kwargs of `aggregate` which are set
+
+        Args:
+            batch_size: number of rows in a cursor batch
+            allow_disk_use: if True, stages can write temporary data to disk on the server
+
+        Returns:
+            dict with kwargs
+        """
+        options = {"batchSize": batch_size, "allowDiskUse": allow_disk_use}
+        return {option: value for option, value in options.items() if value is not None}
+
+    @classmethod
+    def _process_aggregate_row(cls, row: Mapping[str, Any], output_model: Optional[Type[BaseModel]] = None,
+                               documents: bool = False) -> typing.Union[BaseModel, dict]:
+        """
+        Replace refs in aggregation row with unloaded models, stored keys of the class with field names
+        if the row is a document of the class, and validate it with output model
+
+        Args:
+            row: row from aggregation cursor
+            output_model: model to validate row with
+            documents: True if the pipeline returns documents of the class, see `keeps_documents`
+
+        Returns:
+            output model or dict if output model is not given
+        """
+        if output_model is not None and issubclass(output_model, BasePydanticMongoModel):
+            return output_model._process_mongo_doc(row)
+
+        data = cls._replace_refs_with_models(cls._from_stored(row) if documents else dict(row))
+        if isinstance(data.get("_id"), ObjectId):
+            data["_id"] = str(data["_id"])
+
+        return data if output_model is None else output_model.model_validate(data)
+
+    @classmethod
+    def _get_by_filter(cls, filter: Filter, as_dict: bool = False) -> Optional[typing.Union[T, dict]]:
+        """
+        Get model by filter from database
+
+        Args:
+            filter: filter dict or query expression
+            as_dict: if True, return dict instead of a model
+
+        Returns:
+            None if not found
+            Model if as_dict is False
+            Dict with db refs as models otherwise
+        """
+        filter = cls._prepare_filter(filter)
+        instance = None if as_dict else cls._get_from_identity_map(filter)
+        if instance is not None:
+            return instance
+
+        replica = cls._get_replica(filter)
+        if replica is not None:
+            mongo_doc = replica.find_one(filter)
+            return cls._process_mongo_doc(mongo_doc, as_dict=as_dict) if mongo_doc else None
+
+        hit, mongo_doc, cache_state = cls._get_cached_doc(filter)
+        if not hit:
+            mongo_doc = cls.collection().find_one(filter, **cls._get_find_options())
+            cls._cache_doc(filter, mongo_doc, cache_state)
+        if not mongo_doc:
+            return None
+
+        return cls._process_mongo_doc(mongo_doc, as_dict=as_dict)
+
+    @classmethod
+    async def _aget_by_filter(cls, filter: Filter, as_dict: bool = False
+                              ) -> Optional[typing.Union[T, dict]]:
+        """
+        Async version of `_get_by_filter`
+        """
+        filter = cls._prepare_filter(filter)
+        instance = None if as_dict else cls._get_from_identity_map(filter)
+        if instance is not None:
+            return instance
+
+        replica = cls._get_replica(filter)
+        if replica is not None and replica.is_fresh:
+            mongo_doc = replica.find_one(filter)
+            return cls._process_mongo_doc(mongo_doc, as_dict=as_dict) if mongo_doc else None
+
+        hit, mongo_doc, cache_state = cls._get_cached_doc(filter)
+        if not hit:
+            mongo_doc = await (await cls.acollection()).find_one(filter, **cls._get_find_options())
+            cls._cache_doc(filter, mongo_doc, cache_state)
+        if not mongo_doc:
+            return None
+
+        return cls._process_mongo_doc(mongo_doc, as_dict=as_dict)
+
+    @classmethod
+    def _get_by_ids(cls: Type[T], ids: typing.Sequence[typing.Union[str, ObjectId]]) -> typing.List[Optional[T]]:
+        """
+        Get models by ids with one query, see `_get_by_ids_from_memory`
+
+        Args:
+            ids: list with ids as str or ObjectId
+
+        Returns:
+            list with models in order of ids, None for ids which are not found
+        """
+        obj_ids = [ObjectId(_id) for _id in ids]
+        found, missing = cls._get_by_ids_from_memory(obj_ids, fresh_replica_only=False)
+        if missing:
+            cursor = cls.collection().find({"_id": {"$in": missing}}, **cls._get_find_options())
+            found.update(cls._process_docs_by_ids(cursor))
+
+        return [found.get(_id) for _id in obj_ids]
+
+    @classmethod
+    async def _aget_by_ids(cls: Type[T], ids: typing.Sequence[typing.Union[str, ObjectId]]
+                           ) -> typing.List[Optional[T]]:
+        """
+        Async version of `_get_by_ids`
+        """
+        obj_ids = [ObjectId(_id) for _id in ids]
+        found, missing = cls._get_by_ids_from_memory(obj_ids, fresh_replica_only=True)
+        if missing:
+            cursor = (await cls.acollection()).find({"_id": {"$in": missing}}, **cls._get_find_options())
+            found.update(cls._process_docs_by_ids([mongo_doc async for mongo_doc in cursor]))
+
+        return [found.get(_id) for _id in obj_ids]
+
+    @classmethod
+    def _get_by_ids_from_memory(cls: Type[T], ids: typing.List[ObjectId], fresh_replica_only: bool
+                                ) -> typing.Tuple[typing.Dict[ObjectId, T], typing.List[ObjectId]]:
+        """
+        Get models loaded in the current session, documents of in-memory replica or of read cache by ids
+
+        Args:
+            ids: list with ObjectIds
+            fresh_replica_only: if True, replica is used only if it is loaded and fresh
+
+        Returns:
+            tuple with dict with found models by ObjectId and list with ids which should be queried
+        """
+        found = {}
+        for _id in ids:
+            instance = cls._get_from_identity_map({"_id": _id})
+            if instance is not None:
+                found[_id] = instance
+        missing = [_id for _id in dict.fromkeys(ids) if _id not in found]
+
+        replica = cls._get_replica()
+        if replica is not None and (replica.is_fresh or not fresh_replica_only):
+            mongo_docs = (replica.find_one({"_id": _id}) for _id in missing)
+            found.update((mongo_doc["_id"], cls._process_mongo_doc(mongo_doc)) for mongo_doc in mongo_docs if mongo_doc)
+            return found, []
+
+        cache = cls._get_read_cache()
+        if cache is not None:
+            mongo_docs = (cache.get(_id) for _id in missing)
+            found.update((mongo_doc["_id"], cls._process_mongo_doc(mongo_doc)) for mongo_doc in mongo_docs if mongo_doc)
+
+        return found, [_id for _id in missing if _id not in found]
+
+    @classmethod
+    def _process_docs_by_ids(cls: Type[T], mongo_docs: typing.Iterable[dict]) -> typing.Dict[ObjectId, T]:
+        """
+        Cache documents queried by ids in read cache and get models from them
+
+        Args:
+            mongo_docs: documents from mongo
+
+        Returns:
+            dict with models by ObjectId
+        """
+        cache = cls._get_read_cache()
+        found = {}
+        for mongo_doc in mongo_docs:
+            if cache is not None:
+                cache.set(mongo_doc["_id"], mongo_doc)
+            found[mongo_doc["_id"]] = cls._process_mongo_doc(mongo_doc)
+
+        return found
+
+    @classmethod
+    def _get_cached_doc(cls, filter: typing.Dict[str, Any]
+                        ) -> typing.Tuple[bool, Optional[dict], Optional[typing.Tuple[str, int]]]:
+        """
+        Get document found by filter from read cache (filter by `_id` only) or from query cache
+
+        Args:
+            filter: prepared filter dict
+
+        Returns:
+            tuple with True if result is cached, document or None if it is not found,
+            and query key with collection write version to cache result with, if query cache is used
+        """
+        cache = cls._get_read_cache(filter)
+        if cache is not None:
+            mongo_doc = cache.get(filter["_id"])
+            return mongo_doc is not None, mongo_doc, None
+
+        query_key = cls._get_query_key("find_one", filter)
+        if query_key is None:
+            return False, None, None
+        mongo_docs = QueryCache().get(cls.collection_name, query_key)
+        if mongo_docs is not None:
+            return True, mongo_docs[0] if mongo_docs else None, None
+
+        return False, None, (query_key, QueryCache().version(cls.collection_name))
+
+    @classmethod
+    def _cache_doc(cls, filter: typing.Dict[str, Any], mongo_doc: Optional[dict],
+                   cache_state: Optional[typing.Tuple[str, int]]) -> None:
+        """
+        Cache document found by filter in read cache or query cache, see `_get_cached_doc`
+
+        Args:
+            filter: prepared filter dict
+            mongo_doc: document or None if it is not found
+            cache_state: query key with collection write version from `_get_cached_doc`
+
+        Returns:
+            None
+        """
+        cache = cls._get_read_cache(filter)
+        if cache is not None and mongo_doc:
+            cache.set(filter["_id"], mongo_doc)
+        elif cache_state is not None:
+            query_key, version = cache_state
+            QueryCache().set(cls.collection_name, query_key, QueryCache.encode([mongo_doc] if mongo_doc else []),
+                             version)
+
+    @classmethod
+    def _get_query_key(cls, kind: str, filter: typing.Dict[str, Any]) -> Optional[str]:
+        """
+        Get query cache key if `cache_queries` is set in `_MongoConfig`
+
+        Args:
+            kind: query kind, "find" or "find_one"
+            filter: prepared filter dict
+
+        Returns:
+            str key or None if query is not cached
+        """
+        if not cls._get_mongo_config("cache_queries"):
+            return None
+        try:
+            return QueryCache.get_key(kind, filter, projection=cls._get_find_options().get("projection"))
+        except TypeError:
+            logger.debug(f"Can't cache query of {cls.__name__} with filter {filter}")
+            return None
+
+    @classmethod
+    def _collect_raw_doc(cls, raw_docs: Optional[typing.List[bytes]], mongo_doc: dict
+                         ) -> Optional[typing.List[bytes]]:
+        """
+        Add encoded document to query result being cached,
+        results longer than `query_cache_max_docs` from `_MongoConfig` (1000 by default) are not cached
+
+        Args:
+            raw_docs: list with encoded documents or None if result is not cached
+            mongo_doc: document from mongo
+
+        Returns:
+            list with encoded documents or None if result is not cached
+        """
+        if raw_docs is None or len(raw_docs) >= cls._get_mongo_config("query_cache_max_docs", 1000):
+            return None
+        raw_docs.extend(QueryCache.encode([mongo_doc]))
+
+        return raw_docs
+
+    @classmethod
+    def _get_from_identity_map(cls: Type[T], filter: typing.Dict[str, Any]) -> Optional[T]:
+        """
+        Get loaded model from identity map of the current session if filter is by `_id` only
+
+        Args:
+            filter: prepared filter dict
+
+        Returns:
+            Model or None if there is no session or model is not in identity map
+        """
+        identity_map = IdentityMap.current()
+        if identity_map is None or not cls._is_id_filter(filter):
+            return None
+
+        instance = identity_map.get(cls.collection_name, filter["_id"])
+        if isinstance(instance, cls) and instance.__is_loaded__:
+            return instance
+
+        return None
+
+    @classmethod
+    def _get_read_cache(cls, filter: Optional[typing.Dict[str, Any]] = None) -> Optional[ReadCache]:
+        """
+        Get read cache of a model if `cache_size` is set in `_MongoConfig`
+
+        Args:
+            filter: prepared filter dict; if given, cache is returned only if filter is by `_id` only
+
+        Returns:
+            ReadCache or None
+        """
+        max_size = cls._get_mongo_config("cache_size")
+        if not max_size or (filter is not None and not cls._is_id_filter(filter)):
+            return None
+
+        return ReadCache.for_collection(cls.collection_name, max_size, cls._get_mongo_config("cache_ttl"))
+
+    @classmethod
+    def _get_replica(cls, filter: Optional[typing.Dict[str, Any]] = None) -> Optional[CollectionReplica]:
+        """
+        Get in-memory replica of a model collection if `replicate_in_memory` is set in `_MongoConfig`.
+        Secondary indexes are built for `replica_indexes` fields,
+        replica is reloaded every `replica_refresh_interval` seconds if it is set
+
+        Args:
+            filter: prepared filter dict; if given, replica is returned only if it supports the filter
+
+        Returns:
+            CollectionReplica or None
+        """
+        if not cls._get_mongo_config("replicate_in_memory"):
+            return None
+
+        replica = CollectionReplica.for_collection(
+            cls.collection_name,
+            lambda: cls.collection().find({}, **cls._get_find_options()),
+            [cls._get_stored_key(field) for field in cls._get_mongo_config("replica_indexes", ())],
+            cls._get_mongo_config("replica_refresh_interval")
+        )
+        if filter is not None and not replica.supports(filter):
+            return None
+
+        return replica
+
+    @classmethod
+    def _invalidate_cached(cls, ids: typing.List[typing.Union[str, ObjectId]], inserted: bool = False) -> None:
+        """
+        Remove written documents from read cache and in-memory replica of a model, bump query cache write version
+        and publish them to invalidation bus, so that other processes remove them too
+
+        Args:
+            ids: list with ids as str or ObjectId
+            inserted: True if documents are new, they can't be in read cache then
+
+        Returns:
+            None
+        """
+        cache = None if inserted else cls._get_read_cache()
+        replica = cls._get_replica()
+        cache_queries = cls._get_mongo_config("cache_queries")
+        if (cache is None and replica is None and not cache_queries) or not ids:
+            return
+        if cache is not None:
+            for _id in ids:
+                cache.invalidate(_id)
+        if replica is not None:
+            replica.invalidate()
+        if cache_queries:
+            QueryCache().bump(cls.collection_name)
+
+        bus = PydanticMongo().invalidation_bus
+        if bus is not None:
+            bus.publish(cls.collection_name, ids)
+
+    @classmethod
+    def _is_cached(cls) -> bool:
+        """
+        Check if documents of a model are kept by read cache, in-memory replica or query cache
+
+        Returns:
+            True if written documents should be invalidated
+        """
+        return bool(
+            cls._get_mongo_config("cache_size")
+            or cls._get_mongo_config("replicate_in_memory")
+            or cls._get_mongo_config("cache_queries")
+        )
+
+    @staticmethod
+    def _is_id_filter(filter: typing.Dict[str, Any]) -> bool:
+        """
+        Check if prepared filter is by `_id` only
+
+        Args:
+            filter: prepared filter dict
+
+        Returns:
+            True if filter is {"_id": ObjectId}
+        """
+        return list(filter) == ["_id"] and isinstance(filter["_id"], ObjectId)
+
+    @classmethod
+    def _prepare_filter(cls, filter: Optional[Filter]) -> typing.Dict[str, Any]:
+        """
+        Prepare filter for mongo: compile query expression or convert ids and refs of filter dict,
+        see `normalize_filter`. Given filter dict is not changed
+
+        Args:
+            filter: filter dict or query expression
+
+        Returns:
+            filter dict
+        """
+        if isinstance(filter, QueryExpression):
+            if not issubclass(cls, filter.model):
+                raise ValueError(f"Query expression of {filter.model.__name__} can't be used with {cls.__name__}")
+            return filter.compile()
+        if not filter:
+            return {}
+
+        return normalize_filter(cls, filter)
+
+    def _get_ref_objects(self, mongo_doc: dict) -> typing.List[Optional[Base]]:
+        """
+        Get all ref objects from a model.
+
+        Args:
+            mongo_doc: dict with data from mongo
+
+        Returns:
+            list with ref objects
+        """
+        return [self._get_type_by_collection(ref.collection)._from_ref(ref) for ref in get_refs_from_data(mongo_doc)]
+
+    @classmethod
+    def _replace_refs_with_models(cls,
+                                  mongo_doc: dict,
+                                  model: typing.Literal['base', 'dict'] = 'base',
+                                  unloaded: bool = True
+                                  ) -> dict:
+        """
+        Replace DBRef with model data or None if not found
+
+        Args:
+            mongo_doc: dict with raw data from mongo db_refs should be bson.DBRef(collection: str, id: str)
+            model: 'base' or 'dict'; if 'dict', return dict with DbRefModel
+            unloaded: if True, models will be unloaded (by default), else they will be loaded from db
+
+        Returns:
+            dict with replaced refs
+        """
+        def replace(ref):
+            if model == 'base':
+                return cls._get_type_by_collection(ref.collection)._from_ref(ref, unloaded)
+            else:
+                return DbRefModel(**ref.as_doc()).model_dump()
+
+        result = find_instance_in_data_and_replace(mongo_doc, DBRef, replace)
+
+        return result
+
+    @classmethod
+    def _process_mongo_doc(cls, mongo_doc: Mapping[str, Any], as_dict: bool = False) -> typing.Union[T, dict]:
+        """
+        Process mongo doc and replace refs with models
+        Args:
+            mongo_doc: dict with raw data from mongo db_refs should be bson.DBRef(collection: str, id: str)
+            as_dict: if True, return dict instead of a model
+
+        Returns:
+            dict or model
+        """
+        identity_map = None if as_dict else IdentityMap.current()
+        digest = None if as_dict else cls._get_digest(mongo_doc, force=identity_map is not None)
+        mongo_doc = cls._from_stored(mongo_doc)
+        data_with_models = cls._replace_refs_with_models(mongo_doc)
+        if data_with_models.get("_id"):
+            data_with_models["_id"] = str(data_with_models["_id"])
+        if as_dict:
+            return data_with_models
+
+        instance = identity_map.get(cls.collection_name, mongo_doc["_id"]) \
+            if identity_map is not None and mongo_doc.get("_id") else None
+        if isinstance(instance, cls):
+            # document read from db may be newer than the mapped instance, e.g. after `patch()`,
+            # but unsaved changes of the instance are kept
+            if not instance.__is_loaded__ or not instance._is_changed():
+                instance._set_loaded_data(data_with_models)
+                instance.__digest__ = digest
+            return instance
+
+        instance = cls(**data_with_models)
+        instance.__digest__ = digest
+        instance.__counted__ = cls._get_counted_refs(mongo_doc)
+        instance.__unloaded__ = {field for field in cls._get_deferred_fields() if field not in mongo_doc}
+        if identity_map is not None and instance.id is not None:
+            identity_map.add(cls.collection_name, instance.id, instance)
+        return instance
+
+    def _model_dump(self, as_mongo_model: bool = False, **kwargs) -> dict[str, Any]:
+        """
+        Dump model to dict
+
+        Args:
+            as_mongo_model: if True, return dict with MongoModel
+            **kwargs: kwargs for super().model_dump
+
+        Returns:
+            dict with model data
+        """
+        # for loading from db if model is not loaded
+        self.__str__()
+        include, exclude = kwargs.get("include"), kwargs.get("exclude") or ()
+        self._load_fields(*(
+            field for field in self.__unloaded__ if field not in exclude and (include is None or field in include)
+        ))
+        self._load_snapshot_refs(set())
+        self_dict = super().model_dump(**kwargs)
+        if as_mongo_model:
+            return self._MongoModel(**self_dict).model_dump_db(convert_to_db=False)
+        return self_dict
+
+    def _load_snapshot_refs(self, seen: typing.Set[int]) -> None:
+        """
+        Load referenced models which are filled only from ref snapshots, so that they are dumped with all fields.
+        Deferred fields are not loaded
+
+        Args:
+            seen: ids of already checked models, to stop on cycles
+
+        Returns:
+            None
+        """
+        seen.add(id(self))
+        refs = get_instances_from_data(list(self.__dict__.values()), BasePydanticMongoModel)
+        for ref in refs:
+            if id(ref) in seen or not ref.__is_loaded__:
+                continue
+            deferred = ref._get_deferred_fields()
+            ref._load_fields(*(field for field in ref.__unloaded__ if field not in deferred))
+            ref._load_snapshot_refs(seen)
 
     @classmethod
     def _init_mongo_model(cls):
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from collections import namedtuple
+from typing import Any, AsyncIterator, Callable, Iterator, List, Mapping, Optional, Sequence, Tuple, Type
+
+from pymongo import IndexModel
+
+from pydantic_mongo.query import LOGICAL_OPERATORS, _resolve, _unwrap
+
+
+class CoveredQuery:
+    """
+    Index-only query of a model: documents are read with a projection of fields of one of `_MongoConfig.indexes`,
+    so that mongo answers it from the index without reading documents. Rows are named tuples with stored values
+    (refs as DBRefs, dates as strings, ids as strings), models are not created.
+    The projection is checked when the query is created, filters are checked on every call
+    """
+    def __init__(self, model: Type[Any], fields: Sequence[str]):
+        if not fields:
+            raise ValueError(f"Covered query of {model.__name__} should have fields")
+        self.model = model
+        self.keys = tuple(self._get_key(field) for field in fields)
+        self.index = self._get_covering_index()
+        self.projection = {key: True for key in self.keys}
+        if "_id" not in self.keys:
+            self.projection["_id"] = False
+        self.row_type = namedtuple(
+            f"{model.__name__}Row",
+            ["id" if key == "_id" else field.replace(".", "_") for field, key in zip(fields, self.keys)]
+        )
+        self._getters = [self._get_getter(key) for key in self.keys]
+
+    def _get_key(self, field: str) -> str:
+        """
+        Get stored key of a field, see `_get_storage_aliases`.
+        Fields of lists can't be covered, because their indexes are multikey
+
+        Args:
+            field: field name, dotted for sub-fields, "id" or "_id" for id
+
+        Returns:
+            key in documents
+        """
+        if field in ("id", "_id"):
+            return "_id"
+        path = tuple(field.split("."))
+        for i in range(1, len(path) + 1):
+            if _unwrap(_resolve(self.model, path[:i])[1])[1]:
+                list_field = ".".join(path[:i])
+                raise ValueError(f"List field {list_field} of {self.model.__name__} can't be covered by an index")
+        return _resolve(self.model, path)[0]
+
+    def _get_covering_index(self) -> IndexModel:
+        """
+        Get the first index of the model which has all fields of the projection.
+        Sparse and partial indexes are skipped, they don't have all documents
+
+        Returns:
+            IndexModel
+        """
+        for index in self.model._get_indexes() or []:
+            if index.document.get("sparse") or "partialFilterExpression" in index.document:
+                continue
+            index_keys = index.document["key"]
+            if all(index_keys.get(key) in (1, -1) for key in self.keys):
+                return index
+        raise ValueError(f"Fields {list(self.keys)} of {self.model.__name__} are not covered by any of its indexes")
+
+    @staticmethod
+    def _get_getter(key: str) -> Callable[[Mapping[str, Any]], Any]:
+        if key == "_id":
+            return lambda mongo_doc: str(mongo_doc["_id"])
+        if "." not in key:
+            return lambda mongo_doc: mongo_doc.get(key)
+        path = key.split(".")
+
+        def get(mongo_doc: Mapping[str, Any]) -> Any:
+            value = mongo_doc
+            for name in path:
+                value = value.get(name) if isinstance(value, Mapping) else None
+            return value
+
+        return get
+
+    def _get_find_args(self, filter: Optional[Any], sort: Optional[List[Tuple[str, int]]], limit: int
+                       ) -> Tuple[Mapping[str, Any], dict]:
+        """
+        Prepare filter and check that it and sort use only fields of the index
+
+        Args:
+            filter: filter dict or query expression
+            sort: list with (field, direction) pairs
+            limit: max number of rows, 0 for no limit
+
+        Returns:
+            tuple with prepared filter and kwargs of `find`
+        """
+        filter = self.model._prepare_filter(filter)
+        index_keys = self.index.document["key"]
+        wrong_keys = [key for key in _get_filter_keys(filter) if key not in index_keys]
+        if wrong_keys:
+            raise ValueError(f"Filter keys {wrong_keys} are not in index {self.index.document['name']}")
+        kwargs = {"projection": self.projection, "hint": self.index.document["name"], "limit": limit}
+        if sort:
+            sort = [(self._get_key(field), direction) for field, direction in sort]
+            wrong_keys = [key for key, _ in sort if key not in index_keys]
+            if wrong_keys:
+                raise ValueError(f"Sort keys {wrong_keys} are not in index {self.index.document['name']}")
+            kwargs["sort"] = sort
+        return filter, kwargs
+
+    def find(self, filter: Optional[Any] = None, sort: Optional[List[Tuple[str, int]]] = None, limit: int = 0
+             ) -> Iterator[tuple]:
+        """
+        Get rows matching filter
+
+        Args:
+            filter: filter dict or query expression with fields of the index only
+            sort: list with (field, direction) pairs
+            limit: max number of rows, 0 for no limit
+
+        Returns:
+            iterator with named tuples
+        """
+        filter, kwargs = self._get_find_args(filter, sort, limit)
+        row_type, getters = self.row_type, self._getters
+        for mongo_doc in self.model.collection().find(filter, **kwargs):
+            yield row_type(*(get(mongo_doc) for get in getters))
+
+    async def afind(self, filter: Optional[Any] = None, sort: Optional[List[Tuple[str, int]]] = None, limit: int = 0
+                    ) -> AsyncIterator[tuple]:
+        """
+        Async version of `find`
+        """
+        filter, kwargs = self._get_find_args(filter, sort, limit)
+        row_type, getters = self.row_type, self._getters
+        async for mongo_doc in (await self.model.acollection()).find(filter, **kwargs):
+            yield row_type(*(get(mongo_doc) for get in getters))
+
+
+def _get_filter_keys(filter: Mapping[str, Any]) -> Iterator[str]:
+    """
+    Get keys of fields used in filter, also in logical operators
+
+    Args:
+        filter: prepared filter dict
+
+    Returns:
+        iterator with keys
+    """
+    for key, value in filter.items():
+        if key in LOGICAL_OPERATORS and isinstance(value, list):
+            for item in value:
+                yield from _get_filter_keys(item)
+        else:
+            yield key
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-from pydantic import BaseModel, create_model, Field
-from typing import Any, Optional, Type
+from pydantic import BaseModel, create_model, Field, model_serializer
+from typing import Any, Dict, Optional, Type
 
 from pydantic_mongo.base import __Base as Base
 
@@ -10,6 +10,15 @@ class DbRefModel(BaseModel):
     collection: str
     id: Any
     database: str = Field(default="")
+    # fields of the referenced document stored next to $ref and $id, see `_MongoConfig.ref_snapshots`
+    snapshot: Optional[Dict[str, Any]] = None
+
+    @model_serializer(mode="wrap")
+    def _serialize(self, handler) -> Dict[str, Any]:
+        data = handler(self)
+        if data.get("snapshot") is None:
+            data.pop("snapshot", None)
+        return data
 
     @classmethod
     def from_model(cls, field_type: Type[Base]) -> Type[DbRefModel]:
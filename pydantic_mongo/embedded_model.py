@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+
+from pydantic_mongo.meta import EmbeddedMeta
+
+
+class EmbeddedModel(BaseModel, metaclass=EmbeddedMeta):
+    """
+    Base class of models stored inline as sub-documents of PydanticMongoModel documents.
+    They have no collection and no id, and are decoded from the parent document without any query.
+    Embedded models can be used in `List[...]` and `Dict[str, ...]` fields and can have refs themselves
+    """
+    class Config:
+        extra = "forbid"
@@ -1,9 +1,15 @@
-from typing import Optional
+from contextlib import AbstractContextManager
+from typing import Optional, Set, Any
 
+from flask import g
 from flask_pymongo import PyMongo
 from pymongo import MongoClient
 from pymongo.database import Database
 
+from pydantic_mongo.invalidation import InvalidationBus
+from pydantic_mongo.session import session, IdentityMap
+from pydantic_mongo.unit_of_work import unit_of_work, UnitOfWork
+
 
 class SingletonMeta(type):
     _instances = {}
@@ -33,6 +39,9 @@ class ValidationError(Exception):
 class PydanticMongo(metaclass=SingletonMeta):
     def __init__(self):
         self.mongo = None
+        self.async_db = None
+        self.async_indexed_collections: Set[str] = set()
+        self.invalidation_bus: Optional[InvalidationBus] = None
 
     @property
     def db(self) -> Optional[Database]:
@@ -44,3 +53,116 @@ class PydanticMongo(metaclass=SingletonMeta):
 
     def init_app(self, app, uri=None, *args, **kwargs) -> None:
         self.mongo = PyMongo(app, uri, *args, **kwargs)
+
+        if app.config.get("PYDANTIC_MONGO_IDENTITY_MAP", False) and "pydantic_mongo" not in app.extensions:
+            app.before_request(self._start_request_session)
+            app.teardown_request(self._end_request_session)
+        if app.config.get("PYDANTIC_MONGO_UNIT_OF_WORK", False) and "pydantic_mongo" not in app.extensions:
+            # teardown functions run in reverse order, so the unit of work is flushed inside the session
+            app.before_request(self._start_request_unit_of_work)
+            app.teardown_request(self._end_request_unit_of_work)
+        app.extensions["pydantic_mongo"] = self
+
+    def session(self) -> AbstractContextManager[IdentityMap]:
+        """
+        Start a session with its own identity map:
+        every (collection, id) is resolved to one model instance and repeated `get_by_id` calls are served from memory.
+        Flask requests run in a session if `PYDANTIC_MONGO_IDENTITY_MAP = True` is set in app config
+
+        Returns:
+            context manager with IdentityMap of the session
+        """
+        return session()
+
+    def _start_request_session(self) -> None:
+        g.pydantic_mongo_session = self.session()
+        g.pydantic_mongo_session.__enter__()
+
+    @staticmethod
+    def _end_request_session(exc: Optional[BaseException] = None) -> None:
+        request_session = g.pop("pydantic_mongo_session", None)
+        if request_session is not None:
+            request_session.__exit__(None, None, None)
+
+    def unit_of_work(self) -> AbstractContextManager[UnitOfWork]:
+        """
+        Start a unit of work: `save()` and `delete()` are only recorded and are written
+        as one unordered `bulk_write` per collection when the block exits, or rolled back if it raises.
+        Flask requests run in a unit of work if `PYDANTIC_MONGO_UNIT_OF_WORK = True` is set in app config
+
+        Returns:
+            context manager with UnitOfWork
+        """
+        return unit_of_work()
+
+    @staticmethod
+    def flush() -> None:
+        """
+        Write operations recorded by the current unit of work, if there is one
+
+        Returns:
+            None
+        """
+        work = UnitOfWork.current()
+        if work is not None:
+            work.flush()
+
+    def _start_request_unit_of_work(self) -> None:
+        g.pydantic_mongo_unit_of_work = self.unit_of_work()
+        g.pydantic_mongo_unit_of_work.__enter__()
+
+    @staticmethod
+    def _end_request_unit_of_work(exc: Optional[BaseException] = None) -> None:
+        request_unit_of_work = g.pop("pydantic_mongo_unit_of_work", None)
+        if request_unit_of_work is None:
+            return
+        if exc is None:
+            request_unit_of_work.__exit__(None, None, None)
+        else:
+            request_unit_of_work.__exit__(type(exc), exc, exc.__traceback__)
+
+    def init_invalidation_bus(self, bus: Optional[InvalidationBus]) -> None:
+        """
+        Set bus which writes of cached models are published to and start receiving events of other processes,
+        received events invalidate read caches, in-memory replicas and query cache of this process
+
+        Args:
+            bus: InvalidationBus, e.g. MongoInvalidationBus(PydanticMongo().db); if None, current bus is stopped
+
+        Returns:
+            None
+        """
+        from pydantic_mongo.query_cache import QueryCache
+        from pydantic_mongo.read_cache import ReadCache
+        from pydantic_mongo.replica import CollectionReplica
+
+        if self.invalidation_bus is not None:
+            self.invalidation_bus.stop()
+        self.invalidation_bus = bus
+        if bus is not None:
+            bus.subscribe(ReadCache.invalidate_ids)
+            bus.subscribe(CollectionReplica.invalidate_ids)
+            bus.subscribe(QueryCache().invalidate_ids)
+            bus.start()
+
+    def init_async(self, uri: Optional[str] = None, db: Any = None, **kwargs) -> None:
+        """
+        Init async engine used by async model methods (`aget_by_id`, `asave`, etc.)
+
+        Args:
+            uri: mongo uri with database name, motor client is created for it
+            db: async database to use instead of creating a client, e.g. an in-process fake
+            **kwargs: kwargs for motor.motor_asyncio.AsyncIOMotorClient
+
+        Returns:
+            None
+        """
+        if db is None:
+            try:
+                from motor.motor_asyncio import AsyncIOMotorClient
+            except ImportError:
+                raise ImportError("motor is required for async support, install it with `pip install motor`")
+            db = AsyncIOMotorClient(uri, **kwargs).get_default_database()
+
+        self.async_db = db
+        self.async_indexed_collections = set()
@@ -1,12 +1,54 @@
+import hashlib
+import json
 import logging
 import re
 from typing import Callable, get_origin, Iterator, Union, Any, Iterable
 
 from bson import DBRef
+from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
 
 
+def get_subtypes(t: Any, tp: type, in_list: bool = False) -> Iterator[tuple]:
+    """
+    Get subclasses of tp used in type t
+
+    Args:
+        t: type, e.g. Optional[List[Model]]
+        tp: base class to find
+        in_list: True if t is an item type of a list or tuple
+
+    Returns:
+        iterator with tuples of found class and True if it is used as an item of a list or tuple
+    """
+    origin = get_origin(t)
+    if origin is not None:
+        for arg in getattr(t, "__args__", ()):
+            yield from get_subtypes(arg, tp, in_list or origin in (list, tuple))
+    elif isinstance(t, type) and issubclass(t, tp):
+        yield t, in_list
+
+
+def has_subtypes_in_dict(t: Any, tp: type) -> bool:
+    """
+    Check if subclasses of tp are used as values of a dict in type t
+
+    Args:
+        t: type, e.g. Dict[str, Model]
+        tp: base class to find
+
+    Returns:
+        True if found class is used in a dict
+    """
+    origin = get_origin(t)
+    if origin is None:
+        return False
+    if origin is dict and any(True for _ in get_subtypes(t, tp)):
+        return True
+    return any(has_subtypes_in_dict(arg, tp) for arg in getattr(t, "__args__", ()))
+
+
 def change_subtypes(t: type, callback: Callable[[type], type]) -> type:
     """
     Change subtypes of type t with returned from callback
@@ -41,6 +83,8 @@ def find_instance_in_data_and_replace(data: dict, tp: type, callback: Callable[[
             for i, item in enumerate(value):
                 if isinstance(item, tp):
                     data[key][i] = callback(item)
+                elif isinstance(item, dict):
+                    data[key][i] = find_instance_in_data_and_replace(item, tp, callback)
         elif isinstance(value, dict):
             data[key] = find_instance_in_data_and_replace(value, tp, callback)
 
@@ -86,6 +130,30 @@ def get_refs_from_data(data: Union[dict, list, DBRef]) -> Iterator[DBRef]:
             yield from get_refs_from_data(item)
 
 
+def get_instances_from_data(data: Any, tp: type) -> Iterator[Any]:
+    """
+    Get all instances of type from data, other pydantic models in data are searched too
+
+    Args:
+        data: instance, dict, list, tuple or pydantic model
+        tp: type to find
+
+    Returns:
+        iterator with instances
+    """
+    if isinstance(data, tp):
+        yield data
+    elif isinstance(data, dict):
+        for value in data.values():
+            yield from get_instances_from_data(value, tp)
+    elif isinstance(data, (list, tuple)):
+        for item in data:
+            yield from get_instances_from_data(item, tp)
+    elif isinstance(data, BaseModel):
+        for _, value in data:
+            yield from get_instances_from_data(value, tp)
+
+
 def find_data_with_fields_in_data_and_replace(
         data: dict, fields: Iterable, replace_callback: Callable[[Any], Any]) -> dict:
     """
@@ -110,3 +178,18 @@ def find_data_with_fields_in_data_and_replace(
             data[key] = find_data_with_fields_in_data_and_replace(value, fields, replace_callback)
 
     return data
+
+
+def get_data_digest(data: dict) -> str:
+    """
+    Get short digest of data which doesn't depend on the order of keys.
+    Values which are not JSON serializable (ObjectId, DBRef, etc.) are taken by their repr
+
+    Args:
+        data: dict with data
+
+    Returns:
+        hex digest
+    """
+    serialized = json.dumps(data, sort_keys=True, default=repr).encode()
+    return hashlib.blake2b(serialized, digest_size=16).hexdigest()
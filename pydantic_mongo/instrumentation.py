@@ -0,0 +1,65 @@
+import threading
+from collections import Counter
+from typing import Optional, Dict, Tuple
+
+from pydantic_mongo.extensions import SingletonMeta
+
+
+class Instrumentation(metaclass=SingletonMeta):
+    """
+    Process-wide counters of library events (skipped writes, cache hits, etc.) by collection
+    """
+    def __init__(self):
+        self._counters: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def increment(self, event: str, collection: str, amount: int = 1) -> None:
+        """
+        Increment counter of event for a collection
+
+        Args:
+            event: event name, e.g. "writes_skipped"
+            collection: collection name
+            amount: value to add
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._counters[(event, collection)] += amount
+
+    def get(self, event: str, collection: Optional[str] = None) -> int:
+        """
+        Get counter value of event
+
+        Args:
+            event: event name
+            collection: collection name; if None, sum for all collections is returned
+
+        Returns:
+            counter value
+        """
+        with self._lock:
+            if collection is not None:
+                return self._counters[(event, collection)]
+            return sum(value for (name, _), value in self._counters.items() if name == event)
+
+    def snapshot(self) -> Dict[Tuple[str, str], int]:
+        """
+        Get copy of all counters
+
+        Returns:
+            dict with (event, collection) as key and counter value as value
+        """
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self) -> None:
+        """
+        Reset all counters
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._counters.clear()
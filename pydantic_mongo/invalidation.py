@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, List, Optional
+
+from bson import ObjectId
+from pymongo import CursorType
+from pymongo.database import Database
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+InvalidationCallback = Callable[[str, List[str]], None]
+
+
+class InvalidationBus(ABC):
+    """
+    Delivers (collection, ids) events about written documents to subscribers, e.g. caches of other workers.
+    Subclasses implement `publish`, events are delivered to subscribers with `_notify`
+    """
+    def __init__(self):
+        self._subscribers: List[InvalidationCallback] = []
+
+    def subscribe(self, callback: InvalidationCallback) -> None:
+        """
+        Subscribe to invalidation events
+
+        Args:
+            callback: function that takes collection name and list of str ids
+
+        Returns:
+            None
+        """
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    @abstractmethod
+    def publish(self, collection: str, ids: List[Any]) -> None:
+        """
+        Publish invalidation event about written documents
+
+        Args:
+            collection: collection name
+            ids: ids of documents as str or ObjectId
+
+        Returns:
+            None
+        """
+
+    def start(self) -> None:
+        """
+        Start receiving events from other processes, if the bus can do it
+
+        Returns:
+            None
+        """
+
+    def stop(self) -> None:
+        """
+        Stop receiving events from other processes
+
+        Returns:
+            None
+        """
+
+    def _notify(self, collection: str, ids: List[str]) -> None:
+        for callback in self._subscribers:
+            try:
+                callback(collection, ids)
+            except Exception:
+                logger.exception(f"Invalidation callback failed for {collection}")
+
+
+class InProcessInvalidationBus(InvalidationBus):
+    """
+    Delivers events to subscribers of the current process only
+    """
+    def publish(self, collection: str, ids: List[Any]) -> None:
+        self._notify(collection, [str(_id) for _id in ids])
+
+
+class MongoInvalidationBus(InvalidationBus):
+    """
+    Delivers events to subscribers of all processes through a capped collection.
+    Events are inserted to the collection and every process tails it with a tailable cursor in a daemon thread.
+    A re-opened cursor resumes after the last read event in insertion ($natural) order, because ids of events
+    from different processes are not ordered. Events of the current process are delivered to its subscribers
+    on publishing
+    """
+    def __init__(self, db: Database, collection_name: str = "pydantic_mongo_invalidations",
+                 size: int = 16 * 1024 * 1024, retry_interval: float = 1.0):
+        super().__init__()
+        self.db = db
+        self.collection_name = collection_name
+        self.size = size
+        self.retry_interval = retry_interval
+        self.source = str(ObjectId())
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def collection(self):
+        return self.db[self.collection_name]
+
+    def publish(self, collection: str, ids: List[Any]) -> None:
+        ids = [str(_id) for _id in ids]
+        self._notify(collection, ids)
+        self.collection.insert_one({"collection": collection, "ids": ids, "source": self.source})
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._create_collection()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._listen, name="pydantic-mongo-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.retry_interval * 2)
+            self._thread = None
+
+    def _create_collection(self) -> None:
+        """
+        Create capped collection if it doesn't exist, with a first event so that tailable cursors stay alive
+
+        Returns:
+            None
+        """
+        try:
+            self.db.create_collection(self.collection_name, capped=True, size=self.size)
+            self.collection.insert_one({"collection": None, "ids": [], "source": self.source})
+        except CollectionInvalid:
+            pass
+
+    def _listen(self) -> None:
+        last = self.collection.find_one(sort=[("$natural", -1)])
+        last_id = last["_id"] if last else None
+
+        while not self._stopped.is_set():
+            try:
+                # events before the last read one are skipped; if it was overwritten in the capped collection,
+                # all remaining events are delivered again, which only invalidates more than needed
+                skip_until = last_id if last_id is not None \
+                    and self.collection.find_one({"_id": last_id}, {"_id": True}) else None
+                cursor = self.collection.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive and not self._stopped.is_set():
+                    for event in cursor:
+                        if skip_until is not None:
+                            if event["_id"] == skip_until:
+                                skip_until = None
+                            continue
+                        last_id = event["_id"]
+                        if event.get("source") != self.source and event.get("collection"):
+                            self._notify(event["collection"], event["ids"])
+                        if self._stopped.is_set():
+                            break
+            except PyMongoError:
+                logger.exception(f"Failed to tail {self.collection_name}, retrying")
+            self._stopped.wait(self.retry_interval)
@@ -72,7 +72,7 @@ class BaseMeta(type(BaseModel)):
                 raise ValidationError(
                     f"Type \"{field_type}\" of field \"{field_name}\" is not supported.\n"
                     f"Use models, inherited from \"pydantic_mongo.PydanticMongoModel\" or "
-                    f"supported types: {supported_types}")
+                    f"\"pydantic_mongo.EmbeddedModel\" or supported types: {supported_types}")
 
     @classmethod
     def check_type_recursive(cls, t: type, available_types: List[type]) -> bool:
@@ -95,8 +95,19 @@ class BaseMeta(type(BaseModel)):
                 if type(t) == ForwardRef:
                     return True
                 if t not in available_types:
-                    return inspect.isclass(t) and isinstance(t, BaseMeta)
+                    return inspect.isclass(t) and isinstance(t, (BaseMeta, EmbeddedMeta))
                 return True
         except Exception as e:
             logger.error(f"Error while checking type {t}: {e}")
             return False
+
+
+class EmbeddedMeta(type(BaseModel)):
+    """
+    Metaclass of embedded models: annotations are checked as in BaseMeta, but classes have no collection
+    """
+    def __new__(mcls, name, bases, class_dict, **kwargs):
+        BaseMeta.instances.append(name)
+        BaseMeta.check_types(class_dict.get('__annotations__', {}))
+
+        return super().__new__(mcls, name, bases, class_dict, **kwargs)
@@ -1,14 +1,17 @@
 from __future__ import annotations
 
 import datetime
-from typing import Optional, Dict, get_origin, Type, Tuple, Any, Union
+import functools
+from typing import Optional, Dict, get_origin, Type, Tuple, Any, Union, Iterable
 
 from bson import DBRef
 from pydantic import BaseModel, Field, create_model
 from pydantic.fields import FieldInfo
+from pydantic_core import PydanticUndefined
 
 from pydantic_mongo.base import __Base as Base
 from pydantic_mongo.db_ref_model import DbRefModel
+from pydantic_mongo.embedded_model import EmbeddedModel
 from pydantic_mongo.helpers import change_subtypes, find_instance_in_data_and_replace
 
 
@@ -47,6 +50,8 @@ class MongoModel(BaseModel):
             dict with field name as key and tuple with type and default value as value
         """
         def callback(x):
+            if not isinstance(x, (str, int, bool)) and issubclass(x, EmbeddedModel):
+                return EmbeddedMongoModel.from_model(x)
             if not isinstance(x, (str, int, bool)) and issubclass(x, replaceable_type):
                 return replacing_type.from_model(x)
             return x
@@ -99,13 +104,15 @@ class MongoModel(BaseModel):
         Returns:
             dict with model data
         """
-        replaceable_fields = list(DbRefModel.model_fields.keys())
+        replaceable_fields = set(DbRefModel.model_fields.keys()) - {"snapshot"}
         data_fields = list(data.keys())
 
-        if len(data_fields) == len(replaceable_fields) and set(data_fields) == set(replaceable_fields):
+        if set(data_fields) - {"snapshot"} == replaceable_fields:
             if data["id"] is None:
                 raise ValueError(f"Object id is None for data {data}. Did you forget to save it?")
-            return DBRef(collection=data["collection"], id=data["id"], database=data["database"])
+            return DBRef(
+                collection=data["collection"], id=data["id"], database=data["database"], **(data.get("snapshot") or {})
+            )
 
         for field in data_fields:
             if isinstance(data[field], dict):
@@ -137,18 +144,24 @@ class MongoModel(BaseModel):
         return self._convert_to_db_ref_if_needed(_model) if convert_to_db else _model
 
     @classmethod
-    def from_model(cls: Type[MongoModel], model: Type[Base]) -> Type[MongoModel]:
+    def from_model(cls: Type[MongoModel], model: Type[Base], include: Optional[Iterable[str]] = None
+                   ) -> Type[MongoModel]:
         """
         Create MongoModel from a Base-inherited model
 
         Args:
             model: Base-inherited model
+            include: if given, only these fields of the model are added to MongoModel.
+                Computed fields of the model are added as optional fields, so that they are stored
 
         Returns:
             MongoModel as a type
         """
         replacing_type = DbRefModel
         model_fields = model.model_fields
+        if include is not None:
+            include = set(include)
+            model_fields = {field: an for field, an in model_fields.items() if field in include}
         new_model_fields = {}
         new_model_validators = {}
         for field, an in model_fields.items():
@@ -157,6 +170,13 @@ class MongoModel(BaseModel):
             new_validator = cls._get_fields_validators_from_annotation(an.annotation, replacing_type)
             if new_validator:
                 new_model_validators[field] = new_validator
+        for field, decorator in model.__pydantic_decorators__.computed_fields.items():
+            if include is not None and field not in include:
+                continue
+            return_type = decorator.info.return_type
+            return_type = Any if return_type is PydanticUndefined else return_type
+            new_type, _ = cls._get_fields_from_annotation(field, return_type, replacing_type)[field]
+            new_model_fields[field] = (new_type, None)
 
         return create_model(
             'MongoModel',
@@ -164,3 +184,27 @@ class MongoModel(BaseModel):
             __base__=cls,
             **new_model_fields
         )
+
+
+class EmbeddedMongoModel(BaseModel):
+    class Config:
+        populate_by_name = True
+        from_attributes = True
+
+    @classmethod
+    @functools.lru_cache(maxsize=256)
+    def from_model(cls, model: Type[EmbeddedModel]) -> Type[EmbeddedMongoModel]:
+        """
+        Create model of a sub-document from an embedded model, refs in it are replaced with DbRefModel
+
+        Args:
+            model: EmbeddedModel-inherited model
+
+        Returns:
+            EmbeddedMongoModel as a type
+        """
+        new_model_fields = {}
+        for field, an in model.model_fields.items():
+            new_model_fields.update(MongoModel._get_fields_from_annotation(field, an.annotation, DbRefModel))
+
+        return create_model('EmbeddedMongoModel', __base__=cls, **new_model_fields)
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
 from bson import ObjectId, DBRef
-from typing import Optional, Union, Any, Iterator, Dict, List, TypeVar, Type
+from typing import Optional, Union, Any, Iterator, Dict, List, Mapping, TypeVar, Type, AsyncIterator
 
-from pydantic_mongo.base_pm_model import BasePydanticMongoModel
+from pydantic import BaseModel
+
+from pydantic_mongo.base_pm_model import BasePydanticMongoModel, Filter
+from pydantic_mongo.covered import CoveredQuery
+from pydantic_mongo.query import QueryFields
 
 T = TypeVar("T", bound="PydanticMongoModel")
+M = TypeVar("M", bound=BaseModel)
 
 
 class PydanticMongoModel(BasePydanticMongoModel):
@@ -22,6 +27,20 @@ class PydanticMongoModel(BasePydanticMongoModel):
         """
         return cls.get_by_filter({"_id": _id})
 
+    @classmethod
+    def get_by_ids(cls: Type[T], ids: List[Union[str, ObjectId]]) -> List[Optional[T]]:
+        """
+        Get models by ids from database with one query.
+        Models loaded in the current session and cached documents are not queried
+
+        Args:
+            ids: list with ids as str or ObjectId
+
+        Returns:
+            list with models in order of ids, None for ids which are not found
+        """
+        return cls._get_by_ids(ids)
+
     @classmethod
     def from_ref(cls: Type[T], ref: DBRef, unloaded: bool = True) -> T:
         """
@@ -51,6 +70,35 @@ class PydanticMongoModel(BasePydanticMongoModel):
         """
         return cls._get_with_parse_db_refs(data)
 
+    @classmethod
+    @property
+    def q(cls) -> QueryFields:
+        """
+        Fields of a model to build typed query expressions, which can be used instead of filter dicts:
+        `User.get_by_filter((User.q.age > 30) & (User.q.owner == owner))`.
+        Values are validated against field types and encoded as they are stored
+
+        Returns:
+            QueryFields
+        """
+        return QueryFields(cls)
+
+    @classmethod
+    def covered_query(cls, fields: List[str]) -> CoveredQuery:
+        """
+        Create index-only query returning named tuples with given fields instead of models, e.g. for autocomplete.
+        Fields should be covered by one of `_MongoConfig.indexes`, `_id` is returned only if it is in fields.
+        Create it once, e.g. on module level: `UserNames = User.covered_query(["name"])`,
+        then `UserNames.find(User.q.name >= "Jo", limit=10)`
+
+        Args:
+            fields: field names, dotted for fields of embedded models, "id" for id
+
+        Returns:
+            CoveredQuery
+        """
+        return CoveredQuery(cls, fields)
+
     @property
     def db_ref(self) -> DBRef:
         """
@@ -62,11 +110,11 @@ class PydanticMongoModel(BasePydanticMongoModel):
         return super().db_ref
 
     @classmethod
-    def get_by_filter(cls: Type[T], filter: Dict[str, Any]) -> Optional[T]:
+    def get_by_filter(cls: Type[T], filter: Filter) -> Optional[T]:
         """
         Get model by filter from database
         Args:
-            filter: filter dict
+            filter: filter dict or query expression, see `q`
 
         Returns:
             None if not found else Model
@@ -89,38 +137,179 @@ class PydanticMongoModel(BasePydanticMongoModel):
 
         return self._get_ref_objects(dict(mongo_doc))
 
-    def save(self: T) -> T:
+    def load_deferred(self: T, *fields: str) -> T:
+        """
+        Load deferred fields (`_MongoConfig.deferred`) with one query instead of one query per accessed field.
+        Fields that are already loaded are skipped
+
+        Args:
+            *fields: deferred field names
+
+        Returns:
+            PydanticMongoModel
+        """
+        return self._load_fields(*fields)
+
+    def save(self: T, cascade: bool = False) -> T:
         """
         Save model to database
 
+        Args:
+            cascade: if True, referenced models without id are saved too, recursively.
+                They get client-side ids and all documents are written with one bulk write per collection
+
+        Returns:
+            PydanticMongoModel
+        """
+        return self._save(cascade=cascade)
+
+    def upsert(self: T, on: List[str]) -> T:
+        """
+        Insert model or update a document with the same natural key in one round trip.
+        Model id is set to the id of inserted or updated document
+
+        Args:
+            on: natural key field names, e.g. ["source", "external_id"]
+
         Returns:
             PydanticMongoModel
         """
-        return self._save()
+        return self._upsert(on)
+
+    @classmethod
+    def upsert_many(cls: Type[T], instances: List[T], on: List[str]) -> List[T]:
+        """
+        Upsert models by natural key with one unordered bulk write and set their ids
+
+        Args:
+            instances: list with models
+            on: natural key field names, e.g. ["source", "external_id"]
+
+        Returns:
+            list with models
+        """
+        return cls._upsert_many(instances, on)
+
+    @classmethod
+    def patch(cls: Type[T], _id: Union[str, ObjectId], data: Dict[str, Any],
+              return_model: bool = False) -> Union[Optional[T], bool]:
+        """
+        Validate and apply a partial update to a document in one round trip
+
+        Args:
+            _id: id as str or ObjectId
+            data: dict with field names as keys, only these fields are validated and updated
+            return_model: if True, return updated model instead of a flag
+
+        Returns:
+            updated Model or None if not found if return_model is True
+            True if document was found otherwise
+        """
+        return cls._patch(_id, data, return_model)
 
-    def delete(self) -> None:
+    def delete(self, cascade: bool = False) -> None:
         """
         Delete model from database
 
+        Args:
+            cascade: if True, apply `_MongoConfig.on_delete` rules of models referencing the document,
+                see `delete_many`
+
         Returns:
             None
         """
-        if self.id is not None:
-            obj_id = ObjectId(self.id)
-            self.collection().delete_one({"_id": obj_id})
+        self._delete(cascade=cascade)
 
     @classmethod
-    def objects(cls: Type[T], filter: Optional[Dict[str, Any]] = None) -> Iterator[T]:
+    def delete_many(cls, filter: Optional[Filter] = None, cascade: bool = False) -> int:
+        """
+        Delete documents by filter without loading them
+
+        Args:
+            filter: filter dict or query expression
+            cascade: if True, apply `_MongoConfig.on_delete` rules of models referencing deleted documents:
+                "cascade" deletes referencing documents, "nullify" sets refs to None, "pull" removes refs from lists
+
+        Returns:
+            number of deleted documents
+        """
+        return cls._delete_many(filter, cascade=cascade)
+
+    @classmethod
+    def refresh_snapshots(cls, ids: Optional[List[Union[str, ObjectId]]] = None, batch_size: int = 1000) -> int:
+        """
+        Update ref snapshots (`_MongoConfig.ref_snapshots`) stored in documents of the class
+        from current referenced documents, e.g. after referenced models were changed
+
+        Args:
+            ids: ids of changed referenced documents; if None, all snapshots are refreshed
+            batch_size: number of referenced documents per bulk write
+
+        Returns:
+            number of modified documents
+        """
+        return cls._refresh_snapshots(ids, batch_size)
+
+    @classmethod
+    def recount_counter_caches(cls, batch_size: int = 1000) -> int:
+        """
+        Recount counter caches (`_MongoConfig.counter_caches`) of the class refs
+        and fix counter fields of referenced documents which drifted, e.g. after writes bypassing models
+
+        Args:
+            batch_size: number of counter updates per bulk write
+
+        Returns:
+            number of fixed documents
+        """
+        return cls._recount_counter_caches(batch_size)
+
+    @classmethod
+    def migrate_storage_aliases(cls, previous: Optional[Dict[str, str]] = None) -> int:
+        """
+        Rename keys of existing documents of the class to keys set in `_MongoConfig.storage_aliases`,
+        e.g. after aliases were added, changed or removed
+
+        Args:
+            previous: storage aliases documents were written with, none by default
+
+        Returns:
+            number of modified documents
+        """
+        return cls._migrate_storage_aliases(previous)
+
+    @classmethod
+    def objects(cls: Type[T], filter: Optional[Filter] = None) -> Iterator[T]:
         """
         Get all models from database
         Args:
-            filter: filter dict
+            filter: filter dict or query expression
 
         Returns:
             iterator with models
         """
         return cls._objects(filter)
 
+    @classmethod
+    def aggregate(cls, pipeline: List[Mapping[str, Any]], output_model: Optional[Type[M]] = None,
+                  batch_size: Optional[int] = None, allow_disk_use: Optional[bool] = None
+                  ) -> Iterator[Union[M, Dict[str, Any]]]:
+        """
+        Run aggregation pipeline on the model collection and stream results.
+        Stages can be built with `pydantic_mongo.aggregation` helpers: `match`, `group` and `facet`
+
+        Args:
+            pipeline: list with stages, `$match` stages can have query expressions (see `q`)
+            output_model: pydantic model to validate every row with, rows are dicts if it is not given.
+                If it is a PydanticMongoModel, rows are read as its documents
+            batch_size: number of rows in a cursor batch
+            allow_disk_use: if True, heavy stages can write temporary data to disk on the server
+
+        Returns:
+            iterator with output models or dicts, refs in rows are unloaded models
+        """
+        return cls._aggregate(pipeline, output_model, batch_size, allow_disk_use)
+
     def model_dump(self, as_mongo_model: bool = False, **kwargs) -> dict[str, Any]:
         """Usage docs: https://docs.pydantic.dev/2.2/usage/serialization/#modelmodel_dump
 
@@ -166,3 +355,205 @@ class PydanticMongoModel(BasePydanticMongoModel):
             The JSON schema for the given model class.
         """
         return cls._model_json_schema(as_mongo_model=as_mongo_model, by_alias=by_alias, **kwargs)
+
+    @classmethod
+    async def aget_by_id(cls: Type[T], _id: Union[str, ObjectId]) -> Optional[T]:
+        """
+        Get model by id from database with async engine
+
+        Args:
+            _id: id as str or ObjectId
+
+        Returns:
+            None if not found else Model
+        """
+        return await cls.aget_by_filter({"_id": _id})
+
+    @classmethod
+    async def aget_by_ids(cls: Type[T], ids: List[Union[str, ObjectId]]) -> List[Optional[T]]:
+        """
+        Get models by ids from database with one query with async engine
+
+        Args:
+            ids: list with ids as str or ObjectId
+
+        Returns:
+            list with models in order of ids, None for ids which are not found
+        """
+        return await cls._aget_by_ids(ids)
+
+    @classmethod
+    async def aget_by_filter(cls: Type[T], filter: Filter) -> Optional[T]:
+        """
+        Get model by filter from database with async engine
+
+        Args:
+            filter: filter dict or query expression
+
+        Returns:
+            None if not found else Model
+        """
+        return await cls._aget_by_filter(filter)
+
+    @classmethod
+    async def afrom_ref(cls: Type[T], ref: DBRef, unloaded: bool = True) -> T:
+        """
+        Get model from DBRef with async engine.
+        If unloaded is True, the model should be loaded with `aload` before accessing its attributes
+
+        Args:
+            ref: bson.DBRef(collection: str, id: str)
+            unloaded: if True, a model will be unloaded (by default), else it will be loaded from db
+
+        Returns:
+            Model
+        """
+        return await cls._afrom_ref(ref, unloaded)
+
+    async def aload(self: T) -> T:
+        """
+        Load model created from DBRef with async engine, does nothing if model is already loaded.
+        The same as `await model`
+
+        Returns:
+            PydanticMongoModel
+        """
+        return await self._aload()
+
+    @classmethod
+    async def afetch_related(cls: Type[T], instances: List[T], *fields: str) -> List[T]:
+        """
+        Load models referenced in given fields of instances with async engine.
+        Refs are loaded concurrently with one query per collection
+
+        Args:
+            instances: list with models
+            *fields: field names with refs, e.g. "owner", "children"
+
+        Returns:
+            list with models
+        """
+        return await cls._afetch_related(instances, *fields)
+
+    async def aget_ref_objects(self: T) -> Optional[List[Optional[T]]]:
+        """
+        Get all ref objects from a model with async engine.
+
+        Returns:
+            list with unloaded models or None if not found
+        """
+        if self.id is None:
+            return None
+
+        mongo_doc = await (await self.acollection()).find_one({"_id": ObjectId(self.id)})
+        if not mongo_doc:
+            return None
+
+        return self._get_ref_objects(dict(mongo_doc))
+
+    async def aload_deferred(self: T, *fields: str) -> T:
+        """
+        Load deferred fields with async engine, see `load_deferred`.
+        In async code deferred fields should be loaded this way before accessing them
+
+        Args:
+            *fields: deferred field names
+
+        Returns:
+            PydanticMongoModel
+        """
+        return await self._aload_fields(*fields)
+
+    async def asave(self: T, cascade: bool = False) -> T:
+        """
+        Save model to database with async engine
+
+        Args:
+            cascade: if True, referenced models without id are saved too, see `save`
+
+        Returns:
+            PydanticMongoModel
+        """
+        return await self._asave(cascade=cascade)
+
+    async def aupsert(self: T, on: List[str]) -> T:
+        """
+        Insert model or update a document with the same natural key with async engine
+
+        Args:
+            on: natural key field names, e.g. ["source", "external_id"]
+
+        Returns:
+            PydanticMongoModel
+        """
+        return await self._aupsert(on)
+
+    @classmethod
+    async def aupsert_many(cls: Type[T], instances: List[T], on: List[str]) -> List[T]:
+        """
+        Upsert models by natural key with one unordered bulk write with async engine
+
+        Args:
+            instances: list with models
+            on: natural key field names, e.g. ["source", "external_id"]
+
+        Returns:
+            list with models
+        """
+        return await cls._aupsert_many(instances, on)
+
+    @classmethod
+    async def apatch(cls: Type[T], _id: Union[str, ObjectId], data: Dict[str, Any],
+                     return_model: bool = False) -> Union[Optional[T], bool]:
+        """
+        Validate and apply a partial update to a document with async engine
+
+        Args:
+            _id: id as str or ObjectId
+            data: dict with field names as keys, only these fields are validated and updated
+            return_model: if True, return updated model instead of a flag
+
+        Returns:
+            updated Model or None if not found if return_model is True
+            True if document was found otherwise
+        """
+        return await cls._apatch(_id, data, return_model)
+
+    async def adelete(self) -> None:
+        """
+        Delete model from database with async engine
+
+        Returns:
+            None
+        """
+        await self._adelete()
+
+    @classmethod
+    def aaggregate(cls, pipeline: List[Mapping[str, Any]], output_model: Optional[Type[M]] = None,
+                   batch_size: Optional[int] = None, allow_disk_use: Optional[bool] = None
+                   ) -> AsyncIterator[Union[M, Dict[str, Any]]]:
+        """
+        Run aggregation pipeline with async engine, see `aggregate`
+
+        Args:
+            pipeline: list with stages
+            output_model: pydantic model to validate every row with
+            batch_size: number of rows in a cursor batch
+            allow_disk_use: if True, heavy stages can write temporary data to disk on the server
+
+        Returns:
+            async iterator with output models or dicts
+        """
+        return cls._aaggregate(pipeline, output_model, batch_size, allow_disk_use)
+
+    @classmethod
+    def aobjects(cls: Type[T], filter: Optional[Filter] = None) -> AsyncIterator[T]:
+        """
+        Get all models from database with async engine
+        Args:
+            filter: filter dict or query expression
+
+        Returns:
+            async iterator with models
+        """
+        return cls._aobjects(filter)
@@ -0,0 +1,468 @@
+from __future__ import annotations
+
+import functools
+import types
+import typing
+from typing import Any, Callable, Iterator, List, Mapping, Optional, Tuple, Type, get_args, get_origin
+
+from bson import DBRef, ObjectId
+from pydantic import create_model
+from pydantic_core import PydanticUndefined
+
+from pydantic_mongo.base import __Base as Base
+from pydantic_mongo.db_ref_model import DbRefModel
+from pydantic_mongo.embedded_model import EmbeddedModel
+from pydantic_mongo.mongo_model import MongoModel
+
+LOGICAL_OPERATORS = ("$and", "$or", "$nor")
+COMPARISON_OPERATORS = ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte")
+LIST_OPERATORS = ("$in", "$nin", "$all")
+# shape of an expression without values: ("field", path, operator) or (logical operator, tuple with templates)
+Template = Tuple[Any, ...]
+Builder = Callable[[Iterator[Any]], dict]
+
+
+class QueryFields:
+    """
+    Fields of a model to build query expressions with: `User.q.age > 30`, `User.q.address.city == "Paris"`.
+    Unknown fields raise AttributeError
+    """
+    __slots__ = ("_model",)
+
+    def __init__(self, model: Type[Any]):
+        self._model = model
+
+    def __getattr__(self, name: str) -> FieldPath:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return FieldPath(self._model, (name,))
+
+
+class FieldPath:
+    """
+    Field of a model or of its embedded sub-documents, comparing it with a value makes a QueryExpression
+    """
+    __slots__ = ("_model", "_path")
+
+    def __init__(self, model: Type[Any], path: Tuple[str, ...]):
+        _resolve(model, path)
+        self._model = model
+        self._path = path
+
+    def __getattr__(self, name: str) -> FieldPath:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return FieldPath(self._model, self._path + (name,))
+
+    def __repr__(self) -> str:
+        return f"{self._model.__name__}.q.{'.'.join(self._path)}"
+
+    @property
+    def key(self) -> str:
+        """
+        Dotted path of the field in documents, e.g. "address.city" or "_id"
+        """
+        return _resolve(self._model, self._path)[0]
+
+    def _expression(self, operator: str, value: Any) -> QueryExpression:
+        return QueryExpression(self._model, ("field", self._path, operator), (value,))
+
+    def __eq__(self, value: Any) -> QueryExpression:  # type: ignore[override]
+        return self._expression("$eq", value)
+
+    def __ne__(self, value: Any) -> QueryExpression:  # type: ignore[override]
+        return self._expression("$ne", value)
+
+    def __gt__(self, value: Any) -> QueryExpression:
+        return self._expression("$gt", value)
+
+    def __ge__(self, value: Any) -> QueryExpression:
+        return self._expression("$gte", value)
+
+    def __lt__(self, value: Any) -> QueryExpression:
+        return self._expression("$lt", value)
+
+    def __le__(self, value: Any) -> QueryExpression:
+        return self._expression("$lte", value)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def in_(self, values: typing.Iterable[Any]) -> QueryExpression:
+        """
+        Field value (or an item of a list field) is one of values
+
+        Args:
+            values: values to compare with
+
+        Returns:
+            QueryExpression
+        """
+        return self._expression("$in", list(values))
+
+    def not_in(self, values: typing.Iterable[Any]) -> QueryExpression:
+        """
+        Field value is none of values
+
+        Args:
+            values: values to compare with
+
+        Returns:
+            QueryExpression
+        """
+        return self._expression("$nin", list(values))
+
+    def exists(self, exists: bool = True) -> QueryExpression:
+        """
+        Field is (or is not) present in document
+
+        Args:
+            exists: if False, field should be missing
+
+        Returns:
+            QueryExpression
+        """
+        return self._expression("$exists", exists)
+
+
+class QueryExpression:
+    """
+    Condition on model fields, combined with `&`, `|` and `~`. It is compiled to a filter dict with values
+    encoded as they are stored by the model: refs as DBRefs, dates as strings, ids as ObjectIds.
+    Compiled shapes are cached per model and template, so only values are encoded on every call
+    """
+    __slots__ = ("model", "template", "values")
+
+    def __init__(self, model: Type[Any], template: Template, values: Tuple[Any, ...]):
+        self.model = model
+        self.template = template
+        self.values = values
+
+    def __and__(self, other: QueryExpression) -> QueryExpression:
+        return self._combine("$and", other)
+
+    def __or__(self, other: QueryExpression) -> QueryExpression:
+        return self._combine("$or", other)
+
+    def __invert__(self) -> QueryExpression:
+        return QueryExpression(self.model, ("$nor", (self.template,)), self.values)
+
+    def __bool__(self) -> bool:
+        raise TypeError("Query expressions should be combined with & and | instead of and and or")
+
+    def __repr__(self) -> str:
+        return f"QueryExpression({self.model.__name__}, {self.template}, {self.values})"
+
+    def _combine(self, operator: str, other: QueryExpression) -> QueryExpression:
+        if not isinstance(other, QueryExpression):
+            return NotImplemented
+        if other.model is not self.model:
+            raise ValueError(f"Can't combine expressions of {self.model.__name__} and {other.model.__name__}")
+        templates = []
+        for expression in (self, other):
+            if expression.template[0] == operator:
+                templates.extend(expression.template[1])
+            else:
+                templates.append(expression.template)
+        return QueryExpression(self.model, (operator, tuple(templates)), self.values + other.values)
+
+    def compile(self) -> dict:
+        """
+        Get filter dict for mongo
+
+        Returns:
+            filter dict
+        """
+        return _compile(self.model, self.template)(iter(self.values))
+
+
+def _unwrap(annotation: Any) -> Tuple[Any, bool]:
+    """
+    Get type of values stored in a field: Optional is dropped, item type is returned for lists
+
+    Args:
+        annotation: field annotation
+
+    Returns:
+        tuple with type and True if field is a list
+    """
+    origin = get_origin(annotation)
+    if origin in (typing.Union, types.UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        return _unwrap(args[0]) if len(args) == 1 else (annotation, False)
+    if origin in (list, tuple):
+        args = get_args(annotation)
+        return (args[0] if args else Any), True
+    return annotation, False
+
+
+def _get_field_annotation(model: Type[Any], field: str) -> Any:
+    if field in model.model_fields:
+        return model.model_fields[field].annotation
+    computed = model.__pydantic_decorators__.computed_fields.get(field)
+    if computed is not None:
+        return Any if computed.info.return_type is PydanticUndefined else computed.info.return_type
+    raise AttributeError(f"{model.__name__} has no field {field}")
+
+
+@functools.lru_cache(maxsize=1024)
+def _resolve(model: Type[Any], path: Tuple[str, ...]) -> Tuple[str, Any]:
+    """
+    Get key and annotation of a field path, sub-fields are fields of embedded models and keys of dicts.
+    Key starts with the stored key of the field, see `_get_storage_aliases`
+
+    Args:
+        model: model class
+        path: field names
+
+    Returns:
+        tuple with dotted key and field annotation
+    """
+    field, *rest = path
+    if field == "id":
+        if rest:
+            raise AttributeError(f"Id of {model.__name__} has no fields")
+        return "_id", ObjectId
+
+    annotation = _get_field_annotation(model, field)
+    for name in rest:
+        item_type, _ = _unwrap(annotation)
+        if get_origin(item_type) is dict:
+            annotation = (get_args(item_type) or (str, Any))[1]
+        elif isinstance(item_type, type) and issubclass(item_type, EmbeddedModel):
+            annotation = _get_field_annotation(item_type, name)
+        else:
+            raise AttributeError(f"Field {'.'.join(path)} of {model.__name__} can't be queried")
+    return ".".join((model._get_stored_key(field), *rest)), annotation
+
+
+def _encode_id(value: Any) -> Optional[ObjectId]:
+    return None if value is None else ObjectId(value)
+
+
+@functools.lru_cache(maxsize=1024)
+def _get_encoder(model: Type[Any], path: Tuple[str, ...]) -> Tuple[str, Callable[[Any], Any]]:
+    """
+    Get key and encoder of a field path: values are validated against field type and encoded
+    with the save-path encoder. Refs of `_MongoConfig.ref_snapshots` fields are matched by `$id`,
+    because stored refs have snapshot fields too
+
+    Args:
+        model: model class
+        path: field names
+
+    Returns:
+        tuple with key and function encoding a value
+    """
+    key, annotation = _resolve(model, path)
+    if key == "_id":
+        return key, _encode_id
+
+    item_type, is_list = _unwrap(annotation)
+    field_type, _ = MongoModel._get_fields_from_annotation("value", item_type, DbRefModel)["value"]
+    ValueModel = create_model("QueryValue", __base__=MongoModel, value=(Optional[field_type], None))
+    by_id = len(path) == 1 and path[0] in model._get_ref_snapshots()
+
+    def encode_item(value: Any) -> Any:
+        encoded = ValueModel(value=model._convert_refs_to_dicts(value)).model_dump_db()["value"]
+        return encoded.id if by_id and isinstance(encoded, DBRef) else encoded
+
+    def encode(value: Any) -> Any:
+        if is_list and isinstance(value, (list, tuple)):
+            return [encode_item(item) for item in value]
+        return encode_item(value)
+
+    return f"{key}.$id" if by_id else key, encode
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile(model: Type[Any], template: Template) -> Builder:
+    """
+    Compile template of an expression to a function building filter dict from expression values
+
+    Args:
+        model: model class
+        template: expression template
+
+    Returns:
+        function taking iterator with values and returning filter dict
+    """
+    operator = template[0]
+    if operator in LOGICAL_OPERATORS:
+        builders = [_compile(model, item) for item in template[1]]
+        if operator != "$and":
+            return lambda values: {operator: [builder(values) for builder in builders]}
+
+        def build_and(values: Iterator[Any]) -> dict:
+            filters = [builder(values) for builder in builders]
+            merged = {}
+            for item in filters:
+                if merged.keys() & item.keys():
+                    return {"$and": filters}
+                merged.update(item)
+            return merged
+
+        return build_and
+
+    _, path, operator = template
+    key, encode = _get_encoder(model, path)
+    if operator == "$exists":
+        return lambda values: {key: {operator: bool(next(values))}}
+    if operator in ("$in", "$nin"):
+        return lambda values: {key: {operator: [encode(value) for value in next(values)]}}
+    if operator == "$eq":
+        return lambda values: {key: encode(next(values))}
+    return lambda values: {key: {operator: encode(next(values))}}
+
+
+def normalize_filter(model: Type[Any], filter: Mapping[str, Any]) -> Mapping[str, Any]:
+    """
+    Convert ids and refs in filter dict to values as they are stored: `_id` given as str to ObjectId,
+    models and DBRefs in ref fields to stored DBRefs, also inside `$in`, `$nin` and logical operators.
+    Fields with storage aliases are renamed to their stored keys.
+    Filter is not changed, it is copied only if something is converted.
+    Converters are cached per model and filter template, i.e. filter keys and operators without values
+
+    Args:
+        model: model class
+        filter: filter dict
+
+    Returns:
+        filter dict
+    """
+    normalizer = _get_normalizer(model, _get_filter_template(filter))
+    return filter if normalizer is None else normalizer(filter)
+
+
+def _get_filter_template(filter: Mapping[str, Any]) -> Template:
+    """
+    Get template of a filter dict: tuple with keys and their shapes, which are operators for operator dicts
+    and templates of branches for logical operators
+
+    Args:
+        filter: filter dict
+
+    Returns:
+        filter template
+    """
+    template = []
+    for key, value in filter.items():
+        if key in LOGICAL_OPERATORS and isinstance(value, list):
+            shape = tuple(_get_filter_template(item) if isinstance(item, Mapping) else None for item in value)
+        elif isinstance(value, Mapping) and value and all(str(operator).startswith("$") for operator in value):
+            shape = tuple(value)
+        else:
+            shape = None
+        template.append((key, shape))
+    return tuple(template)
+
+
+@functools.lru_cache(maxsize=1024)
+def _get_normalizer(model: Type[Any], template: Template) -> Optional[Callable[[Mapping[str, Any]], Mapping]]:
+    """
+    Get function converting filters of a template, see `normalize_filter`
+
+    Args:
+        model: model class
+        template: filter template
+
+    Returns:
+        function taking filter dict and returning converted filter, None if nothing is converted in such filters
+    """
+    converters = []
+    for key, shape in template:
+        if key in LOGICAL_OPERATORS:
+            normalizers = [None if item is None else _get_normalizer(model, item) for item in shape or ()]
+            if any(normalizers):
+                converters.append((key, key, functools.partial(_convert_branches, normalizers)))
+            continue
+        encoder = _get_filter_encoder(model, key)
+        if encoder is not None:
+            new_key, convert = encoder
+            if shape is not None:
+                convert = functools.partial(_convert_operators, convert)
+            converters.append((key, new_key, convert))
+    if not converters:
+        return None
+
+    def normalize(filter: Mapping[str, Any]) -> Mapping[str, Any]:
+        result = filter
+        for key, new_key, convert in converters:
+            value = filter[key]
+            converted = convert(value)
+            if converted is value and new_key == key:
+                continue
+            if result is filter:
+                result = dict(filter)
+            del result[key]
+            result[new_key] = converted
+        return result
+
+    return normalize
+
+
+@functools.lru_cache(maxsize=1024)
+def _get_filter_encoder(model: Type[Any], key: str) -> Optional[Tuple[str, Callable[[Any], Any]]]:
+    """
+    Get key and converter of filter values of `_id` and ref fields, values of other fields are not converted,
+    but their keys are renamed if fields have storage aliases
+
+    Args:
+        model: model class
+        key: filter key, dotted for sub-fields
+
+    Returns:
+        tuple with key and converter or None if neither key nor values are converted
+    """
+    if key in ("_id", "id"):
+        # "id" is renamed as in `Model.q.id`, so its values are converted as well
+        return "_id", _convert_id
+    path = tuple(key.split("."))
+    try:
+        stored_key, annotation = _resolve(model, path)
+    except AttributeError:
+        return None
+    item_type, _ = _unwrap(annotation)
+    if not isinstance(item_type, type) or not issubclass(item_type, Base):
+        return (stored_key, _keep) if stored_key != key else None
+    new_key, encode = _get_encoder(model, path)
+
+    def convert(value: Any) -> Any:
+        if isinstance(value, list):
+            return _convert_list(convert, value)
+        return encode(value) if isinstance(value, (Base, DBRef)) else value
+
+    return new_key, convert
+
+
+def _keep(value: Any) -> Any:
+    return value
+
+
+def _convert_id(value: Any) -> Any:
+    if isinstance(value, list):
+        return _convert_list(_convert_id, value)
+    return ObjectId(value) if isinstance(value, str) else value
+
+
+def _convert_list(convert: Callable[[Any], Any], values: List[Any]) -> List[Any]:
+    converted = [convert(value) for value in values]
+    return values if all(item is value for item, value in zip(converted, values)) else converted
+
+
+def _convert_operators(convert: Callable[[Any], Any], operators: Mapping[str, Any]) -> Mapping[str, Any]:
+    result = operators
+    for operator, value in operators.items():
+        if operator in COMPARISON_OPERATORS or operator in LIST_OPERATORS:
+            converted = convert(value)
+            if converted is not value:
+                if result is operators:
+                    result = dict(operators)
+                result[operator] = converted
+    return result
+
+
+def _convert_branches(normalizers: List[Optional[Callable[[Mapping], Mapping]]], branches: List[Any]) -> List[Any]:
+    converted = [
+        branch if normalizer is None else normalizer(branch) for normalizer, branch in zip(normalizers, branches)
+    ]
+    return branches if all(item is branch for item, branch in zip(converted, branches)) else converted
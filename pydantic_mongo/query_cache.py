@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Iterable, List, Mapping, Optional, Tuple
+
+import bson
+from bson import json_util
+
+from pydantic_mongo.extensions import SingletonMeta
+from pydantic_mongo.instrumentation import Instrumentation
+
+LOGICAL_OPERATORS = ("$and", "$or", "$nor")
+
+
+class QueryCache(metaclass=SingletonMeta):
+    """
+    Process-wide cache of query results keyed by collection, canonical filter, sort and projection.
+    Results are stored as encoded BSON documents under a memory budget with LRU eviction.
+    Every collection has a write version which is bumped by writes through models,
+    results cached with an older version are not returned.
+    Hits, misses and evictions are counted in Instrumentation as
+    "query_cache_hits", "query_cache_misses" and "query_cache_evictions"
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._results: OrderedDict[Tuple[str, str], Tuple[int, List[bytes], int]] = OrderedDict()
+        self._versions: Counter = Counter()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(kind: str, filter: Mapping[str, Any], sort: Optional[Any] = None,
+                projection: Optional[Any] = None) -> str:
+        """
+        Get canonical key of a query: order of filter fields and operators doesn't matter,
+        order of fields in sub-documents matched exactly is kept
+
+        Args:
+            kind: query kind, e.g. "find" or "find_one"
+            filter: filter dict
+            sort: sort specification
+            projection: projection dict
+
+        Returns:
+            str key
+        """
+        return json_util.dumps([kind, QueryCache._canonical(filter), sort, QueryCache._canonical(projection or {})])
+
+    @staticmethod
+    def _canonical(filter: Mapping[str, Any]) -> List[Any]:
+        result = []
+        for field, value in sorted(filter.items()):
+            if field in LOGICAL_OPERATORS and isinstance(value, list):
+                value = [QueryCache._canonical(item) if isinstance(item, Mapping) else item for item in value]
+            elif field == "$elemMatch" and isinstance(value, Mapping):
+                value = QueryCache._canonical(value)
+            elif isinstance(value, Mapping) and value and all(key.startswith("$") for key in value):
+                value = {"$operators": QueryCache._canonical(value)}
+            result.append([field, value])
+        return result
+
+    def version(self, collection: str) -> int:
+        """
+        Get write version of a collection
+
+        Args:
+            collection: collection name
+
+        Returns:
+            version number
+        """
+        with self._lock:
+            return self._versions[collection]
+
+    def bump(self, collection: str) -> None:
+        """
+        Bump write version of a collection, so that its cached results are not used anymore
+
+        Args:
+            collection: collection name
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._versions[collection] += 1
+
+    def invalidate_ids(self, collection: str, ids: List[Any]) -> None:
+        """
+        Bump write version of a collection. Used as invalidation bus callback
+
+        Args:
+            collection: collection name
+            ids: list with ids of changed documents
+
+        Returns:
+            None
+        """
+        self.bump(collection)
+
+    def get(self, collection: str, key: str) -> Optional[List[dict]]:
+        """
+        Get decoded cached result of a query
+
+        Args:
+            collection: collection name
+            key: query key, see `get_key`
+
+        Returns:
+            list with documents or None if result is not cached or outdated
+        """
+        with self._lock:
+            cached = self._results.get((collection, key))
+            if cached is not None and cached[0] != self._versions[collection]:
+                self._remove((collection, key))
+                cached = None
+            if cached is None:
+                Instrumentation().increment("query_cache_misses", collection)
+                return None
+            self._results.move_to_end((collection, key))
+        Instrumentation().increment("query_cache_hits", collection)
+
+        return [bson.decode(raw_doc) for raw_doc in cached[1]]
+
+    def set(self, collection: str, key: str, raw_docs: List[bytes], version: int) -> None:
+        """
+        Cache result of a query if it is not outdated and fits into memory budget,
+        least recently used results are evicted to free memory
+
+        Args:
+            collection: collection name
+            key: query key, see `get_key`
+            raw_docs: list with documents encoded with `encode`
+            version: write version of a collection got before the query was sent
+
+        Returns:
+            None
+        """
+        size = sum(len(raw_doc) for raw_doc in raw_docs)
+        evicted = 0
+        with self._lock:
+            if version != self._versions[collection] or size > self.max_bytes:
+                return
+            self._remove((collection, key))
+            self._results[(collection, key)] = (version, raw_docs, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._results)))
+                evicted += 1
+        if evicted:
+            Instrumentation().increment("query_cache_evictions", collection, evicted)
+
+    @staticmethod
+    def encode(mongo_docs: Iterable[Mapping[str, Any]]) -> List[bytes]:
+        """
+        Encode documents to BSON for caching
+
+        Args:
+            mongo_docs: documents from mongo
+
+        Returns:
+            list with encoded documents
+        """
+        return [bson.encode(mongo_doc) for mongo_doc in mongo_docs]
+
+    def clear(self) -> None:
+        """
+        Remove all cached results
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._results.clear()
+            self._size = 0
+
+    @property
+    def size(self) -> int:
+        """
+        Size of cached results in bytes
+        """
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        cached = self._results.pop(key, None)
+        if cached is not None:
+            self._size -= cached[2]
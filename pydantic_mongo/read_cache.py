@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic_mongo.instrumentation import Instrumentation
+
+
+class ReadCache:
+    """
+    Size and TTL bounded LRU cache of raw mongo documents of one collection by id.
+    Documents are copied on write and on read, so callers can't change cached data.
+    Hits, misses and evictions are counted in Instrumentation as
+    "cache_hits", "cache_misses" and "cache_evictions"
+    """
+    _caches: Dict[str, ReadCache] = {}
+    _caches_lock = threading.Lock()
+
+    def __init__(self, collection: str, max_size: int, ttl: Optional[float] = None):
+        if max_size <= 0:
+            raise ValueError(f"Cache size of {collection} should be positive, got {max_size}")
+        self.collection = collection
+        self.max_size = max_size
+        self.ttl = ttl
+        self._docs: OrderedDict[str, Tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_collection(cls, collection: str, max_size: int, ttl: Optional[float] = None) -> ReadCache:
+        """
+        Get process-wide cache of a collection, it is created on the first call
+
+        Args:
+            collection: collection name
+            max_size: max number of cached documents
+            ttl: seconds a document is cached for; if None, documents don't expire
+
+        Returns:
+            ReadCache
+        """
+        with cls._caches_lock:
+            cache = cls._caches.get(collection)
+            if cache is None:
+                cache = cls._caches[collection] = cls(collection, max_size, ttl)
+            return cache
+
+    @classmethod
+    def clear_all(cls) -> None:
+        """
+        Clear caches of all collections
+
+        Returns:
+            None
+        """
+        with cls._caches_lock:
+            caches = list(cls._caches.values())
+        for cache in caches:
+            cache.clear()
+
+    @classmethod
+    def invalidate_ids(cls, collection: str, ids: List[Any]) -> None:
+        """
+        Remove documents from cache of a collection, if there is one.
+        Used as invalidation bus callback
+
+        Args:
+            collection: collection name
+            ids: list with ids as str or ObjectId
+
+        Returns:
+            None
+        """
+        cache = cls._caches.get(collection)
+        if cache is None:
+            return
+        for _id in ids:
+            cache.invalidate(_id)
+
+    def get(self, _id: Any) -> Optional[dict]:
+        """
+        Get copy of cached document
+
+        Args:
+            _id: id as str or ObjectId
+
+        Returns:
+            document or None if it is not cached or expired
+        """
+        key = str(_id)
+        with self._lock:
+            cached = self._docs.get(key)
+            if cached is not None and self.ttl is not None and time.monotonic() - cached[0] > self.ttl:
+                del self._docs[key]
+                Instrumentation().increment("cache_evictions", self.collection)
+                cached = None
+            if cached is None:
+                Instrumentation().increment("cache_misses", self.collection)
+                return None
+            self._docs.move_to_end(key)
+        Instrumentation().increment("cache_hits", self.collection)
+
+        return copy.deepcopy(cached[1])
+
+    def set(self, _id: Any, mongo_doc: dict) -> None:
+        """
+        Cache copy of document, least recently used documents are evicted if cache is full
+
+        Args:
+            _id: id as str or ObjectId
+            mongo_doc: raw document from mongo
+
+        Returns:
+            None
+        """
+        key = str(_id)
+        cached = (time.monotonic(), copy.deepcopy(mongo_doc))
+        with self._lock:
+            self._docs[key] = cached
+            self._docs.move_to_end(key)
+            evicted = 0
+            while len(self._docs) > self.max_size:
+                self._docs.popitem(last=False)
+                evicted += 1
+        if evicted:
+            Instrumentation().increment("cache_evictions", self.collection, evicted)
+
+    def invalidate(self, _id: Any) -> None:
+        """
+        Remove document from cache if it is there
+
+        Args:
+            _id: id as str or ObjectId
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._docs.pop(str(_id), None)
+
+    def clear(self) -> None:
+        """
+        Remove all documents from cache
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._docs.clear()
+
+    def __len__(self) -> int:
+        return len(self._docs)
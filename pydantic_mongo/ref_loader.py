@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import typing
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRefLoader:
+    """
+    Batches loading of referenced models requested during one event loop tick.
+    Requests are grouped by collection, each collection is loaded with one `$in` query
+    and all collections are loaded concurrently
+    """
+    _loaders: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.pending: Dict[str, Tuple[type, Dict[str, List[asyncio.Future]]]] = {}
+        self.scheduled = False
+
+    @classmethod
+    def get(cls) -> AsyncRefLoader:
+        """
+        Get loader of the running event loop
+
+        Returns:
+            AsyncRefLoader
+        """
+        loop = asyncio.get_running_loop()
+        loader = cls._loaders.get(loop)
+        if loader is None:
+            loader = cls._loaders[loop] = cls(loop)
+        return loader
+
+    def load(self, model_cls: type, _id: Any) -> asyncio.Future:
+        """
+        Request document of a model by id, the request is sent with others on the next loop tick
+
+        Args:
+            model_cls: BasePydanticMongoModel-inherited model
+            _id: id of the document
+
+        Returns:
+            future with dict with db refs as models or None if not found
+        """
+        future = self.loop.create_future()
+        _, futures_by_id = self.pending.setdefault(model_cls.collection_name, (model_cls, {}))
+        futures_by_id.setdefault(str(_id), []).append(future)
+
+        if not self.scheduled:
+            self.scheduled = True
+            self.loop.call_soon(self._flush)
+
+        return future
+
+    def _flush(self) -> None:
+        pending, self.pending, self.scheduled = self.pending, {}, False
+        self.loop.create_task(self._resolve(pending))
+
+    async def _resolve(self, pending: Dict[str, Tuple[type, Dict[str, List[asyncio.Future]]]]) -> None:
+        await asyncio.gather(*(
+            self._resolve_collection(model_cls, futures_by_id) for model_cls, futures_by_id in pending.values()
+        ))
+
+    @staticmethod
+    async def _resolve_collection(model_cls: type, futures_by_id: Dict[str, List[asyncio.Future]]) -> None:
+        logger.debug(f"Loading {len(futures_by_id)} refs of {model_cls.collection_name}")
+        docs: Optional[Dict[str, dict]] = None
+        error: Optional[BaseException] = None
+        try:
+            docs = await model_cls._aget_docs_by_ids(list(futures_by_id))
+        except Exception as e:
+            error = e
+
+        for _id, futures in futures_by_id.items():
+            for future in futures:
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(docs.get(_id))
+
+
+async def gather_unloaded(models: typing.Iterable[Any]) -> None:
+    """
+    Load all unloaded models concurrently, requests are batched by AsyncRefLoader
+
+    Args:
+        models: models, loaded ones are skipped
+
+    Returns:
+        None
+    """
+    unloaded = {id(model): model for model in models if not getattr(model, "__is_loaded__", True)}
+    if unloaded:
+        await asyncio.gather(*(model._aload() for model in unloaded.values()))
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from bson import ObjectId
+
+from pydantic_mongo.instrumentation import Instrumentation
+
+SCALAR_TYPES = (str, int, float, bool, ObjectId, type(None))
+
+
+class CollectionReplica:
+    """
+    Read-only copy of a whole collection in memory, documents are kept in an immutable mapping by id
+    with optional secondary indexes by field values. Replica is loaded on first access and reloaded
+    when it is older than refresh interval or after invalidation. Documents are copied on read.
+    Lookups are counted in Instrumentation as "replica_hits"
+    """
+    _replicas: Dict[str, CollectionReplica] = {}
+    _replicas_lock = threading.Lock()
+
+    def __init__(self, collection: str, loader: Callable[[], Iterable[dict]],
+                 index_fields: Sequence[str] = (), refresh_interval: Optional[float] = None):
+        self.collection = collection
+        self.loader = loader
+        self.index_fields = tuple(index_fields)
+        self.refresh_interval = refresh_interval
+        self._docs: Mapping[str, dict] = MappingProxyType({})
+        self._indexes: Mapping[str, Mapping[Any, Tuple[str, ...]]] = MappingProxyType({})
+        self._loaded_at: Optional[float] = None
+        # bumped by every invalidation, a load started before it doesn't mark replica fresh
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+
+    @classmethod
+    def for_collection(cls, collection: str, loader: Callable[[], Iterable[dict]],
+                       index_fields: Sequence[str] = (), refresh_interval: Optional[float] = None
+                       ) -> CollectionReplica:
+        """
+        Get process-wide replica of a collection, it is created on the first call
+
+        Args:
+            collection: collection name
+            loader: function that returns all documents of the collection
+            index_fields: fields to build secondary indexes for
+            refresh_interval: seconds after which replica is reloaded; if None, only invalidation reloads it
+
+        Returns:
+            CollectionReplica
+        """
+        with cls._replicas_lock:
+            replica = cls._replicas.get(collection)
+            if replica is None:
+                replica = cls._replicas[collection] = cls(collection, loader, index_fields, refresh_interval)
+            return replica
+
+    @classmethod
+    def invalidate_ids(cls, collection: str, ids: List[Any]) -> None:
+        """
+        Mark replica of a collection stale, if there is one. Used as invalidation bus callback
+
+        Args:
+            collection: collection name
+            ids: list with ids of changed documents
+
+        Returns:
+            None
+        """
+        replica = cls._replicas.get(collection)
+        if replica is not None:
+            replica.invalidate()
+
+    @property
+    def is_fresh(self) -> bool:
+        """
+        True if replica is loaded and not older than refresh interval
+        """
+        if self._loaded_at is None:
+            return False
+        return self.refresh_interval is None or time.monotonic() - self._loaded_at <= self.refresh_interval
+
+    def refresh(self, force: bool = True) -> None:
+        """
+        Load all documents of the collection and replace current data and indexes at once.
+        Replica loaded while it was invalidated stays stale
+
+        Args:
+            force: if False, replica is not reloaded if it was refreshed by another thread meanwhile
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if not force and self.is_fresh:
+                return
+            generation, loaded_at = self._generation, time.monotonic()
+            docs: Dict[str, dict] = {str(mongo_doc["_id"]): mongo_doc for mongo_doc in self.loader()}
+            indexes: Dict[str, Dict[Any, List[str]]] = {field: {} for field in self.index_fields}
+            for _id, mongo_doc in docs.items():
+                for field, index in indexes.items():
+                    for value in self._get_index_values(mongo_doc.get(field)):
+                        index.setdefault(value, []).append(_id)
+
+            self._docs = MappingProxyType(docs)
+            self._indexes = MappingProxyType({
+                field: MappingProxyType({value: tuple(ids) for value, ids in index.items()})
+                for field, index in indexes.items()
+            })
+            with self._state_lock:
+                if generation == self._generation:
+                    self._loaded_at = loaded_at
+
+    def invalidate(self) -> None:
+        """
+        Mark replica stale, it is reloaded on next access
+
+        Returns:
+            None
+        """
+        with self._state_lock:
+            self._generation += 1
+            self._loaded_at = None
+
+    def supports(self, filter: Mapping[str, Any]) -> bool:
+        """
+        Check if filter can be answered by replica: only equality on top-level fields with scalar values
+
+        Args:
+            filter: prepared filter dict
+
+        Returns:
+            True if filter is supported
+        """
+        return all(
+            not field.startswith("$") and "." not in field and isinstance(value, SCALAR_TYPES)
+            for field, value in filter.items()
+        )
+
+    def find_one(self, filter: Mapping[str, Any]) -> Optional[dict]:
+        """
+        Get copy of the first document matching supported filter, replica is loaded if it is not fresh
+
+        Args:
+            filter: prepared filter dict, see `supports`
+
+        Returns:
+            document or None if not found
+        """
+        if not self.is_fresh:
+            self.refresh(force=False)
+        docs, indexes = self._docs, self._indexes
+
+        if "_id" in filter:
+            candidates: Iterable[str] = (str(filter["_id"]),)
+        else:
+            indexed = [field for field in filter if field in indexes]
+            candidates = indexes[indexed[0]].get(self._hashable(filter[indexed[0]]), ()) if indexed else docs
+
+        Instrumentation().increment("replica_hits", self.collection)
+        for _id in candidates:
+            mongo_doc = docs.get(_id)
+            if mongo_doc is not None and all(self._matches(mongo_doc, field, value) for field, value in filter.items()):
+                return copy.deepcopy(mongo_doc)
+
+        return None
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    @classmethod
+    def _matches(cls, mongo_doc: dict, field: str, value: Any) -> bool:
+        doc_value = mongo_doc.get(field)
+        doc_values = doc_value if isinstance(doc_value, list) else [doc_value]
+        return cls._hashable(value) in [cls._hashable(item) for item in doc_values]
+
+    @classmethod
+    def _get_index_values(cls, value: Any) -> List[Any]:
+        values = value if isinstance(value, list) else [value]
+        return [cls._hashable(item) for item in values if isinstance(item, SCALAR_TYPES)]
+
+    @staticmethod
+    def _hashable(value: Any) -> Any:
+        # True == 1 in python, but not in mongo
+        return (type(value) is bool, value)
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+_current_identity_map: ContextVar[Optional["IdentityMap"]] = ContextVar("pydantic_mongo_identity_map", default=None)
+
+
+class IdentityMap:
+    """
+    Maps (collection, id) to the single model instance used within a session.
+    Instances are held by weak references, so they are dropped as soon as they are not used anymore
+    """
+    def __init__(self):
+        self._instances: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+
+    @staticmethod
+    def current() -> Optional[IdentityMap]:
+        """
+        Get identity map of the current session
+
+        Returns:
+            IdentityMap or None if there is no active session
+        """
+        return _current_identity_map.get()
+
+    def get(self, collection: str, _id: Any) -> Optional[Any]:
+        """
+        Get model instance by collection and id
+
+        Args:
+            collection: collection name
+            _id: id as str or ObjectId
+
+        Returns:
+            model instance or None if not found
+        """
+        return self._instances.get((collection, str(_id)))
+
+    def add(self, collection: str, _id: Any, instance: Any) -> None:
+        """
+        Add model instance to identity map
+
+        Args:
+            collection: collection name
+            _id: id as str or ObjectId
+            instance: model instance
+
+        Returns:
+            None
+        """
+        self._instances[(collection, str(_id))] = instance
+
+    def remove(self, collection: str, _id: Any) -> None:
+        """
+        Remove model instance from identity map if it is there
+
+        Args:
+            collection: collection name
+            _id: id as str or ObjectId
+
+        Returns:
+            None
+        """
+        self._instances.pop((collection, str(_id)), None)
+
+    def clear(self) -> None:
+        """
+        Remove all instances from identity map
+
+        Returns:
+            None
+        """
+        self._instances.clear()
+
+    def __len__(self) -> int:
+        return len(self._instances)
+
+
+@contextmanager
+def session() -> Iterator[IdentityMap]:
+    """
+    Start a session with its own identity map. Within the session every document is represented
+    by one model instance and models already loaded by id are taken from memory
+
+    Returns:
+        context manager with IdentityMap of the session
+    """
+    identity_map = IdentityMap()
+    token = _current_identity_map.set(identity_map)
+    try:
+        yield identity_map
+    finally:
+        try:
+            _current_identity_map.reset(token)
+        except ValueError:
+            # the session was started in another context, e.g. by a request hook
+            _current_identity_map.set(None)
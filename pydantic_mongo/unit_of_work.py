@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import logging
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import DeleteOne, InsertOne, UpdateOne
+
+from pydantic_mongo.session import IdentityMap
+
+logger = logging.getLogger(__name__)
+
+_current_unit_of_work: ContextVar[Optional["UnitOfWork"]] = ContextVar("pydantic_mongo_unit_of_work", default=None)
+
+SAVE = "save"
+DELETE = "delete"
+
+
+class UnitOfWork:
+    """
+    Records `save()` and `delete()` calls instead of executing them and writes them on `flush()`
+    as one unordered `bulk_write` per collection. The last recorded operation of a document wins
+    """
+    def __init__(self):
+        self._operations: Dict[Tuple[str, str], Tuple[str, Any]] = {}
+        self._new: Set[Tuple[str, str]] = set()
+        # deleted documents whose `on_delete` rules are applied after they are written
+        self._cascade: Set[Tuple[str, str]] = set()
+
+    @staticmethod
+    def current() -> Optional[UnitOfWork]:
+        """
+        Get unit of work of the current context
+
+        Returns:
+            UnitOfWork or None if there is no active unit of work
+        """
+        return _current_unit_of_work.get()
+
+    def register_save(self, model: Any) -> None:
+        """
+        Record saving of a model. Models without id get an ObjectId generated on the client,
+        so they can be referenced before they are written. Unsaved referenced models are recorded as well
+
+        Args:
+            model: PydanticMongoModel
+
+        Returns:
+            None
+        """
+        if model.__db_ref__ is None and model.id is None:
+            model.id = str(ObjectId())
+            self._new.add(self._get_key(model))
+        self._operations[self._get_key(model)] = (SAVE, model)
+        self._cascade.discard(self._get_key(model))
+
+        identity_map = IdentityMap.current()
+        if identity_map is not None:
+            identity_map.add(model.collection_name, model.db_ref.id, model)
+
+        for ref in model._get_unsaved_refs():
+            self.register_save(ref)
+
+    def register_delete(self, model: Any, cascade: bool = False) -> None:
+        """
+        Record deleting of a model, a model that was not written yet is just forgotten
+
+        Args:
+            model: PydanticMongoModel with id
+            cascade: if True, `on_delete` rules of models referencing the document are applied after it is written
+
+        Returns:
+            None
+        """
+        key = self._get_key(model)
+        if key in self._new:
+            self._new.discard(key)
+            self._operations.pop(key, None)
+            model._set_deleted(invalidate=False)
+        else:
+            self._operations[key] = (DELETE, model)
+            if cascade:
+                self._cascade.add(key)
+            else:
+                self._cascade.discard(key)
+
+    def flush(self) -> None:
+        """
+        Write all recorded operations, one unordered `bulk_write` per collection.
+        If a bulk write fails, operations of this and not yet written collections stay recorded
+
+        Returns:
+            None
+        """
+        for collection_name, operations in self._get_operations_by_collection().items():
+            requests, written = self._get_requests(operations)
+            if requests:
+                logger.debug(f"Flushing {len(requests)} operations to {collection_name}")
+                operations[0][2].collection().bulk_write(requests, ordered=False)
+            cascade_ids = self._get_cascade_ids(written)
+            changes = self._set_written(written)
+            if changes:
+                operations[0][2]._apply_counter_changes(changes)
+            if cascade_ids:
+                operations[0][2]._apply_delete_rules(cascade_ids, {(collection_name, str(_id)) for _id in cascade_ids})
+
+    async def aflush(self) -> None:
+        """
+        Async version of `flush`
+
+        Returns:
+            None
+        """
+        for collection_name, operations in self._get_operations_by_collection().items():
+            requests, written = self._get_requests(operations)
+            if requests:
+                logger.debug(f"Flushing {len(requests)} operations to {collection_name}")
+                await (await operations[0][2].acollection()).bulk_write(requests, ordered=False)
+            cascade_ids = self._get_cascade_ids(written)
+            changes = self._set_written(written)
+            if changes:
+                await operations[0][2]._aapply_counter_changes(changes)
+            if cascade_ids:
+                # rules are applied with the sync engine, as by `delete_many`
+                operations[0][2]._apply_delete_rules(cascade_ids, {(collection_name, str(_id)) for _id in cascade_ids})
+
+    def _get_operations_by_collection(self) -> Dict[str, List[Tuple[Tuple[str, str], str, Any]]]:
+        by_collection: Dict[str, List[Tuple[Tuple[str, str], str, Any]]] = defaultdict(list)
+        for key, (operation, model) in self._operations.items():
+            by_collection[key[0]].append((key, operation, model))
+
+        return by_collection
+
+    def _get_requests(self, operations: List[Tuple[Tuple[str, str], str, Any]]
+                      ) -> Tuple[List[Any], List[Tuple[Tuple[str, str], Any, Optional[dict]]]]:
+        """
+        Get bulk write requests for recorded operations of one collection
+
+        Args:
+            operations: list with key, operation and model
+
+        Returns:
+            tuple with list of requests and list of key, model and written data (None for deleted models)
+        """
+        requests, written = [], []
+        for key, operation, model in operations:
+            obj_id = ObjectId(key[1])
+            if operation == DELETE:
+                requests.append(DeleteOne({"_id": obj_id}))
+                written.append((key, model, None))
+                continue
+            data = model._model_dump_db(inserted=key in self._new)
+            if key in self._new:
+                requests.append(InsertOne({**data, "_id": obj_id}))
+            elif not model._is_unchanged(data):
+                requests.append(UpdateOne({"_id": obj_id}, {"$set": data}))
+            written.append((key, model, data))
+
+        return requests, written
+
+    def _get_cascade_ids(self, written: List[Tuple[Tuple[str, str], Any, Optional[dict]]]) -> List[ObjectId]:
+        """
+        Get ids of written deleted models recorded with `cascade`
+
+        Args:
+            written: list with key, model and written data from `_get_requests`
+
+        Returns:
+            list with ids
+        """
+        keys = [key for key, _, data in written if data is None and key in self._cascade]
+        self._cascade.difference_update(keys)
+        return [ObjectId(key[1]) for key in keys]
+
+    def _set_written(self, written: List[Tuple[Tuple[str, str], Any, Optional[dict]]]) -> Counter:
+        """
+        Forget written operations and update state of their models
+
+        Args:
+            written: list with key, model and written data from `_get_requests`
+
+        Returns:
+            changes of counter caches of written models
+        """
+        changed_ids, inserted_ids = [], []
+        changes = Counter()
+        for key, model, data in written:
+            self._operations.pop(key, None)
+            inserted = key in self._new
+            (inserted_ids if inserted else changed_ids).append(key[1])
+            self._new.discard(key)
+            if data is None:
+                changes.update(model._set_deleted(invalidate=False))
+            else:
+                changes.update(model._set_saved(data, ObjectId(key[1]), invalidate=False, inserted=inserted))
+        if written:
+            written[0][1]._invalidate_cached(changed_ids)
+            written[0][1]._invalidate_cached(inserted_ids, inserted=True)
+
+        return changes
+
+    def rollback(self) -> None:
+        """
+        Forget all recorded operations, models that were not written get their id reset
+
+        Returns:
+            None
+        """
+        identity_map = IdentityMap.current()
+        for key in self._new:
+            _, model = self._operations.get(key, (None, None))
+            if model is None:
+                continue
+            if identity_map is not None:
+                identity_map.remove(*key)
+            model.id = None
+            model.__db_ref__ = None
+        self._operations.clear()
+        self._new.clear()
+        self._cascade.clear()
+
+    @staticmethod
+    def _get_key(model: Any) -> Tuple[str, str]:
+        return model.collection_name, str(model.db_ref.id)
+
+    def __len__(self) -> int:
+        return len(self._operations)
+
+
+@contextmanager
+def unit_of_work() -> Iterator[UnitOfWork]:
+    """
+    Start a unit of work: `save()` and `delete()` are recorded and flushed as bulk writes when the block exits.
+    If the block raises, recorded operations are rolled back instead
+
+    Returns:
+        context manager with UnitOfWork
+    """
+    work = UnitOfWork()
+    token = _current_unit_of_work.set(work)
+    try:
+        yield work
+    except BaseException:
+        work.rollback()
+        raise
+    else:
+        work.flush()
+    finally:
+        try:
+            _current_unit_of_work.reset(token)
+        except ValueError:
+            # the unit of work was started in another context, e.g. by a request hook
+            _current_unit_of_work.set(None)
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ErrorCallback = Callable[[Exception, List[dict]], None]
+
+
+class WriteBehindBuffer:
+    """
+    Bounded buffer of encoded documents of one collection which are inserted with `insert_many`
+    from a background thread when `batch_size` documents are buffered or `flush_interval` seconds passed.
+    `put` blocks when buffer is full, so producers can't outrun the database.
+    Buffers are flushed on interpreter shutdown
+    """
+    _buffers: Dict[str, WriteBehindBuffer] = {}
+    _buffers_lock = threading.Lock()
+
+    def __init__(self, collection: str, get_collection: Callable[[], Any], max_size: int = 10000,
+                 batch_size: int = 1000, flush_interval: float = 1.0, put_timeout: Optional[float] = None,
+                 on_error: Optional[ErrorCallback] = None, on_written: Optional[Callable[[List[Any]], None]] = None):
+        if batch_size <= 0 or max_size <= 0:
+            raise ValueError(f"Write-behind buffer sizes of {collection} should be positive")
+        self.collection = collection
+        self.get_collection = get_collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.on_error = on_error
+        self.on_written = on_written
+        self._queue: queue.Queue = queue.Queue(maxsize=max_size)
+        self._flush_requested = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+    @classmethod
+    def for_collection(cls, collection: str, get_collection: Callable[[], Any], **kwargs) -> WriteBehindBuffer:
+        """
+        Get process-wide buffer of a collection, it is created on the first call
+
+        Args:
+            collection: collection name
+            get_collection: function that returns pymongo collection
+            **kwargs: kwargs for WriteBehindBuffer
+
+        Returns:
+            WriteBehindBuffer
+        """
+        with cls._buffers_lock:
+            buffer = cls._buffers.get(collection)
+            if buffer is None:
+                buffer = cls._buffers[collection] = cls(collection, get_collection, **kwargs)
+            return buffer
+
+    @classmethod
+    def close_all(cls) -> None:
+        """
+        Write buffered documents of all collections and stop background threads
+
+        Returns:
+            None
+        """
+        with cls._buffers_lock:
+            buffers = list(cls._buffers.values())
+        for buffer in buffers:
+            buffer.close()
+
+    def put(self, mongo_doc: dict) -> None:
+        """
+        Add encoded document to buffer, waits while buffer is full
+
+        Args:
+            mongo_doc: document ready for mongo, with `_id`
+
+        Returns:
+            None
+        """
+        self._start()
+        try:
+            self._queue.put(mongo_doc, timeout=self.put_timeout)
+        except queue.Full:
+            raise TimeoutError(f"Write-behind buffer of {self.collection} is full")
+
+    def try_put(self, mongo_doc: dict) -> bool:
+        """
+        Add encoded document to buffer if it is not full
+
+        Args:
+            mongo_doc: document ready for mongo, with `_id`
+
+        Returns:
+            True if document was added
+        """
+        self._start()
+        try:
+            self._queue.put_nowait(mongo_doc)
+        except queue.Full:
+            return False
+        return True
+
+    def flush(self) -> None:
+        """
+        Write all buffered documents and wait until they are written
+
+        Returns:
+            None
+        """
+        if self._thread is None:
+            self._write_batches()
+            return
+        self._flush_requested.set()
+        self._queue.join()
+
+    def close(self) -> None:
+        """
+        Write all buffered documents and stop background thread
+
+        Returns:
+            None
+        """
+        self.flush()
+        self._stopped.set()
+        self._flush_requested.set()
+        with self._thread_lock:
+            if self._thread is not None:
+                self._thread.join()
+                self._thread = None
+        self._stopped.clear()
+        self._flush_requested.clear()
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def _start(self) -> None:
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"pydantic-mongo-write-behind-{self.collection}", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            batch: List[dict] = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and not self._flush_requested.is_set():
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=min(timeout, 0.1)))
+                except queue.Empty:
+                    continue
+            if self._flush_requested.is_set():
+                self._write_batches(batch)
+                self._flush_requested.clear()
+            else:
+                self._write(batch)
+
+    def _write_batches(self, batch: Optional[List[dict]] = None) -> None:
+        """
+        Write all documents which are in the queue now
+
+        Args:
+            batch: documents already taken from the queue, they are written first
+
+        Returns:
+            None
+        """
+        while True:
+            batch = batch or []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            self._write(batch)
+            batch = None
+
+    def _write(self, batch: List[dict]) -> None:
+        if not batch:
+            return
+        try:
+            self.get_collection().insert_many(batch, ordered=False)
+            if self.on_written is not None:
+                self.on_written([mongo_doc["_id"] for mongo_doc in batch])
+        except Exception as e:
+            logger.exception(f"Failed to write {len(batch)} documents to {self.collection}")
+            if self.on_error is not None:
+                try:
+                    self.on_error(e, batch)
+                except Exception:
+                    logger.exception(f"Write-behind error callback of {self.collection} failed")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+
+atexit.register(WriteBehindBuffer.close_all)
@@ -16,5 +16,8 @@ setup(
         "pydantic~=2.4.2",
         "pymongo~=4.6.0",
         "Flask-PyMongo~=2.3.0"
-    ]
+    ],
+    extras_require={
+        "async": ["motor~=3.3.2"]
+    }
 )
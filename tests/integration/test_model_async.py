@@ -0,0 +1,102 @@
+import asyncio
+from typing import Optional, List
+
+import pytest
+
+from pydantic_mongo import PydanticMongo, PydanticMongoModel as PMM
+from tests.config import TestConfig
+
+
+@pytest.fixture(scope="function")
+def async_mongo(mongo):
+    pydantic_mongo = PydanticMongo()
+
+    yield pydantic_mongo
+
+    pydantic_mongo.async_db = None
+
+
+def run(coroutine):
+    async def wrapper():
+        PydanticMongo().init_async(TestConfig.MONGO_URI)
+        return await coroutine
+
+    return asyncio.run(wrapper())
+
+
+def test_async_save_and_load(async_mongo):
+    class NestedModel(PMM):
+        age: int
+
+    class TestModel(PMM):
+        name: str
+        nested_model: Optional[NestedModel] = None
+
+    async def main():
+        nested_model = await NestedModel(age=10).asave()
+        test_model = await TestModel(name="test", nested_model=nested_model).asave()
+        assert test_model.id is not None
+
+        loaded = await TestModel.aget_by_id(test_model.id)
+        assert loaded.name == "test"
+        assert loaded.nested_model.__is_loaded__ is False
+
+        await loaded.nested_model.aload()
+        assert loaded.nested_model.age == 10
+
+        loaded.name = "updated"
+        await loaded.asave()
+        assert (await TestModel.aget_by_filter({"name": "updated"})).id == test_model.id
+
+        await loaded.adelete()
+        assert await TestModel.aget_by_id(test_model.id) is None
+
+    run(main())
+
+
+def test_async_objects_and_bulk(async_mongo):
+    class TestModel(PMM):
+        source: str
+        external_id: str
+
+    async def main():
+        models = await TestModel.aupsert_many([
+            TestModel(source="src", external_id="1"),
+            TestModel(source="src", external_id="2"),
+        ], on=["source", "external_id"])
+        assert all(model.id is not None for model in models)
+
+        same = await TestModel(source="src", external_id="1").aupsert(on=["source", "external_id"])
+        assert same.id == models[0].id
+
+        assert len([model async for model in TestModel.aobjects({"source": "src"})]) == 2
+        assert await TestModel.apatch(models[1].id, {"external_id": "3"}) is True
+
+        ref_model = await TestModel.afrom_ref(models[1].db_ref, unloaded=False)
+        assert ref_model.external_id == "3"
+
+    run(main())
+
+
+def test_async_lazy_refs(async_mongo):
+    class NestedModel(PMM):
+        age: int
+
+    class TestModel(PMM):
+        name: str
+        nested_model: NestedModel
+        nested_models: List[NestedModel] = []
+
+    async def main():
+        nested_models = [await NestedModel(age=age).asave() for age in range(3)]
+        await TestModel(name="test1", nested_model=nested_models[0], nested_models=nested_models[1:]).asave()
+        await TestModel(name="test2", nested_model=nested_models[1]).asave()
+
+        models = [model async for model in TestModel.aobjects()]
+        assert (await models[0].nested_model).age == 0
+
+        await TestModel.afetch_related(models, "nested_model", "nested_models")
+        assert models[1].nested_model.__is_loaded__
+        assert [model.age for model in models[0].nested_models] == [1, 2]
+
+    run(main())
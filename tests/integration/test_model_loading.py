@@ -197,3 +197,25 @@ def test_loading_all_objects_by_filter(mongo):
 
     assert len(list(test_models)) == 1
     assert test_models[0].age == 20
+
+
+def test_loading_in_session(mongo):
+    class NestedModel(PMM):
+        age: int
+
+    class TestModel(PMM):
+        name: str
+        nested_model: NestedModel
+
+    nested_model = NestedModel(age=10).save()
+    TestModel(name="test1", nested_model=nested_model).save()
+    TestModel(name="test2", nested_model=nested_model).save()
+
+    with mongo.session():
+        models = list(TestModel.objects())
+        assert models[0].nested_model is models[1].nested_model
+        assert models[0].nested_model.age == 10
+        assert NestedModel.get_by_id(nested_model.id) is models[1].nested_model
+        assert TestModel.get_by_id(models[0].id) is models[0]
+
+    assert TestModel.get_by_id(models[0].id) is not models[0]
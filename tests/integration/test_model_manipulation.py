@@ -91,6 +91,52 @@ def test_delete(mongo):
     assert len(list(TestModel.objects())) == 0
 
 
+def test_patch(mongo):
+    class NestedModel(PMM):
+        age: int
+
+    class TestModel(PMM):
+        name: str
+        age: int
+        nested_model: Optional[NestedModel] = None
+
+    nested_model = NestedModel(age=10).save()
+    test_model = TestModel(name="test", age=20).save()
+
+    assert TestModel.patch(test_model.id, {"age": 30, "nested_model": nested_model}) is True
+    assert TestModel.patch(str(ObjectId()), {"age": 30}) is False
+
+    patched = TestModel.patch(test_model.id, {"name": "patched"}, return_model=True)
+    assert patched.name == "patched"
+    assert patched.age == 30
+    assert patched.nested_model.age == 10
+
+    with pytest.raises(ValueError):
+        TestModel.patch(test_model.id, {"unknown": 1})
+
+
+def test_upsert(mongo):
+    class TestModel(PMM):
+        source: str
+        external_id: str
+        name: str
+
+    test_model = TestModel(source="src", external_id="1", name="test").upsert(on=["source", "external_id"])
+    assert test_model.id is not None
+
+    same_model = TestModel(source="src", external_id="1", name="updated").upsert(on=["source", "external_id"])
+    assert same_model.id == test_model.id
+    assert TestModel.get_by_id(test_model.id).name == "updated"
+
+    models = TestModel.upsert_many([
+        TestModel(source="src", external_id="1", name="bulk"),
+        TestModel(source="src", external_id="2", name="bulk"),
+    ], on=["source", "external_id"])
+    assert models[0].id == test_model.id
+    assert models[1].id is not None
+    assert len(list(TestModel.objects({"name": "bulk"}))) == 2
+
+
 def test_model_dump(mongo):
     class TestModel(PMM):
         name: str
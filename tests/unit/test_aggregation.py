@@ -0,0 +1,122 @@
+import unittest
+from typing import Optional
+
+from bson import DBRef, ObjectId
+
+from pydantic_mongo.aggregation import facet, group, match, prepare_pipeline
+from pydantic_mongo.base_pm_model import BasePydanticMongoModel
+from pydantic_mongo.query import QueryFields
+from tests.unit.base import BaseTest
+
+
+class AggregationCustomer(BasePydanticMongoModel):
+    name: str
+
+
+class AggregationOrder(BasePydanticMongoModel):
+    customer: Optional[AggregationCustomer] = None
+    amount: int = 0
+
+
+class AliasedOrder(BasePydanticMongoModel):
+    created_at: str = ""
+    total: int = 0
+
+    class _MongoConfig:
+        storage_aliases = {"created_at": "ca", "total": "t"}
+
+
+class TestAggregation(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.q = QueryFields(AggregationOrder)
+
+    def test_match(self):
+        self.assertEqual({"$match": {"amount": {"$gt": 1}}}, match(self.q.amount > "1"))
+        self.assertEqual({"$match": {"amount": 1}}, match({"amount": 1}))
+
+    def test_group(self):
+        self.assertEqual(
+            {"$group": {"_id": "$customer", "total": {"$sum": "$amount"}, "count": {"$sum": 1}}},
+            group(self.q.customer, total={"$sum": self.q.amount}, count={"$sum": 1})
+        )
+        self.assertEqual({"$group": {"_id": "$amount"}}, group("amount"))
+        self.assertEqual(
+            {"$group": {"_id": {"c": "$customer", "a": "$amount"}}}, group({"c": "customer", "a": "$amount"})
+        )
+        self.assertEqual({"$group": {"_id": None, "ids": {"$push": "$_id"}}}, group(None, ids={"$push": self.q.id}))
+
+    def test_facet(self):
+        self.assertEqual(
+            {"$facet": {"count": [{"$count": "n"}], "by": [{"$group": {"_id": "$amount"}}]}},
+            facet(count=({"$count": "n"},), by=[group(self.q.amount)])
+        )
+
+    def test_prepare_pipeline(self):
+        obj_id = ObjectId()
+        pipeline = [
+            {"$match": {"_id": str(obj_id)}},
+            {"$facet": {"big": [{"$match": self.q.amount > 10}, {"$match": {"_id": str(obj_id)}}]}},
+            {"$match": self.q.amount > 1},
+            {"$group": {"_id": "$status"}},
+            {"$match": {"_id": "paid"}},
+            {"$match": self.q.amount < 5},
+        ]
+        self.assertEqual([
+            {"$match": {"_id": obj_id}},
+            {"$facet": {"big": [{"$match": {"amount": {"$gt": 10}}}, {"$match": {"_id": obj_id}}]}},
+            {"$match": {"amount": {"$gt": 1}}},
+            {"$group": {"_id": "$status"}},
+            {"$match": {"_id": "paid"}},
+            {"$match": {"amount": {"$lt": 5}}},
+        ], prepare_pipeline(pipeline, AggregationOrder._prepare_filter))
+        self.assertEqual({"_id": str(obj_id)}, pipeline[0]["$match"])
+        self.assertEqual([{"$match": {"_id": str(obj_id)}}], prepare_pipeline([{"$match": {"_id": str(obj_id)}}]))
+
+        pipeline = [
+            {"$sort": {"amount": 1}}, {"$facet": {"top": [{"$sort": {"amount": -1}}]}}, {"$sort": {"amount": 1}}
+        ]
+        self.assertEqual(
+            [{"$sort": {"a": 1}}, {"$facet": {"top": [{"$sort": {"a": -1}}]}}, {"$sort": {"amount": 1}}],
+            prepare_pipeline(pipeline, get_stored_key=lambda key: {"amount": "a"}.get(key, key))
+        )
+
+        # group keys given by field names are renamed, paths of query fields are stored keys already
+        pipeline = [
+            group("created_at"), group({"day": "created_at", "t": QueryFields(AliasedOrder).total}),
+            {"$facet": {"by": [group("$created_at")]}},
+        ]
+        self.assertEqual([
+            {"$group": {"_id": "$ca"}}, {"$group": {"_id": {"day": "$created_at", "t": "$t"}}},
+            {"$facet": {"by": [{"$group": {"_id": "$created_at"}}]}},
+        ], prepare_pipeline(pipeline, get_stored_key=AliasedOrder._get_stored_key))
+        self.assertEqual(
+            [{"$group": {"_id": {"day": "$ca", "t": "$t"}}}],
+            prepare_pipeline([pipeline[1]], get_stored_key=AliasedOrder._get_stored_key)
+        )
+
+    def test_process_aggregate_row(self):
+        customer_id = ObjectId()
+        ref = DBRef(AggregationCustomer.collection_name, str(customer_id))
+
+        row = AggregationOrder._process_aggregate_row({"_id": ref, "total": 3})
+        self.assertIsInstance(row["_id"], AggregationCustomer)
+        self.assertEqual(str(customer_id), row["_id"].db_ref.id)
+        self.assertEqual({"_id": str(customer_id)}, AggregationOrder._process_aggregate_row({"_id": customer_id}))
+
+        # output keys of groups are not renamed even if they are equal to aliases
+        self.assertEqual({"_id": "2024", "ca": 1}, AliasedOrder._process_aggregate_row({"_id": "2024", "ca": 1}))
+        self.assertEqual(
+            {"_id": "x", "created_at": "2024"},
+            AliasedOrder._process_aggregate_row({"_id": "x", "ca": "2024"}, documents=True)
+        )
+
+        order = AggregationOrder._process_aggregate_row(
+            {"_id": ObjectId(), "customer": ref, "amount": 3}, output_model=AggregationOrder
+        )
+        self.assertIsInstance(order, AggregationOrder)
+        self.assertEqual(3, order.amount)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -40,20 +40,20 @@ class TestBaseModel(BaseTest):
             mock_pydanticmongo.return_value.db.__getitem__.return_value.create_indexes.assert_not_called()
 
     def test_no_indexes_created_when_cls_indexes_is_none(self):
-        with patch('pydantic_mongo.base.PydanticMongo') as mock_pydanticmongo:
+        with patch('pydantic_mongo.base.PydanticMongo') as mock_pydanticmongo, \
+                patch('pydantic_mongo.base.__Base._MongoConfig') as mock_mongo_config:
             mock_pydanticmongo.return_value.db.__getitem__.return_value.list_indexes.return_value = []
-            Base._MongoConfig = mock.Mock()
-            Base._MongoConfig.indexes = None
+            mock_mongo_config.indexes = None
             Base._init_indexes()
             mock_pydanticmongo.return_value.db.__getitem__.assert_not_called()
             mock_pydanticmongo.return_value.db.__getitem__.return_value.list_indexes.assert_not_called()
             mock_pydanticmongo.return_value.db.__getitem__.return_value.create_indexes.assert_not_called()
 
     def test_no_indexes_created_when_cls_indexes_is_empty_list(self):
-        with patch('pydantic_mongo.base.PydanticMongo') as mock_pydanticmongo:
+        with patch('pydantic_mongo.base.PydanticMongo') as mock_pydanticmongo, \
+                patch('pydantic_mongo.base.__Base._MongoConfig') as mock_mongo_config:
             mock_pydanticmongo.return_value.db.__getitem__.return_value.list_indexes.return_value = []
-            Base._MongoConfig = mock.Mock()
-            Base._MongoConfig.indexes = []
+            mock_mongo_config.indexes = []
             Base._init_indexes()
             mock_pydanticmongo.return_value.db.__getitem__.assert_not_called()
             mock_pydanticmongo.return_value.db.__getitem__.return_value.list_indexes.assert_not_called()
@@ -1,12 +1,19 @@
+import asyncio
 import unittest
+from collections import Counter
+from typing import Dict, Optional, List
 
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, patch, AsyncMock
 
 from bson import DBRef, ObjectId
 from bson.errors import InvalidId
-from pydantic import ValidationError as PydanticValidationError
+from pydantic import BaseModel, Field, ValidationError as PydanticValidationError, computed_field
+from pymongo import IndexModel, InsertOne
 
 from pydantic_mongo.base_pm_model import BasePydanticMongoModel
+from pydantic_mongo.instrumentation import Instrumentation
+from pydantic_mongo.meta import BaseMeta
+from pydantic_mongo.session import session
 from tests.unit.base import BaseTest
 
 
@@ -143,6 +150,916 @@ class TestBasePydanticMongoModel(BaseTest):
             self.assertEqual(model._save(), model)
             self.assertTrue(mock_collection.update_one_called)
 
+    def test_save_skips_unchanged(self):
+        class TestModel(BasePydanticMongoModel):
+            name: str
+
+            class _MongoConfig:
+                skip_unchanged_writes = True
+
+        obj_id = ObjectId()
+        mock_collection = MagicMock()
+        Instrumentation().reset()
+
+        with patch.object(TestModel, 'collection', return_value=mock_collection):
+            model = TestModel._process_mongo_doc({"_id": obj_id, "name": "test"})
+            self.assertIsNotNone(model.__digest__)
+
+            model._save()
+            mock_collection.update_one.assert_not_called()
+            self.assertEqual(1, Instrumentation().get("writes_skipped", TestModel.collection_name))
+
+            model.name = "changed"
+            model._save()
+            mock_collection.update_one.assert_called_once_with({"_id": obj_id}, {"$set": {"name": "changed"}})
+
+            model._save()
+            mock_collection.update_one.assert_called_once()
+            self.assertEqual(2, Instrumentation().get("writes_skipped"))
+
+        with patch.object(TestModel, '_MongoConfig', None):
+            self.assertIsNone(TestModel._get_digest({"_id": obj_id, "name": "test"}))
+
+    def test_identity_map(self):
+        class TestModel(BasePydanticMongoModel):
+            name: str
+
+        obj_id = ObjectId()
+        mock_collection = MagicMock()
+        mock_collection.find_one.return_value = {"_id": obj_id, "name": "test"}
+
+        with patch.object(TestModel, 'collection', return_value=mock_collection), session() as identity_map:
+            ref = TestModel._from_ref(DBRef(TestModel.collection_name, str(obj_id)))
+            self.assertIs(ref, TestModel._from_ref(DBRef(TestModel.collection_name, str(obj_id))))
+            self.assertIs(ref, identity_map.get(TestModel.collection_name, obj_id))
+
+            model = TestModel._get_by_filter({"_id": str(obj_id)})
+            self.assertIs(ref, model)
+            self.assertTrue(model.__is_loaded__)
+            self.assertEqual("test", model.name)
+
+            self.assertIs(model, TestModel._get_by_filter({"_id": obj_id}))
+            self.assertIs(model, TestModel._process_mongo_doc({"_id": obj_id, "name": "test"}))
+            mock_collection.find_one.assert_called_once()
+
+            self.assertIs(model, TestModel._get_by_filter({"name": "test"}))
+            self.assertEqual(2, mock_collection.find_one.call_count)
+
+            model._delete()
+            self.assertIsNone(identity_map.get(TestModel.collection_name, obj_id))
+
+            mock_collection.insert_one.return_value.inserted_id = obj_id
+            new_model = TestModel(name="new")._save()
+            self.assertIs(new_model, TestModel._get_by_filter({"_id": obj_id}))
+
+        with patch.object(TestModel, 'collection', return_value=mock_collection):
+            self.assertIsNot(new_model, TestModel._get_by_filter({"_id": obj_id}))
+
+    def test_identity_map_after_patch(self):
+        class TestModel(BasePydanticMongoModel):
+            name: str
+
+            class _MongoConfig:
+                skip_unchanged_writes = True
+
+        obj_id = ObjectId()
+        mock_collection = MagicMock()
+        mock_collection.find_one.return_value = {"_id": obj_id, "name": "a"}
+        mock_collection.find_one_and_update.return_value = {"_id": obj_id, "name": "b"}
+        mock_collection.update_one.return_value.matched_count = 1
+
+        with patch.object(TestModel, 'collection', return_value=mock_collection), session():
+            model = TestModel._get_by_filter({"_id": obj_id})
+            self.assertIs(model, TestModel._patch(obj_id, {"name": "b"}, return_model=True))
+            self.assertEqual("b", model.name)
+            self.assertIs(model, TestModel._get_by_filter({"_id": obj_id}))
+            model._save()
+            mock_collection.update_one.assert_not_called()
+
+            mock_collection.find_one.return_value = {"_id": obj_id, "name": "c"}
+            self.assertTrue(TestModel._patch(obj_id, {"name": "c"}))
+            self.assertEqual("c", TestModel._get_by_filter({"_id": obj_id}).name)
+            self.assertEqual("c", TestModel._get_by_filter({"name": "c"}).name)
+
+    def test_identity_map_keeps_unsaved_changes(self):
+        class TestModel(BasePydanticMongoModel):
+            name: str
+            tag: str
+
+        obj_id = ObjectId()
+        mock_collection = MagicMock()
+        mock_collection.find_one.return_value = {"_id": obj_id, "name": "a", "tag": "t"}
+        mock_collection.update_one.return_value.matched_count = 1
+
+        with patch.object(TestModel, 'collection', return_value=mock_collection), session():
+            model = TestModel._get_by_filter({"_id": obj_id})
+            model.name = "changed"
+            self.assertIs(model, TestModel._get_by_filter({"tag": "t"}))
+            self.assertEqual("changed", model.name)
+            model._save()
+            self.assertEqual({"$set": {"name": "changed", "tag": "t"}}, mock_collection.update_one.call_args.args[1])
+
+            # saved model is refreshed by newer documents
+            mock_collection.find_one.return_value = {"_id": obj_id, "name": "b", "tag": "t"}
+            self.assertEqual("b", TestModel._get_by_filter({"tag": "t"}).name)
+
+    def test_read_cache(self):
+        class CachedModel(BasePydanticMongoModel):
+            name: str
+            tags: List[str] = []
+
+            class _MongoConfig:
+                cache_size = 10
+
+        obj_id = ObjectId()
+        mock_collection = MagicMock()
+        mock_collection.find_one.return_value = {"_id": obj_id, "name": "test", "tags": ["a"]}
+        mock_collection.update_one.return_value.matched_count = 1
+
+        with patch.object(CachedModel, 'collection', return_value=mock_collection):
+            model = CachedModel._get_by_filter({"_id": str(obj_id)})
+            model.tags.append("b")
+            cached_model = CachedModel._get_by_filter({"_id": obj_id})
+            self.assertIsNot(model, cached_model)
+            self.assertEqual(["a"], cached_model.tags)
+            self.assertEqual({"_id": str(obj_id), "name": "test", "tags": ["a"]},
+                             CachedModel._get_by_filter({"_id": obj_id}, as_dict=True))
+            mock_collection.find_one.assert_called_once()
+
+            CachedModel._get_by_filter({"name": "test"})
+            self.assertEqual(2, mock_collection.find_one.call_count)
+
+            model._save()
+            CachedModel._get_by_filter({"_id": obj_id})
+            self.assertEqual(3, mock_collection.find_one.call_count)
+
+            CachedModel._patch(obj_id, {"name": "patched"})
+            CachedModel._get_by_filter({"_id": obj_id})
+            self.assertEqual(4, mock_collection.find_one.call_count)
+
+            model._delete()
+            CachedModel._get_by_filter({"_id": obj_id})
+            self.assertEqual(5, mock_collection.find_one.call_count)
+
+        self.assertIsNone(BasePydanticMongoModel._get_read_cache())
+
+    def test_replica(self):
+        class ReplicatedModel(BasePydanticMongoModel):
+            code: str
+
+            class _MongoConfig:
+                replicate_in_memory = True
+                replica_indexes = ["code"]
+
+        obj_id = ObjectId()
+        mock_collection = MagicMock()
+        mock_collection.find.side_effect = lambda *args: iter([{"_id": obj_id, "code": "US"}])
+        mock_collection.find_one.return_value = {"_id": obj_id, "code": "US"}
+
+        with patch.object(ReplicatedModel, 'collection', return_value=mock_collection):
+            self.assertEqual("US", ReplicatedModel._get_by_filter({"_id": str(obj_id)}).code)
+            self.assertEqual(str(obj_id), ReplicatedModel._get_by_filter({"code": "US"}).id)
+            self.assertIsNone(ReplicatedModel._get_by_filter({"code": "DE"}))
+            self.assertEqual({"_id": str(obj_id), "code": "US"},
+                             ReplicatedModel._get_by_filter({"_id": obj_id}, as_dict=True))
+            mock_collection.find.assert_called_once()
+            mock_collection.find_one.assert_not_called()
+
+            ReplicatedModel._get_by_filter({"code": {"$in": ["US"]}})
+            mock_collection.find_one.assert_called_once()
+
+            ReplicatedModel(code="DE")._save()
+            ReplicatedModel._get_by_filter({"code": "DE"})
+            self.assertEqual(2, mock_collection.find.call_count)
+
+            model = asyncio.run(ReplicatedModel._aget_by_filter({"code": "US"}))
+            self.assertEqual(str(obj_id), model.id)
+
+        self.assertIsNone(BasePydanticMongoModel._get_replica())
+
+    def test_query_cache(self):
+        class QueryCachedModel(BasePydanticMongoModel):
+            name: str
+
+            class _MongoConfig:
+                cache_queries = True
+                query_cache_max_docs = 2
+
+        docs = [{"_id": ObjectId(), "name": "a"}, {"_id": ObjectId(), "name": "b"}]
+        mock_collection = MagicMock()
+        mock_collection.find.side_effect = lambda *args: iter(docs)
+        mock_collection.find_one.return_value = None
+
+        with patch.object(QueryCachedModel, 'collection', return_value=mock_collection):
+            self.assertEqual(["a", "b"], [model.name for model in QueryCachedModel._objects({"name": {"$ne": "c"}})])
+            self.assertEqual(["a", "b"], [model.name for model in QueryCachedModel._objects({"name": {"$ne": "c"}})])
+            mock_collection.find.assert_called_once()
+
+            self.assertIsNone(QueryCachedModel._get_by_filter({"name": "c"}))
+            self.assertIsNone(QueryCachedModel._get_by_filter({"name": "c"}))
+            mock_collection.find_one.assert_called_once()
+
+            QueryCachedModel(name="c")._save()
+            list(QueryCachedModel._objects({"name": {"$ne": "c"}}))
+            self.assertEqual(2, mock_collection.find.call_count)
+            QueryCachedModel._get_by_filter({"name": "c"})
+            self.assertEqual(2, mock_collection.find_one.call_count)
+
+            docs.append({"_id": ObjectId(), "name": "d"})
+            list(QueryCachedModel._objects())
+            list(QueryCachedModel._objects())
+            self.assertEqual(4, mock_collection.find.call_count)
+
+    def test_write_behind(self):
+        class EventModel(BasePydanticMongoModel):
+            kind: str
+
+            class _MongoConfig:
+                write_behind = True
+                write_behind_interval = 60
+
+        mock_collection = MagicMock()
+
+        with patch.object(EventModel, 'collection', return_value=mock_collection):
+            event = EventModel(kind="click")._save()
+            async_event = asyncio.run(EventModel(kind="view")._asave())
+            self.assertIsNotNone(event.id)
+            mock_collection.insert_one.assert_not_called()
+
+            EventModel._get_write_behind_buffer().close()
+
+            mock_collection.insert_many.assert_called_once_with([
+                {"kind": "click", "_id": ObjectId(event.id)},
+                {"kind": "view", "_id": ObjectId(async_event.id)},
+            ], ordered=False)
+
+            event.kind = "changed"
+            event._save()
+            mock_collection.update_one.assert_called_once()
+
+        self.assertIsNone(BasePydanticMongoModel._get_write_behind_buffer())
+
+    def test_save_cascade(self):
+        class CascadeNode(BasePydanticMongoModel):
+            name: str
+            next: Optional[BasePydanticMongoModel] = None
+            children: List[BasePydanticMongoModel] = []
+
+        mock_collection = MagicMock()
+        first, second = CascadeNode(name="first"), CascadeNode(name="second")
+        first.next, second.next = second, first
+        first.children = [CascadeNode(name="child")]
+
+        with patch.object(CascadeNode, 'collection', return_value=mock_collection):
+            first._save(cascade=True)
+
+        mock_collection.insert_one.assert_not_called()
+        mock_collection.bulk_write.assert_called_once()
+        requests = mock_collection.bulk_write.call_args.args[0]
+        self.assertEqual(3, len(requests))
+        self.assertTrue(all(isinstance(request, InsertOne) for request in requests))
+        self.assertEqual(second.id, requests[0]._doc["next"].id)
+        self.assertEqual(first.id, requests[1]._doc["next"].id)
+        self.assertEqual(ObjectId(first.children[0].id), requests[2]._doc["_id"])
+
+        mock_collection.bulk_write.side_effect = RuntimeError
+        model = CascadeNode(name="new", next=CascadeNode(name="new_next"))
+        with patch.object(CascadeNode, 'collection', return_value=mock_collection):
+            with self.assertRaises(RuntimeError):
+                model._save(cascade=True)
+        self.assertIsNone(model.id)
+        self.assertIsNone(model.next.id)
+
+    def test_asave_cascade(self):
+        class AsyncCascadeNode(BasePydanticMongoModel):
+            name: str
+            next: Optional[BasePydanticMongoModel] = None
+
+        mock_collection = MagicMock()
+        mock_collection.bulk_write = AsyncMock()
+        model = AsyncCascadeNode(name="first", next=AsyncCascadeNode(name="second"))
+
+        with patch.object(AsyncCascadeNode, 'acollection', AsyncMock(return_value=mock_collection)):
+            asyncio.run(model._asave(cascade=True))
+
+        self.assertEqual(2, len(mock_collection.bulk_write.call_args.args[0]))
+        self.assertIsNotNone(model.next.id)
+
+    def test_deferred_fields(self):
+        class PageModel(BasePydanticMongoModel):
+            title: str
+            body: str = ""
+
+            class _MongoConfig:
+                deferred = ["body"]
+
+        obj_id = ObjectId()
+        mock_collection = MagicMock()
+        mock_collection.find_one.return_value = {"_id": obj_id, "title": "title"}
+
+        with patch.object(PageModel, 'collection', return_value=mock_collection):
+            model = PageModel._get_by_filter({"_id": obj_id})
+            mock_collection.find_one.assert_called_once_with({"_id": obj_id}, projection={"body": False})
+            self.assertEqual({"body"}, model.__unloaded__)
+
+            model.title = "new"
+            model._save()
+            mock_collection.update_one.assert_called_once_with({"_id": obj_id}, {"$set": {"title": "new"}})
+
+            mock_collection.find_one.return_value = {"_id": obj_id, "body": "body"}
+            self.assertEqual("body", model.body)
+            mock_collection.find_one.assert_called_with({"_id": obj_id}, {"body": True})
+            self.assertEqual(set(), model.__unloaded__)
+
+            model._save()
+            mock_collection.update_one.assert_called_with({"_id": obj_id}, {"$set": {"title": "new", "body": "body"}})
+
+            self.assertEqual("body", model.body)
+            self.assertEqual(2, mock_collection.find_one.call_count)
+
+            # deferred field assigned before it is loaded is written
+            mock_collection.find_one.return_value = {"_id": obj_id, "title": "title"}
+            model = PageModel._get_by_filter({"_id": obj_id})
+            model.body = "new"
+            self.assertEqual(set(), model.__unloaded__)
+            model._save()
+            mock_collection.update_one.assert_called_with({"_id": obj_id}, {"$set": {"title": "title", "body": "new"}})
+            self.assertEqual(3, mock_collection.find_one.call_count)
+
+        PageModel._MongoConfig.deferred = ["title"]
+        with self.assertRaises(ValueError):
+            PageModel._get_deferred_fields()
+
+    def test_summary_fields(self):
+        class SummaryModel(BasePydanticMongoModel):
+            name: str
+            bio: str
+
+            class _MongoConfig:
+                summary_fields = ["name"]
+
+        obj_id = ObjectId()
+        mock_collection = MagicMock()
+        mock_collection.find_one.return_value = {"_id": obj_id, "name": "name"}
+
+        with patch.object(SummaryModel, 'collection', return_value=mock_collection):
+            model = SummaryModel._from_ref(DBRef(SummaryModel.collection_name, str(obj_id)))
+            self.assertEqual("name", model.name)
+            mock_collection.find_one.assert_called_once_with({"_id": obj_id}, {"name": True})
+            self.assertEqual({"bio"}, model.__unloaded__)
+
+            model.name = "new"
+            model._save()
+            mock_collection.update_one.assert_called_once_with({"_id": obj_id}, {"$set": {"name": "new"}})
+
+            mock_collection.find_one.return_value = {"_id": obj_id, "bio": "bio"}
+            self.assertEqual("bio", model.bio)
+            mock_collection.find_one.assert_called_with({"_id": obj_id}, {"bio": True})
+            self.assertEqual(set(), model.__unloaded__)
+
+            # field out of summary assigned before it is loaded is written
+            mock_collection.find_one.return_value = {"_id": obj_id, "name": "name"}
+            model = SummaryModel._from_ref(DBRef(SummaryModel.collection_name, str(obj_id)))
+            self.assertEqual("name", model.name)
+            model.bio = "new"
+            model._save()
+            mock_collection.update_one.assert_called_with({"_id": obj_id}, {"$set": {"name": "name", "bio": "new"}})
+
+        SummaryModel._MongoConfig.summary_fields = ["title"]
+        with self.assertRaises(ValueError):
+            SummaryModel._get_summary_fields()
+
+    def test_delete_many(self):
+        class DeleteAuthor(BasePydanticMongoModel):
+            name: str
+
+        class DeleteBook(BasePydanticMongoModel):
+            author: Optional[DeleteAuthor] = None
+            reviewer: Optional[DeleteAuthor] = None
+
+            class _MongoConfig:
+                on_delete = {"author": "cascade", "reviewer": "nullify"}
+
+        class DeleteShelf(BasePydanticMongoModel):
+            books: List[DeleteBook] = []
+            liked: List[DeleteBook] = []
+
+            class _MongoConfig:
+                on_delete = {"books": "pull", "liked": "nullify"}
+
+        author_id, book_id = ObjectId(), ObjectId()
+        authors, books, shelves = MagicMock(), MagicMock(), MagicMock()
+        authors.find.return_value = [{"_id": author_id}]
+        authors.delete_many.return_value.deleted_count = 1
+        books.find.return_value = [{"_id": book_id}]
+
+        with patch.object(DeleteAuthor, 'collection', return_value=authors), \
+                patch.object(DeleteBook, 'collection', return_value=books), \
+                patch.object(DeleteShelf, 'collection', return_value=shelves):
+            self.assertEqual(1, DeleteAuthor._delete_many({"name": "author"}, cascade=True))
+
+        authors.find.assert_called_once_with({"name": "author"}, {"_id": True})
+        authors.delete_many.assert_called_once_with({"_id": {"$in": [author_id]}})
+        author_refs = books.find.call_args.args[0]["author"]["$in"]
+        self.assertIn(DBRef(DeleteAuthor.collection_name, str(author_id), ""), author_refs)
+        self.assertIn(DBRef(DeleteAuthor.collection_name, author_id), author_refs)
+        books.delete_many.assert_called_once_with({"_id": {"$in": [book_id]}})
+        books.update_many.assert_called_once_with({"reviewer": {"$in": author_refs}}, {"$set": {"reviewer": None}})
+        books.distinct.assert_not_called()
+
+        book_refs = shelves.update_many.call_args_list[0].args[0]["books"]["$in"]
+        self.assertIn(DBRef(DeleteBook.collection_name, str(book_id), ""), book_refs)
+        shelves.update_many.assert_any_call({"books": {"$in": book_refs}}, {"$pull": {"books": {"$in": book_refs}}})
+        shelves.update_many.assert_any_call(
+            {"liked": {"$in": book_refs}}, {"$set": {"liked.$[ref]": None}}, array_filters=[{"ref": {"$in": book_refs}}]
+        )
+
+    def test_delete_cascade(self):
+        class SingleDeleteAuthor(BasePydanticMongoModel):
+            name: str
+
+        class SingleDeleteBook(BasePydanticMongoModel):
+            author: Optional[SingleDeleteAuthor] = None
+
+            class _MongoConfig:
+                on_delete = {"author": "nullify"}
+
+        author = SingleDeleteAuthor(name="author")
+        author.id = str(ObjectId())
+        authors, books = MagicMock(), MagicMock()
+
+        with patch.object(SingleDeleteAuthor, 'collection', return_value=authors), \
+                patch.object(SingleDeleteBook, 'collection', return_value=books):
+            author._delete()
+            books.update_many.assert_not_called()
+
+            author._delete(cascade=True)
+
+        authors.delete_one.assert_called_with({"_id": ObjectId(author.id)})
+        author_refs = books.update_many.call_args.args[0]["author"]["$in"]
+        self.assertIn(DBRef(SingleDeleteAuthor.collection_name, author.id, ""), author_refs)
+        books.update_many.assert_called_once_with({"author": {"$in": author_refs}}, {"$set": {"author": None}})
+
+    def test_delete_rules_validation(self):
+        class RulesAuthor(BasePydanticMongoModel):
+            name: str
+
+        class RulesBook(BasePydanticMongoModel):
+            author: Optional[RulesAuthor] = None
+            editors: Dict[str, RulesAuthor] = {}
+
+            class _MongoConfig:
+                on_delete = {"author": "pull"}
+
+        with self.assertRaises(ValueError):
+            RulesAuthor._get_delete_rules()
+
+        RulesBook._MongoConfig.on_delete = {"author": "unknown"}
+        with self.assertRaises(ValueError):
+            RulesAuthor._get_delete_rules()
+
+        RulesBook._MongoConfig.on_delete = {"editor": "cascade"}
+        with self.assertRaises(ValueError):
+            RulesAuthor._get_delete_rules()
+
+        # refs in dict values are not matched by rules
+        RulesBook._MongoConfig.on_delete = {"editors": "nullify"}
+        with self.assertRaises(ValueError):
+            RulesAuthor._get_delete_rules()
+
+        RulesBook._MongoConfig.on_delete = {}
+
+    def test_ref_snapshots(self):
+        class SnapshotAuthor(BasePydanticMongoModel):
+            name: str
+            bio: str = ""
+
+        class SnapshotPost(BasePydanticMongoModel):
+            author: Optional[SnapshotAuthor] = None
+
+            class _MongoConfig:
+                ref_snapshots = {"author": ["name"]}
+
+        author_id = ObjectId()
+        author = SnapshotAuthor(name="name", bio="bio")
+        author.id = str(author_id)
+        self.assertEqual(
+            SnapshotPost(author=author)._model_dump_db(),
+            {"author": DBRef(SnapshotAuthor.collection_name, str(author_id), "", name="name")}
+        )
+        stub = SnapshotAuthor._from_ref(DBRef(SnapshotAuthor.collection_name, str(author_id)))
+        self.assertEqual(
+            SnapshotPost(author=stub)._model_dump_db(),
+            {"author": DBRef(SnapshotAuthor.collection_name, str(author_id), "")}
+        )
+
+        mock_collection = MagicMock()
+        with patch.object(SnapshotAuthor, 'collection', return_value=mock_collection):
+            model = SnapshotAuthor._from_ref(DBRef(SnapshotAuthor.collection_name, str(author_id), "", name="name"))
+            self.assertEqual("name", model.name)
+            self.assertEqual(str(author_id), model.id)
+            mock_collection.find_one.assert_not_called()
+            self.assertEqual({"bio"}, model.__unloaded__)
+
+            mock_collection.find_one.return_value = {"_id": author_id, "bio": "bio"}
+            self.assertEqual("bio", model.bio)
+            mock_collection.find_one.assert_called_once_with({"_id": author_id}, {"bio": True})
+
+        SnapshotPost._MongoConfig.ref_snapshots = {"editor": ["name"]}
+        with self.assertRaises(ValueError):
+            SnapshotPost._get_ref_snapshots()
+
+    def test_refresh_snapshots(self):
+        class RefreshAuthor(BasePydanticMongoModel):
+            name: str
+
+        class RefreshPost(BasePydanticMongoModel):
+            author: Optional[RefreshAuthor] = None
+            editors: List[RefreshAuthor] = []
+
+            class _MongoConfig:
+                ref_snapshots = {"author": ["name"], "editors": ["name"]}
+                on_delete = {"author": "nullify", "editors": "pull"}
+
+        author_id, post_id = ObjectId(), ObjectId()
+        authors, posts = MagicMock(), MagicMock()
+        authors.find.return_value.batch_size.return_value = [{"_id": author_id, "name": "new"}]
+        posts.bulk_write.return_value.modified_count = 1
+        ref_ids = [str(author_id), author_id]
+
+        with patch.object(RefreshAuthor, 'collection', return_value=authors), \
+                patch.object(RefreshPost, 'collection', return_value=posts):
+            self.assertEqual(2, RefreshPost._refresh_snapshots([str(author_id)]))
+
+            authors.find.assert_called_with({"_id": {"$in": [author_id]}}, {"name": True})
+            author_update, editors_update = [call.args[0][0] for call in posts.bulk_write.call_args_list]
+            self.assertEqual(author_update._filter, {
+                "author.$ref": RefreshAuthor.collection_name, "author.$id": {"$in": ref_ids}
+            })
+            self.assertEqual(author_update._doc, {"$set": {"author.name": "new"}})
+            self.assertEqual(editors_update._doc, {"$set": {"editors.$[ref].name": "new"}})
+            self.assertEqual(editors_update._array_filters, [{
+                "ref.$ref": RefreshAuthor.collection_name, "ref.$id": {"$in": ref_ids}
+            }])
+
+            posts.distinct.return_value = [post_id]
+            RefreshAuthor._apply_delete_rules([author_id], set())
+            posts.update_many.assert_any_call({"author.$id": {"$in": ref_ids}}, {"$set": {"author": None}})
+            posts.update_many.assert_any_call(
+                {"editors.$id": {"$in": ref_ids}}, {"$set": {"editors.$[ref]": None}},
+                array_filters=[{"ref.$id": {"$in": ref_ids}}]
+            )
+            posts.update_many.assert_any_call({"_id": {"$in": [post_id]}}, {"$pull": {"editors": None}})
+
+    def test_counter_caches(self):
+        class CounterCategory(BasePydanticMongoModel):
+            name: str
+            items_count: int = 0
+
+        class CounterItem(BasePydanticMongoModel):
+            category: Optional[CounterCategory] = None
+
+            class _MongoConfig:
+                counter_caches = {"category": "items_count"}
+
+        first, second = CounterCategory(name="first"), CounterCategory(name="second")
+        first.id, second.id = str(ObjectId()), str(ObjectId())
+        item_id = ObjectId()
+        categories, items = MagicMock(), MagicMock()
+        items.insert_one.return_value.inserted_id = item_id
+
+        def increments():
+            requests = categories.bulk_write.call_args.args[0]
+            return {str(request._filter["_id"]): request._doc["$inc"]["items_count"] for request in requests}
+
+        with patch.object(CounterCategory, 'collection', return_value=categories), \
+                patch.object(CounterItem, 'collection', return_value=items):
+            self.assertEqual({"name": "first"}, first._model_dump_db())
+            self.assertEqual({"name": "first", "items_count": 0}, first._model_dump_db(inserted=True))
+            with patch("pydantic_mongo.base_pm_model.get_subtypes") as get_subtypes:
+                # counter fields are found once until more models are registered
+                first._model_dump_db()
+                get_subtypes.assert_not_called()
+
+            categories.insert_one.return_value.inserted_id = ObjectId()
+            CounterCategory(name="third")._save()
+            categories.insert_one.assert_called_once_with({"name": "third", "items_count": 0})
+
+            item = CounterItem(category=first)._save()
+            self.assertEqual({first.id: 1}, increments())
+
+            item.category = second
+            item._save()
+            self.assertEqual({first.id: -1, second.id: 1}, increments())
+
+            item._delete()
+            self.assertEqual({second.id: -1}, increments())
+
+            items.find.return_value = [{"_id": item_id, "category": first.db_ref}, {"_id": ObjectId()}]
+            items.delete_many.return_value.deleted_count = 2
+            CounterItem._delete_many({})
+            items.find.assert_called_with({}, {"_id": True, "category": True})
+            self.assertEqual({first.id: -1}, increments())
+
+            loaded = CounterItem._process_mongo_doc({"_id": item_id, "category": first.db_ref})
+            self.assertEqual({"category": Counter({(CounterCategory.collection_name, first.id): 1})},
+                             loaded.__counted__)
+            categories.bulk_write.reset_mock()
+            loaded._save()
+            categories.bulk_write.assert_not_called()
+
+    def test_counter_caches_unknown_field(self):
+        class UnknownCounterCategory(BasePydanticMongoModel):
+            name: str
+
+        class UnknownCounterItem(BasePydanticMongoModel):
+            category: Optional[UnknownCounterCategory] = None
+
+            class _MongoConfig:
+                counter_caches = {"category": "unknown"}
+
+        try:
+            with self.assertRaises(ValueError):
+                UnknownCounterItem._get_counter_caches()
+        finally:
+            # invalid config would fail counter fields of other models
+            BaseMeta.collection_type_map.pop(UnknownCounterItem.collection_name)
+
+    def test_recount_counter_caches(self):
+        class RecountCategory(BasePydanticMongoModel):
+            tagged_count: int = 0
+
+        class RecountItem(BasePydanticMongoModel):
+            tags: List[RecountCategory] = []
+
+            class _MongoConfig:
+                counter_caches = {"tags": "tagged_count"}
+
+        first, second = ObjectId(), ObjectId()
+        categories, items = MagicMock(), MagicMock()
+        items.aggregate.return_value = [
+            {"_id": DBRef(RecountCategory.collection_name, str(first), ""), "count": 2},
+            {"_id": DBRef(RecountCategory.collection_name, first), "count": 1},
+        ]
+        categories.find.return_value = [{"_id": first}, {"_id": second}]
+        categories.bulk_write.return_value.modified_count = 2
+
+        with patch.object(RecountCategory, 'collection', return_value=categories), \
+                patch.object(RecountItem, 'collection', return_value=items):
+            self.assertEqual(2, RecountItem._recount_counter_caches(batch_size=10))
+
+        items.aggregate.assert_called_once_with([
+            {"$match": {"tags": {"$ne": None}}},
+            {"$unwind": "$tags"},
+            {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+        ])
+        categories.find.assert_called_once_with({"tagged_count": {"$nin": [0, None]}}, {"_id": True})
+        requests = categories.bulk_write.call_args.args[0]
+        self.assertEqual(
+            [({"_id": first, "tagged_count": {"$ne": 3}}, {"$set": {"tagged_count": 3}}),
+             ({"_id": second, "tagged_count": {"$ne": 0}}, {"$set": {"tagged_count": 0}})],
+            [(request._filter, request._doc) for request in requests]
+        )
+
+    def test_storage_aliases(self):
+        class AliasedModel(BasePydanticMongoModel):
+            name: str
+            age: int = 0
+            note: Optional[str] = None
+
+            class _MongoConfig:
+                storage_aliases = {"name": "n", "age": "a"}
+                deferred = ("note",)
+                indexes = [IndexModel([("name", 1), ("age", -1)]),
+                           IndexModel([("age", 1)], name="by_age", partialFilterExpression={"age": {"$gt": 1}})]
+
+        instance = AliasedModel(name="x", age=2)
+        self.assertEqual({"n": "x", "a": 2, "note": None}, instance._model_dump_db())
+        self.assertEqual({"a": 3}, AliasedModel._encode_partial({"age": 3}))
+        self.assertEqual("n.first", AliasedModel._get_stored_key("name.first"))
+        self.assertEqual({"projection": {"note": False}}, AliasedModel._get_find_options())
+
+        obj_id = ObjectId()
+        loaded = AliasedModel._process_mongo_doc({"_id": obj_id, "n": "y", "a": 5})
+        self.assertEqual(("y", 5, str(obj_id)), (loaded.name, loaded.age, loaded.id))
+        self.assertEqual({"note"}, loaded.__unloaded__)
+
+        first, second = AliasedModel._get_indexes()
+        self.assertEqual(("n_1_a_-1", {"n": 1, "a": -1}), (first.document["name"], dict(first.document["key"])))
+        self.assertEqual(("by_age", {"a": {"$gt": 1}}),
+                         (second.document["name"], second.document["partialFilterExpression"]))
+
+        class WrongAliasModel(BasePydanticMongoModel):
+            name: str
+            age: int = 0
+
+            class _MongoConfig:
+                storage_aliases = {"name": "age"}
+
+        with self.assertRaises(ValueError):
+            WrongAliasModel._get_storage_aliases()
+
+    def test_migrate_storage_aliases(self):
+        class MigratedModel(BasePydanticMongoModel):
+            name: str
+            age: int = 0
+
+            class _MongoConfig:
+                storage_aliases = {"name": "n"}
+
+        collection = MagicMock()
+        collection.update_many.return_value.modified_count = 3
+        with patch.object(MigratedModel, 'collection', return_value=collection):
+            self.assertEqual(3, MigratedModel._migrate_storage_aliases())
+            collection.update_many.assert_called_once_with(
+                {"$or": [{"name": {"$exists": True}}]}, {"$rename": {"name": "n"}}
+            )
+            collection.update_many.reset_mock()
+            MigratedModel._migrate_storage_aliases(previous={"name": "nm", "age": "a"})
+            collection.update_many.assert_called_once_with(
+                {"$or": [{"nm": {"$exists": True}}, {"a": {"$exists": True}}]}, {"$rename": {"nm": "n", "a": "age"}}
+            )
+            with self.assertRaises(ValueError):
+                MigratedModel._migrate_storage_aliases(previous={"name": "age", "age": "n"})
+
+    def test_encode_partial(self):
+        class TestModel(BasePydanticMongoModel):
+            name: str
+            age: int = 0
+            ref: Optional[BasePydanticMongoModel] = None
+
+        ref = BasePydanticMongoModel()
+        ref.id = "ref_id"
+        self.assertEqual(TestModel._encode_partial({"age": "10"}), {"age": 10})
+        self.assertEqual(
+            TestModel._encode_partial({"ref": ref}),
+            {"ref": DBRef(ref.collection_name, "ref_id", "")}
+        )
+        self.assertEqual(
+            TestModel._encode_partial({"ref": {"collection": "test", "id": "ref_id", "database": ""}}),
+            {"ref": DBRef("test", "ref_id", "")}
+        )
+
+        with self.assertRaises(ValueError):
+            TestModel._encode_partial({"id": "test"})
+
+        with self.assertRaises(ValueError):
+            TestModel._encode_partial({"unknown": "test"})
+
+        with self.assertRaises(PydanticValidationError):
+            TestModel._encode_partial({"age": "test"})
+
+    def test_patch(self):
+        class TestModel(BasePydanticMongoModel):
+            name: str
+
+        obj_id = ObjectId()
+        mock_collection = MagicMock()
+        mock_collection.update_one.return_value.matched_count = 1
+        mock_collection.find_one_and_update.return_value = {"_id": obj_id, "name": "patched"}
+
+        with patch.object(TestModel, 'collection', return_value=mock_collection):
+            self.assertTrue(TestModel._patch(str(obj_id), {"name": "patched"}))
+            mock_collection.update_one.assert_called_once_with({"_id": obj_id}, {"$set": {"name": "patched"}})
+
+            model = TestModel._patch(str(obj_id), {"name": "patched"}, return_model=True)
+            self.assertEqual(model.id, str(obj_id))
+            self.assertEqual(model.name, "patched")
+            self.assertEqual(({"_id": obj_id}, {"$set": {"name": "patched"}}),
+                             mock_collection.find_one_and_update.call_args[0])
+
+            mock_collection.find_one_and_update.return_value = None
+            self.assertIsNone(TestModel._patch(obj_id, {"name": "patched"}, return_model=True))
+
+            with self.assertRaises(ValueError):
+                TestModel._patch(obj_id, {})
+
+    def test_computed_fields(self):
+        class ComputedModel(BasePydanticMongoModel):
+            email: str
+            first: str = ""
+            last: str = ""
+
+            @computed_field
+            @property
+            def email_lower(self) -> str:
+                return self.email.lower()
+
+            @computed_field
+            @property
+            def full_name(self) -> str:
+                return f"{self.first} {self.last}"
+
+            class _MongoConfig:
+                computed_depends_on = {"email_lower": ["email"], "full_name": ["first", "last"]}
+
+        model = ComputedModel(email="A@B.c", first="first", email_lower="ignored")
+        self.assertEqual(
+            model._model_dump_db(),
+            {"email": "A@B.c", "first": "first", "last": "", "email_lower": "a@b.c", "full_name": "first "}
+        )
+
+        obj_id = ObjectId()
+        mock_collection = MagicMock()
+        mock_collection.update_one.return_value.matched_count = 1
+        mock_collection.find_one.return_value = {"_id": obj_id, "last": "last"}
+
+        with patch.object(ComputedModel, 'collection', return_value=mock_collection):
+            with self.assertNoLogs("pydantic_mongo.base_pm_model", level="WARNING"):
+                ComputedModel._patch(obj_id, {"email": "C@D.e"})
+            mock_collection.find_one.assert_not_called()
+            mock_collection.update_one.assert_called_with(
+                {"_id": obj_id}, {"$set": {"email": "C@D.e", "email_lower": "c@d.e"}}
+            )
+
+            ComputedModel._patch(obj_id, {"first": "new"})
+            mock_collection.find_one.assert_called_once_with({"_id": obj_id}, {"last": True})
+            mock_collection.update_one.assert_called_with(
+                {"_id": obj_id, "last": "last"}, {"$set": {"first": "new", "full_name": "new last"}}
+            )
+
+            # read field was changed by a concurrent patch, computed value is computed again
+            not_matched, matched = MagicMock(matched_count=0), MagicMock(matched_count=1)
+            mock_collection.update_one.side_effect = [not_matched, matched]
+            mock_collection.find_one.side_effect = [{"_id": obj_id, "last": "last"}, {"_id": obj_id}]
+            self.assertTrue(ComputedModel._patch(obj_id, {"first": "new"}))
+            mock_collection.update_one.assert_called_with(
+                {"_id": obj_id, "last": None}, {"$set": {"first": "new", "full_name": "new "}}
+            )
+
+            mock_collection.update_one.side_effect = None
+            mock_collection.update_one.return_value = not_matched
+            mock_collection.find_one.side_effect = None
+            with self.assertRaises(ValueError):
+                ComputedModel._patch(obj_id, {"first": "new"})
+            mock_collection.find_one.return_value = None
+            self.assertFalse(ComputedModel._patch(obj_id, {"first": "new"}))
+
+            with self.assertRaises(ValueError):
+                ComputedModel._patch(obj_id, {"email_lower": "test"})
+
+        ComputedModel._MongoConfig.computed_depends_on = {"email_lower": ["unknown"]}
+        with self.assertRaises(ValueError):
+            ComputedModel._get_computed_fields()
+
+        ComputedModel._MongoConfig.computed_depends_on = {}
+        self.assertEqual(ComputedModel._get_computed_fields(), {"email_lower": None, "full_name": None})
+        self.assertEqual(ComputedModel._get_patch_dependencies({"email": "test"}), (
+            ("email_lower", "full_name"), {"first": True, "last": True}
+        ))
+
+    def test_upsert(self):
+        class TestModel(BasePydanticMongoModel):
+            source: str
+            external_id: str
+            name: str = ""
+
+        obj_id = ObjectId()
+        mock_collection = MagicMock()
+        mock_collection.find_one_and_update.return_value = {"_id": obj_id}
+
+        with patch.object(TestModel, 'collection', return_value=mock_collection):
+            model = TestModel(source="src", external_id="1", name="test")
+            self.assertEqual(model._upsert(on=["source", "external_id"]), model)
+            self.assertEqual(model.id, str(obj_id))
+            self.assertEqual(({"source": "src", "external_id": "1"},
+                              {"$set": {"source": "src", "external_id": "1", "name": "test"}}),
+                             mock_collection.find_one_and_update.call_args[0])
+            self.assertTrue(mock_collection.find_one_and_update.call_args[1]["upsert"])
+
+            with self.assertRaises(ValueError):
+                model._upsert(on=[])
+
+            with self.assertRaises(ValueError):
+                model._upsert(on=["unknown"])
+
+    def test_upsert_many(self):
+        class TestModel(BasePydanticMongoModel):
+            source: str
+            external_id: str
+
+        inserted_id, matched_id = ObjectId(), ObjectId()
+        mock_collection = MagicMock()
+        mock_collection.bulk_write.return_value.upserted_ids = {0: inserted_id}
+        mock_collection.find.return_value = [{"_id": matched_id, "source": "src", "external_id": "2"}]
+
+        with patch.object(TestModel, 'collection', return_value=mock_collection):
+            models = [TestModel(source="src", external_id="1"), TestModel(source="src", external_id="2")]
+            self.assertEqual(TestModel._upsert_many(models, on=["source", "external_id"]), models)
+            self.assertEqual([str(inserted_id), str(matched_id)], [model.id for model in models])
+            self.assertEqual(2, len(mock_collection.bulk_write.call_args[0][0]))
+            self.assertEqual({"$or": [{"source": "src", "external_id": "2"}]}, mock_collection.find.call_args[0][0])
+
+            mock_collection.find.reset_mock()
+            mock_collection.bulk_write.return_value.upserted_ids = {0: inserted_id, 1: matched_id}
+            TestModel._upsert_many(models, on=["source"])
+            mock_collection.find.assert_not_called()
+
+            self.assertEqual([], TestModel._upsert_many([], on=["source"]))
+
+            with self.assertRaises(TypeError):
+                TestModel._upsert_many([BasePydanticMongoModel()], on=["source"])
+
     def test_from_ref(self):
         class TestModel(BasePydanticMongoModel):
             name: str
@@ -222,6 +1139,79 @@ class TestBasePydanticMongoModel(BaseTest):
             self.assertEqual(({"_id": obj_id},), find_one_params)
             mock_process_doc.assert_called_with('test_result', as_dict=True)
 
+            # Check that filter of a caller is not changed
+            filter = {"_id": {"$in": [str(obj_id)]}}
+            BasePydanticMongoModel._get_by_filter(filter)
+            self.assertEqual(({"_id": {"$in": [obj_id]}},), find_one_params)
+            self.assertEqual({"_id": {"$in": [str(obj_id)]}}, filter)
+
+    def test_aggregate(self):
+        class TestModel(BasePydanticMongoModel):
+            name: str
+
+        class Row(BaseModel):
+            id: str = Field(alias="_id")
+            count: int
+
+        obj_id = ObjectId()
+        mock_collection = MagicMock()
+        mock_collection.aggregate.return_value = iter([{"_id": obj_id, "count": 2}])
+
+        with patch.object(TestModel, 'collection', return_value=mock_collection):
+            rows = TestModel._aggregate([{"$match": {"_id": str(obj_id)}}], output_model=Row, batch_size=10)
+            mock_collection.aggregate.assert_not_called()
+            self.assertEqual([Row(_id=str(obj_id), count=2)], list(rows))
+            mock_collection.aggregate.assert_called_once_with([{"$match": {"_id": obj_id}}], batchSize=10)
+
+            mock_collection.aggregate.return_value = iter([{"_id": "x", "count": 1}])
+            self.assertEqual(
+                [{"_id": "x", "count": 1}], list(TestModel._aggregate([], allow_disk_use=True))
+            )
+            mock_collection.aggregate.assert_called_with([], allowDiskUse=True)
+
+        async_collection = MagicMock()
+        async_collection.aggregate.return_value.__aiter__.return_value = [{"_id": "x", "count": 1}]
+
+        async def collect():
+            return [row async for row in TestModel._aaggregate([], output_model=Row)]
+
+        with patch.object(TestModel, 'acollection', AsyncMock(return_value=async_collection)):
+            self.assertEqual([Row(_id="x", count=1)], asyncio.run(collect()))
+
+    def test_get_by_ids(self):
+        class TestModel(BasePydanticMongoModel):
+            name: str
+
+            class _MongoConfig:
+                cache_size = 10
+
+        first, second, missing = ObjectId(), ObjectId(), ObjectId()
+        mock_collection = MagicMock()
+        mock_collection.find.return_value = [{"_id": first, "name": "first"}, {"_id": second, "name": "second"}]
+
+        with patch.object(TestModel, 'collection', return_value=mock_collection):
+            models = TestModel._get_by_ids([str(second), missing, first, second])
+            self.assertEqual(["second", None, "first", "second"], [model and model.name for model in models])
+            mock_collection.find.assert_called_once_with({"_id": {"$in": [second, missing, first]}})
+
+            mock_collection.find.return_value = []
+            models = TestModel._get_by_ids([first, missing])
+            self.assertEqual(["first", None], [model and model.name for model in models])
+            mock_collection.find.assert_called_with({"_id": {"$in": [missing]}})
+
+            with session():
+                loaded = TestModel._process_mongo_doc({"_id": missing, "name": "loaded"})
+                mock_collection.find.reset_mock()
+                self.assertIs(loaded, TestModel._get_by_ids([missing, first])[0])
+                mock_collection.find.assert_not_called()
+
+        async_collection = MagicMock()
+        async_collection.find.return_value.__aiter__.return_value = [{"_id": missing, "name": "async"}]
+        with patch.object(TestModel, 'acollection', AsyncMock(return_value=async_collection)):
+            models = asyncio.run(TestModel._aget_by_ids([missing, second]))
+            self.assertEqual(["async", "second"], [model.name for model in models])
+            async_collection.find.assert_called_once_with({"_id": {"$in": [missing]}})
+
     @patch("pydantic_mongo.helpers.get_refs_from_data")
     def test_get_ref_objects(self, get_refs_from_data_mock):
         type_by_collection_mock = MagicMock(return_value=MagicMock(_from_ref=MagicMock()))
@@ -320,5 +1310,146 @@ class TestBasePydanticMongoModel(BaseTest):
                 BPM._MongoModel.model_json_schema.assert_called_with()
 
 
+class AsyncCursorMock:
+    def __init__(self, docs):
+        self.docs = list(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.docs:
+            raise StopAsyncIteration
+        return self.docs.pop(0)
+
+
+class TestBasePydanticMongoModelAsync(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        class TestModel(BasePydanticMongoModel):
+            name: str
+
+        self.TestModel = TestModel
+        self.collection = MagicMock(
+            insert_one=AsyncMock(return_value=MagicMock(inserted_id=ObjectId())),
+            update_one=AsyncMock(return_value=MagicMock(matched_count=1)),
+            find_one=AsyncMock(return_value=None),
+            find_one_and_update=AsyncMock(),
+            delete_one=AsyncMock(),
+            bulk_write=AsyncMock(),
+        )
+        self.patcher = patch.object(TestModel, 'acollection', AsyncMock(return_value=self.collection))
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    async def test_asave(self):
+        model = self.TestModel(name="test")
+        self.assertEqual(await model._asave(), model)
+        self.assertEqual(str(self.collection.insert_one.return_value.inserted_id), model.id)
+        self.collection.insert_one.assert_awaited_once_with({"name": "test"})
+
+        await model._asave()
+        self.collection.update_one.assert_awaited_once_with({"_id": ObjectId(model.id)}, {"$set": {"name": "test"}})
+
+    async def test_aget_by_filter(self):
+        obj_id = ObjectId()
+        self.assertIsNone(await self.TestModel._aget_by_filter({"_id": str(obj_id)}))
+        self.collection.find_one.assert_awaited_once_with({"_id": obj_id})
+
+        self.collection.find_one.return_value = {"_id": obj_id, "name": "test"}
+        model = await self.TestModel._aget_by_filter({"name": "test"})
+        self.assertEqual(str(obj_id), model.id)
+        self.assertEqual("test", model.name)
+        self.assertEqual({"_id": str(obj_id), "name": "test"},
+                         await self.TestModel._aget_by_filter({"name": "test"}, as_dict=True))
+
+    async def test_aobjects(self):
+        docs = [{"_id": ObjectId(), "name": "test1"}, {"_id": ObjectId(), "name": "test2"}]
+        self.collection.find = MagicMock(return_value=AsyncCursorMock(docs))
+        models = [model async for model in self.TestModel._aobjects({"name": {"$exists": True}})]
+        self.assertEqual(["test1", "test2"], [model.name for model in models])
+        self.collection.find.assert_called_once_with({"name": {"$exists": True}})
+
+    async def test_aload_from_db(self):
+        obj_id = ObjectId()
+        self.collection.find_one.return_value = {"_id": obj_id, "name": "test"}
+        self.collection.find = MagicMock(return_value=AsyncCursorMock([{"_id": obj_id, "name": "test"}]))
+        model = await self.TestModel._afrom_ref(DBRef(self.TestModel.collection_name, str(obj_id)))
+        self.assertFalse(model.__is_loaded__)
+
+        self.assertEqual(await model._aload_from_db(), model)
+        self.assertTrue(model.__is_loaded__)
+        self.assertEqual("test", model.name)
+        self.collection.find.assert_called_once_with({"_id": {"$in": [obj_id]}})
+
+        model = await self.TestModel._afrom_ref(DBRef(self.TestModel.collection_name, str(obj_id)), False)
+        self.assertEqual("test", model.name)
+
+        self.collection.find_one.return_value = None
+        with self.assertRaises(ValueError):
+            await self.TestModel._afrom_ref(DBRef(self.TestModel.collection_name, str(obj_id)), False)
+
+    async def test_await_batches_refs(self):
+        ids = [ObjectId(), ObjectId()]
+        self.collection.find = MagicMock(return_value=AsyncCursorMock([{"_id": ids[0], "name": "test1"}]))
+        models = [self.TestModel._from_ref(DBRef(self.TestModel.collection_name, str(_id))) for _id in ids]
+
+        loaded = await asyncio.gather(*(model._aload() for model in models))
+        self.assertEqual(models, list(loaded))
+        self.collection.find.assert_called_once_with({"_id": {"$in": ids}})
+        self.assertEqual("test1", models[0].name)
+        self.assertTrue(models[1].__is_loaded__)
+        self.assertIsNone(models[1].name)
+
+        self.assertIs(await models[0], models[0])
+        self.collection.find.assert_called_once()
+
+    async def test_afetch_related(self):
+        class ParentModel(BasePydanticMongoModel):
+            children: List[self.TestModel]
+            owner: Optional[self.TestModel] = None
+
+        ids = [ObjectId(), ObjectId()]
+        docs = [{"_id": _id, "name": "child"} for _id in ids]
+        self.collection.find = MagicMock(return_value=AsyncCursorMock(docs))
+        stubs = [self.TestModel._from_ref(DBRef(self.TestModel.collection_name, str(_id))) for _id in ids]
+        parents = [ParentModel(children=[stubs[0]], owner=stubs[1]), ParentModel(children=[stubs[1]])]
+
+        self.assertEqual(parents, await ParentModel._afetch_related(parents, "children", "owner"))
+        self.collection.find.assert_called_once_with({"_id": {"$in": ids}})
+        self.assertTrue(all(stub.__is_loaded__ for stub in stubs))
+
+        with self.assertRaises(ValueError):
+            await ParentModel._afetch_related(parents, "unknown")
+
+    async def test_apatch(self):
+        obj_id = ObjectId()
+        self.assertTrue(await self.TestModel._apatch(obj_id, {"name": "patched"}))
+        self.collection.update_one.assert_awaited_once_with({"_id": obj_id}, {"$set": {"name": "patched"}})
+
+        self.collection.find_one_and_update.return_value = {"_id": obj_id, "name": "patched"}
+        model = await self.TestModel._apatch(obj_id, {"name": "patched"}, return_model=True)
+        self.assertEqual("patched", model.name)
+
+    async def test_aupsert_many(self):
+        inserted_id, matched_id = ObjectId(), ObjectId()
+        self.collection.bulk_write.return_value = MagicMock(upserted_ids={1: inserted_id})
+        self.collection.find = MagicMock(return_value=AsyncCursorMock([{"_id": matched_id, "name": "test1"}]))
+
+        models = [self.TestModel(name="test1"), self.TestModel(name="test2")]
+        await self.TestModel._aupsert_many(models, on=["name"])
+        self.assertEqual([str(matched_id), str(inserted_id)], [model.id for model in models])
+
+    async def test_adelete(self):
+        model = self.TestModel(name="test")
+        await model._adelete()
+        self.collection.delete_one.assert_not_awaited()
+
+        model.id = str(ObjectId())
+        await model._adelete()
+        self.collection.delete_one.assert_awaited_once_with({"_id": ObjectId(model.id)})
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,95 @@
+import asyncio
+import unittest
+from typing import List, Optional
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from bson import ObjectId
+from pymongo import IndexModel
+
+from pydantic_mongo.base_pm_model import BasePydanticMongoModel
+from pydantic_mongo.covered import CoveredQuery
+from pydantic_mongo.embedded_model import EmbeddedModel
+from pydantic_mongo.query import QueryFields
+from tests.unit.base import BaseTest
+
+
+class CoveredAddress(EmbeddedModel):
+    city: str
+
+
+class CoveredMember(BasePydanticMongoModel):
+    name: str
+    external_id: str = ""
+    email: str = ""
+    code: str = ""
+    tags: List[str] = []
+    address: Optional[CoveredAddress] = None
+    addresses: List[CoveredAddress] = []
+
+    class _MongoConfig:
+        indexes = [
+            IndexModel([("name", 1), ("address.city", -1)]),
+            IndexModel([("external_id", 1), ("_id", 1)]),
+            IndexModel([("tags", 1), ("addresses.city", 1)]),
+            IndexModel([("name", "text")]),
+            IndexModel([("email", 1)], sparse=True),
+            IndexModel([("code", 1)], partialFilterExpression={"code": {"$exists": True}}),
+        ]
+
+
+class TestCoveredQuery(BaseTest):
+    def test_covering_index(self):
+        query = CoveredQuery(CoveredMember, ["name", "address.city"])
+        self.assertEqual("name_1_address.city_-1", query.index.document["name"])
+        self.assertEqual({"name": True, "address.city": True, "_id": False}, query.projection)
+        self.assertEqual(("name", "address_city"), query.row_type._fields)
+
+        query = CoveredQuery(CoveredMember, ["external_id", "id"])
+        self.assertEqual({"external_id": True, "_id": True}, query.projection)
+        self.assertEqual(("external_id", "id"), query.row_type._fields)
+
+        # sparse and partial indexes don't cover all documents
+        for fields in (["name", "external_id"], ["tags"], ["addresses.city"], [], ["email"], ["code"]):
+            with self.assertRaises(ValueError):
+                CoveredQuery(CoveredMember, fields)
+        with self.assertRaises(AttributeError):
+            CoveredQuery(CoveredMember, ["unknown"])
+
+    def test_find(self):
+        query = CoveredQuery(CoveredMember, ["external_id", "id"])
+        obj_id = ObjectId()
+        mock_collection = MagicMock()
+        mock_collection.find.return_value = [{"external_id": "e1", "_id": obj_id}]
+
+        with patch.object(CoveredMember, 'collection', return_value=mock_collection):
+            rows = list(query.find({"_id": str(obj_id)}, sort=[("external_id", 1)], limit=5))
+            self.assertEqual([("e1", str(obj_id))], rows)
+            self.assertEqual("e1", rows[0].external_id)
+            mock_collection.find.assert_called_once_with(
+                {"_id": obj_id}, projection={"external_id": True, "_id": True}, hint="external_id_1__id_1",
+                limit=5, sort=[("external_id", 1)]
+            )
+
+            with self.assertRaises(ValueError):
+                list(query.find({"$or": [{"external_id": "e1"}, {"name": "x"}]}))
+            with self.assertRaises(ValueError):
+                list(query.find({"external_id": "e1"}, sort=[("name", 1)]))
+            list(query.find({}, sort=[("id", -1)]))
+            self.assertEqual([("_id", -1)], mock_collection.find.call_args.kwargs["sort"])
+
+        query = CoveredQuery(CoveredMember, ["name", "address.city"])
+        async_collection = MagicMock()
+        async_collection.find.return_value.__aiter__.return_value = [{"name": "x", "address": {"city": "Paris"}}, {}]
+
+        async def collect():
+            return [row async for row in query.afind(QueryFields(CoveredMember).name == "x")]
+
+        with patch.object(CoveredMember, 'acollection', AsyncMock(return_value=async_collection)):
+            self.assertEqual([("x", "Paris"), (None, None)], asyncio.run(collect()))
+        async_collection.find.assert_called_once_with(
+            {"name": "x"}, projection=query.projection, hint="name_1_address.city_-1", limit=0
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
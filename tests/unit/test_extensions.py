@@ -1,6 +1,10 @@
 import unittest
+from unittest.mock import patch
 
 from pydantic_mongo.extensions import PydanticMongo, ValidationError
+from pydantic_mongo.session import IdentityMap
+from pydantic_mongo.unit_of_work import UnitOfWork
+from tests.helpers import create_app
 from tests.unit.base import BaseTest
 
 
@@ -25,6 +29,63 @@ class TestExtensions(BaseTest):
         self.assertIs(pydantic_mongo_1, pydantic_mongo_2)
         self.assertIsNotNone(pydantic_mongo_2.db)
 
+    def test_session(self):
+        with PydanticMongo().session() as identity_map:
+            self.assertIs(identity_map, IdentityMap.current())
+        self.assertIsNone(IdentityMap.current())
+
+    def test_request_session(self):
+        identity_maps = []
+
+        @self.app.route("/identity_map")
+        def identity_map_view():
+            identity_maps.append(IdentityMap.current())
+            return ""
+
+        PydanticMongo().init_app(self.app)
+        self.app.test_client().get("/identity_map")
+        self.assertIsNone(identity_maps[-1])
+
+        app = create_app()
+        app.config["PYDANTIC_MONGO_IDENTITY_MAP"] = True
+        app.route("/identity_map")(identity_map_view)
+        PydanticMongo().init_app(app)
+        PydanticMongo().init_app(app)
+        app.test_client().get("/identity_map")
+        app.test_client().get("/identity_map")
+
+        self.assertIsNotNone(identity_maps[1])
+        self.assertIsNot(identity_maps[1], identity_maps[2])
+        self.assertIsNone(IdentityMap.current())
+
+    def test_request_unit_of_work(self):
+        units_of_work = []
+
+        @self.app.route("/unit_of_work")
+        def unit_of_work_view():
+            units_of_work.append(UnitOfWork.current())
+            return ""
+
+        PydanticMongo().init_app(self.app)
+        self.app.test_client().get("/unit_of_work")
+        self.assertIsNone(units_of_work[-1])
+
+        app = create_app()
+        app.config["PYDANTIC_MONGO_UNIT_OF_WORK"] = True
+        app.route("/unit_of_work")(unit_of_work_view)
+        PydanticMongo().init_app(app)
+        app.test_client().get("/unit_of_work")
+        self.assertIsInstance(units_of_work[-1], UnitOfWork)
+        self.assertIsNone(UnitOfWork.current())
+
+    def test_flush(self):
+        PydanticMongo().flush()
+
+        with PydanticMongo().unit_of_work() as work:
+            with patch.object(work, "flush") as mock_flush:
+                PydanticMongo().flush()
+                mock_flush.assert_called_once()
+
     def test_validation_error(self):
         with self.assertRaises(ValidationError):
             raise ValidationError("Some error")
@@ -28,6 +28,20 @@ class TestHelpers(BaseTestWithData):
                                  lambda x: List[x] if x is int else x)
         self.assertEqual(result, Union[List[int], tuple[float, str]])
 
+    def test_get_subtypes(self):
+        self.assertEqual([(int, False)], list(get_subtypes(int, int)))
+        self.assertEqual([(bool, False)], list(get_subtypes(Optional[bool], int)))
+        self.assertEqual([(int, True)], list(get_subtypes(Optional[List[int]], int)))
+        self.assertEqual([(int, False), (bool, True)], list(get_subtypes(Union[int, Tuple[bool, str]], int)))
+        self.assertEqual([], list(get_subtypes(Dict[str, float], int)))
+
+    def test_has_subtypes_in_dict(self):
+        self.assertTrue(has_subtypes_in_dict(Dict[str, int], int))
+        self.assertTrue(has_subtypes_in_dict(Optional[List[Dict[str, bool]]], int))
+        self.assertFalse(has_subtypes_in_dict(Optional[List[int]], int))
+        self.assertFalse(has_subtypes_in_dict(Dict[str, float], int))
+        self.assertFalse(has_subtypes_in_dict(int, int))
+
     def test_find_instance_in_data_and_replace(self):
         def callback_fn(value):
             return str(value)
@@ -76,6 +90,10 @@ class TestHelpers(BaseTestWithData):
             "key2": "string"
         })
 
+        data4 = {"key1": [{"sub_key": 123}, 456]}
+        result4 = find_instance_in_data_and_replace(data4, int, callback_fn)
+        self.assertEqual(result4, {"key1": [{"sub_key": "123"}, "456"]})
+
     def test_replace_word(self):
         test_string = "Model1 Model2 Model3"
 
@@ -165,6 +183,13 @@ class TestHelpers(BaseTestWithData):
         result3 = find_data_with_fields_in_data_and_replace(data3, ["key1", "key3"], callback_fn)
         self.assertEqual(final_data3, result3)
 
+    def test_get_data_digest(self):
+        ref = DBRef("test", "test_id")
+        digest = get_data_digest({"a": 1, "b": [ref, {"c": "d"}]})
+        self.assertEqual(digest, get_data_digest({"b": [ref, {"c": "d"}], "a": 1}))
+        self.assertNotEqual(digest, get_data_digest({"a": 2, "b": [ref, {"c": "d"}]}))
+        self.assertNotEqual(digest, get_data_digest({"a": 1, "b": [DBRef("test", "other_id"), {"c": "d"}]}))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+
+from pydantic_mongo.instrumentation import Instrumentation
+from tests.unit.base import BaseTest
+
+
+class TestInstrumentation(BaseTest):
+    def setUp(self):
+        super().setUp()
+        Instrumentation().reset()
+
+    def test_singleton(self):
+        self.assertIs(Instrumentation(), Instrumentation())
+
+    def test_increment_and_get(self):
+        instrumentation = Instrumentation()
+        instrumentation.increment("writes_skipped", "users")
+        instrumentation.increment("writes_skipped", "users", 2)
+        instrumentation.increment("writes_skipped", "docs")
+        instrumentation.increment("cache_hits", "docs")
+
+        self.assertEqual(3, instrumentation.get("writes_skipped", "users"))
+        self.assertEqual(4, instrumentation.get("writes_skipped"))
+        self.assertEqual(0, instrumentation.get("unknown"))
+        self.assertEqual(
+            {("writes_skipped", "users"): 3, ("writes_skipped", "docs"): 1, ("cache_hits", "docs"): 1},
+            instrumentation.snapshot()
+        )
+
+        instrumentation.reset()
+        self.assertEqual({}, instrumentation.snapshot())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from bson import ObjectId
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+
+from pydantic_mongo.base_pm_model import BasePydanticMongoModel
+from pydantic_mongo.extensions import PydanticMongo
+from pydantic_mongo.invalidation import InProcessInvalidationBus, MongoInvalidationBus
+from pydantic_mongo.read_cache import ReadCache
+from tests.unit.base import BaseTest
+
+
+class Cursor:
+    alive = True
+
+    def __init__(self, bus, events):
+        self.bus = bus
+        self.events = events
+
+    def __iter__(self):
+        yield from self.events
+        self.bus._stopped.set()
+
+
+class TestInvalidation(BaseTest):
+    def tearDown(self):
+        PydanticMongo().init_invalidation_bus(None)
+        super().tearDown()
+
+    def test_in_process_bus(self):
+        bus = InProcessInvalidationBus()
+        callback = MagicMock()
+        failing_callback = MagicMock(side_effect=RuntimeError)
+        bus.subscribe(failing_callback)
+        bus.subscribe(callback)
+        bus.subscribe(callback)
+
+        obj_id = ObjectId()
+        bus.publish("test", [obj_id])
+
+        callback.assert_called_once_with("test", [str(obj_id)])
+        failing_callback.assert_called_once()
+
+    def test_mongo_bus_publish(self):
+        db = MagicMock()
+        bus = MongoInvalidationBus(db)
+        callback = MagicMock()
+        bus.subscribe(callback)
+
+        bus.publish("test", ["id"])
+
+        callback.assert_called_once_with("test", ["id"])
+        db["pydantic_mongo_invalidations"].insert_one.assert_called_once_with(
+            {"collection": "test", "ids": ["id"], "source": bus.source}
+        )
+
+    def test_mongo_bus_create_collection(self):
+        db = MagicMock()
+        bus = MongoInvalidationBus(db, size=1024)
+        bus._create_collection()
+        db.create_collection.assert_called_once_with("pydantic_mongo_invalidations", capped=True, size=1024)
+        db["pydantic_mongo_invalidations"].insert_one.assert_called_once()
+
+        db.reset_mock()
+        db.create_collection.side_effect = CollectionInvalid
+        bus._create_collection()
+        db["pydantic_mongo_invalidations"].insert_one.assert_not_called()
+
+    def test_mongo_bus_listen(self):
+        db = MagicMock()
+        bus = MongoInvalidationBus(db, retry_interval=0)
+        callback = MagicMock()
+        bus.subscribe(callback)
+        collection = db["pydantic_mongo_invalidations"]
+        collection.find_one.return_value = {"_id": 3}
+        # ids of events from different processes are not ordered, events are resumed in insertion order
+        events = [
+            {"_id": 5, "collection": "test", "ids": ["old"], "source": "other"},
+            {"_id": 3, "collection": "test", "ids": ["old"], "source": "other"},
+            {"_id": 2, "collection": "test", "ids": ["a"], "source": "other"},
+            {"_id": 4, "collection": "test", "ids": ["b"], "source": bus.source},
+            {"_id": 1, "collection": None, "ids": [], "source": "other"},
+        ]
+        collection.find.return_value = Cursor(bus, events)
+
+        bus._listen()
+
+        callback.assert_called_once_with("test", ["a"])
+        collection.find.assert_called_once_with({}, cursor_type=CursorType.TAILABLE_AWAIT)
+        collection.find_one.assert_called_with({"_id": 3}, {"_id": True})
+
+        # the last read event was overwritten in the capped collection, all events are delivered
+        callback.reset_mock()
+        collection.find_one.side_effect = [{"_id": 3}, None]
+        bus._stopped.clear()
+        bus._listen()
+        self.assertEqual(3, callback.call_count)
+
+    def test_init_invalidation_bus(self):
+        class CachedModel(BasePydanticMongoModel):
+            name: str
+
+            class _MongoConfig:
+                cache_size = 10
+
+        bus = InProcessInvalidationBus()
+        obj_id = ObjectId()
+        cache = CachedModel._get_read_cache()
+        cache.set(obj_id, {"_id": obj_id, "name": "test"})
+
+        with patch.object(bus, "start") as mock_start:
+            PydanticMongo().init_invalidation_bus(bus)
+            mock_start.assert_called_once()
+
+        bus.publish(CachedModel.collection_name, [obj_id])
+        self.assertIsNone(cache.get(obj_id))
+
+        cache.set(obj_id, {"_id": obj_id, "name": "test"})
+        with patch.object(bus, "publish") as mock_publish:
+            CachedModel._invalidate_cached([obj_id])
+            mock_publish.assert_called_once_with(CachedModel.collection_name, [obj_id])
+        self.assertIsNone(cache.get(obj_id))
+
+        with patch.object(bus, "stop") as mock_stop:
+            PydanticMongo().init_invalidation_bus(None)
+            mock_stop.assert_called_once()
+        self.assertIsNone(PydanticMongo().invalidation_bus)
+
+        ReadCache.invalidate_ids("not_cached", ["id"])
+
+
+if __name__ == '__main__':
+    unittest.main()
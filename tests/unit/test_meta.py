@@ -7,7 +7,7 @@ from typing import List, Tuple, Dict, Optional, Union
 from pydantic import BaseModel
 
 from pydantic_mongo.extensions import ValidationError
-from pydantic_mongo.meta import BaseMeta
+from pydantic_mongo.meta import BaseMeta, EmbeddedMeta
 from tests.unit.base import BaseTest
 
 
@@ -90,3 +90,19 @@ class TestMeta(BaseTest):
         class _(metaclass=BaseMeta):
             __some_att: Union[int, NoName]
             collection_name: str = ''
+
+    def test_embedded_class_creation(self):
+        class Embedded(BaseModel, metaclass=EmbeddedMeta):
+            some_att: int
+
+        class _(metaclass=BaseMeta):
+            collection_name: str = "some_collection"
+            embedded: Optional[Embedded]
+            embedded_list: List[Embedded]
+            embedded_dict: Dict[str, Embedded]
+
+        self.assertNotIn("embedded", BaseMeta.collection_type_map)
+
+        with self.assertRaises(ValidationError):
+            class _(BaseModel, metaclass=EmbeddedMeta):
+                some_att: bytes
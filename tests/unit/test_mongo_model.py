@@ -1,17 +1,28 @@
 from __future__ import annotations
 
 import datetime
-from typing import Optional, Dict, Union, Callable
+from typing import Any, Optional, Dict, Union, Callable
 
 from bson import DBRef
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
 
 from pydantic_mongo.base import __Base as Base
 from pydantic_mongo.db_ref_model import DbRefModel
-from pydantic_mongo.mongo_model import MongoModel
+from pydantic_mongo.embedded_model import EmbeddedModel
+from pydantic_mongo.mongo_model import MongoModel, EmbeddedMongoModel
 from tests.unit.base import BaseTest
 
 
+class EmbeddedRefModel(Base):
+    name: str
+
+
+class EmbeddedAddress(EmbeddedModel):
+    city: str
+    since: Optional[datetime.date] = None
+    ref: Optional[EmbeddedRefModel] = None
+
+
 class TestMongoModel(BaseTest):
     def test_mongo_model_init(self):
         mm = MongoModel()
@@ -118,6 +129,10 @@ class TestMongoModel(BaseTest):
             mm._convert_to_db_ref_if_needed({"child": [db_ref_obj.model_dump()]}),
             {"child": [DBRef('test', '123', 'test_db')]}
         )
+        snapshot_ref = DbRefModel(collection="test", id="123", database="", snapshot={"name": "test"})
+        self.assertEqual(
+            mm._convert_to_db_ref_if_needed(snapshot_ref.model_dump()), DBRef('test', '123', '', name="test")
+        )
 
     def test_model_dump_db(self):
         class MM(MongoModel):
@@ -163,3 +178,45 @@ class TestMongoModel(BaseTest):
             "list_data": list[str]
         })
         self.assertTrue(issubclass(MM, MongoModel))
+
+    def test_from_model_with_embedded(self):
+        class TestModel(Base):
+            address: EmbeddedAddress
+            addresses: list[EmbeddedAddress]
+            by_name: Dict[str, EmbeddedAddress]
+
+        MM = MongoModel.from_model(TestModel)
+        EmbeddedMM = EmbeddedMongoModel.from_model(EmbeddedAddress)
+        self.assertIs(EmbeddedMM, EmbeddedMongoModel.from_model(EmbeddedAddress))
+        self.assertTrue(issubclass(EmbeddedMM, EmbeddedMongoModel))
+        self.assertEqual(MM.__annotations__["address"], EmbeddedMM)
+
+        address = {"city": "city", "since": datetime.date(2022, 1, 1),
+                   "ref": {"collection": "embedded_ref_models", "id": "123", "database": ""}}
+        mm = MM(id=None, address=address, addresses=[address], by_name={"name": address})
+        encoded = {"city": "city", "since": "2022-01-01", "ref": DBRef("embedded_ref_models", "123", "")}
+        self.assertEqual(mm.model_dump_db(), {"address": encoded, "addresses": [encoded], "by_name": {"name": encoded}})
+
+    def test_from_model_with_computed_fields(self):
+        class TestModel(Base):
+            name: str
+
+            @computed_field(return_type=str)
+            @property
+            def name_lower(self):
+                return self.name.lower()
+
+            @computed_field
+            @property
+            def created(self) -> datetime.date:
+                return datetime.date(2022, 1, 1)
+
+        MM = MongoModel.from_model(TestModel)
+        self.assertEqual(MM.__annotations__["name_lower"], str)
+        self.assertEqual(MM.model_fields["created"].annotation, Any)
+        self.assertEqual(MM(id=None, name="Name").model_dump_db(), {"name": "Name", "name_lower": None, "created": None})
+        self.assertEqual(
+            MM(id=None, name="Name", name_lower="name", created=datetime.date(2022, 1, 1)).model_dump_db(),
+            {"name": "Name", "name_lower": "name", "created": "2022-01-01"}
+        )
+        self.assertNotIn("created", MongoModel.from_model(TestModel, include=["name", "name_lower"]).model_fields)
@@ -0,0 +1,191 @@
+import datetime
+import unittest
+from typing import Dict, List, Optional
+
+from bson import DBRef, ObjectId
+from pydantic import ValidationError as PydanticValidationError
+
+from pydantic_mongo.base_pm_model import BasePydanticMongoModel
+from pydantic_mongo.embedded_model import EmbeddedModel
+from pydantic_mongo.query import QueryFields, _compile, _get_normalizer, normalize_filter
+from tests.unit.base import BaseTest
+
+
+class QueryOwner(BasePydanticMongoModel):
+    name: str
+
+
+class QueryAddress(EmbeddedModel):
+    city: str
+    owner: Optional[QueryOwner] = None
+
+
+class QueryUser(BasePydanticMongoModel):
+    name: str
+    age: int = 0
+    born: Optional[datetime.date] = None
+    owner: Optional[QueryOwner] = None
+    owners: List[QueryOwner] = []
+    address: Optional[QueryAddress] = None
+    scores: Dict[str, int] = {}
+
+
+class QuerySnapshotUser(BasePydanticMongoModel):
+    owner: Optional[QueryOwner] = None
+
+    class _MongoConfig:
+        ref_snapshots = {"owner": ["name"]}
+
+
+class QueryAliasedUser(BasePydanticMongoModel):
+    born: Optional[datetime.date] = None
+    owner: Optional[QueryOwner] = None
+    address: Optional[QueryAddress] = None
+
+    class _MongoConfig:
+        storage_aliases = {"born": "b", "owner": "o", "address": "a"}
+
+
+class TestQuery(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.q = QueryFields(QueryUser)
+        self.owner = QueryOwner(name="owner")
+        self.owner.id = str(ObjectId())
+        self.ref = DBRef(QueryOwner.collection_name, self.owner.id, "")
+
+    def test_comparisons(self):
+        q = self.q
+        self.assertEqual({"age": 30}, (q.age == 30).compile())
+        self.assertEqual({"age": {"$ne": 30}}, (q.age != 30).compile())
+        self.assertEqual({"age": {"$gt": 30}}, (q.age > 30).compile())
+        self.assertEqual({"age": {"$gte": 30}}, (q.age >= "30").compile())
+        self.assertEqual({"age": {"$lt": 30}}, (q.age < 30).compile())
+        self.assertEqual({"age": {"$lte": 30}}, (q.age <= 30).compile())
+        self.assertEqual({"age": {"$in": [1, 2]}}, q.age.in_([1, 2]).compile())
+        self.assertEqual({"age": {"$nin": [1]}}, q.age.not_in((1,)).compile())
+        self.assertEqual({"age": {"$exists": False}}, q.age.exists(False).compile())
+
+        with self.assertRaises(PydanticValidationError):
+            (q.age > "old").compile()
+
+    def test_encoding(self):
+        q = self.q
+        self.assertEqual({"born": {"$lt": "2005-01-01"}}, (q.born < datetime.date(2005, 1, 1)).compile())
+        self.assertEqual({"born": {"$lt": "2005-01-01"}}, (q.born < "2005-01-01").compile())
+        self.assertEqual({"owner": self.ref}, (q.owner == self.owner).compile())
+        self.assertEqual({"owner": self.ref}, (q.owner == DBRef(QueryOwner.collection_name, self.owner.id)).compile())
+        self.assertEqual({"owner": None}, (q.owner == None).compile())  # noqa: E711
+        self.assertEqual({"owners": {"$in": [self.ref]}}, q.owners.in_([self.owner]).compile())
+        self.assertEqual({"owners": [self.ref]}, (q.owners == [self.owner]).compile())
+        self.assertEqual({"address.city": "Paris"}, (q.address.city == "Paris").compile())
+        self.assertEqual({"address.owner": self.ref}, (q.address.owner == self.owner).compile())
+        self.assertEqual({"scores.math": {"$gt": 3}}, (q.scores.math > 3).compile())
+        self.assertEqual(
+            {"owner.$id": self.owner.id}, (QueryFields(QuerySnapshotUser).owner == self.owner).compile()
+        )
+
+        obj_id = ObjectId()
+        self.assertEqual({"_id": obj_id}, (q.id == str(obj_id)).compile())
+        self.assertEqual({"_id": {"$in": [obj_id, obj_id]}}, q.id.in_([str(obj_id), obj_id]).compile())
+
+        unsaved = QueryOwner(name="unsaved")
+        with self.assertRaises(ValueError):
+            (q.owner == unsaved).compile()
+
+    def test_logical_operators(self):
+        q = self.q
+        self.assertEqual({"age": {"$gt": 30}, "name": "x"}, ((q.age > 30) & (q.name == "x")).compile())
+        self.assertEqual(
+            {"$and": [{"age": {"$gt": 1}}, {"age": {"$lt": 5}}, {"name": "x"}]},
+            ((q.age > 1) & (q.age < 5) & (q.name == "x")).compile()
+        )
+        self.assertEqual(
+            {"$or": [{"age": 1}, {"name": "x"}, {"name": "y"}]},
+            ((q.age == 1) | (q.name == "x") | (q.name == "y")).compile()
+        )
+        self.assertEqual({"$nor": [{"age": 1}]}, (~(q.age == 1)).compile())
+
+        with self.assertRaises(TypeError):
+            _ = (q.age > 1) and (q.age < 5)
+        with self.assertRaises(ValueError):
+            _ = (q.age > 1) & (QueryFields(QueryOwner).name == "x")
+
+    def test_compile_cache(self):
+        q = self.q
+        _compile.cache_clear()
+        self.assertEqual({"age": {"$gt": 1}}, (q.age > 1).compile())
+        self.assertEqual({"age": {"$gt": 2}}, (q.age > 2).compile())
+        self.assertEqual(1, _compile.cache_info().hits)
+        self.assertEqual((q.age > 1).template, (q.age > 2).template)
+        self.assertNotEqual((q.age > 1).template, (q.age >= 1).template)
+
+    def test_unknown_fields(self):
+        q = self.q
+        with self.assertRaises(AttributeError):
+            _ = q.unknown
+        with self.assertRaises(AttributeError):
+            _ = q.owner.name
+        with self.assertRaises(AttributeError):
+            _ = q.address.unknown
+        with self.assertRaises(AttributeError):
+            _ = q.id.value
+
+    def test_normalize_filter(self):
+        obj_id = ObjectId()
+        filter = {"_id": {"$in": [str(obj_id), obj_id]}, "name": "x"}
+        self.assertEqual({"_id": {"$in": [obj_id, obj_id]}, "name": "x"}, normalize_filter(QueryUser, filter))
+        self.assertEqual({"_id": {"$in": [str(obj_id), obj_id]}, "name": "x"}, filter)
+        self.assertEqual({"_id": obj_id}, normalize_filter(QueryUser, {"id": str(obj_id)}))
+        self.assertEqual({"_id": {"$ne": obj_id}}, normalize_filter(QueryUser, {"id": {"$ne": str(obj_id)}}))
+
+        filter = {"$or": [{"_id": str(obj_id)}, {"owner": self.owner}], "age": {"$gt": 1}}
+        self.assertEqual(
+            {"$or": [{"_id": obj_id}, {"owner": self.ref}], "age": {"$gt": 1}}, normalize_filter(QueryUser, filter)
+        )
+        self.assertEqual({"_id": str(obj_id)}, filter["$or"][0])
+
+        db_ref = DBRef(QueryOwner.collection_name, self.owner.id)
+        self.assertEqual({"owner": self.ref}, normalize_filter(QueryUser, {"owner": db_ref}))
+        self.assertEqual({"owners": {"$nin": [self.ref, None]}},
+                         normalize_filter(QueryUser, {"owners": {"$nin": [self.owner, None]}}))
+        self.assertEqual({"address.owner": self.ref}, normalize_filter(QueryUser, {"address.owner": self.owner}))
+        self.assertEqual({"owner.$id": self.owner.id}, normalize_filter(QuerySnapshotUser, {"owner": self.owner}))
+
+        filter = {"_id": obj_id, "name": {"$regex": "^x"}, "owner": None, "unknown.field": 1}
+        self.assertIs(filter, normalize_filter(QueryUser, filter))
+
+    def test_normalize_filter_cache(self):
+        _get_normalizer.cache_clear()
+        normalize_filter(QueryUser, {"_id": str(ObjectId()), "name": "x"})
+        normalize_filter(QueryUser, {"_id": str(ObjectId()), "name": "y"})
+        normalize_filter(QueryUser, {"name": "x", "_id": str(ObjectId())})
+        self.assertEqual(1, _get_normalizer.cache_info().hits)
+        self.assertEqual(2, _get_normalizer.cache_info().misses)
+
+    def test_storage_aliases(self):
+        q = QueryFields(QueryAliasedUser)
+        self.assertEqual({"b": {"$gt": "2000-01-02"}}, (q.born > datetime.date(2000, 1, 2)).compile())
+        self.assertEqual(
+            {"a.city": "Paris", "o": self.ref}, ((q.address.city == "Paris") & (q.owner == self.owner)).compile()
+        )
+        self.assertEqual("a.city", q.address.city.key)
+
+        filter = {"$or": [{"born": "2000-01-02"}, {"owner": self.owner}], "a.city": "Paris"}
+        self.assertEqual(
+            {"$or": [{"b": "2000-01-02"}, {"o": self.ref}], "a.city": "Paris"},
+            normalize_filter(QueryAliasedUser, filter)
+        )
+        self.assertEqual({"born": "2000-01-02"}, filter["$or"][0])
+        self.assertEqual({"a.owner": self.ref}, normalize_filter(QueryAliasedUser, {"address.owner": self.owner}))
+
+    def test_prepare_filter(self):
+        expression = self.q.age > 30
+        self.assertEqual({"age": {"$gt": 30}}, QueryUser._prepare_filter(expression))
+        with self.assertRaises(ValueError):
+            QueryOwner._prepare_filter(expression)
+        self.assertEqual({}, QueryUser._prepare_filter(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
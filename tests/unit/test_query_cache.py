@@ -0,0 +1,103 @@
+import unittest
+
+from bson import ObjectId
+
+from pydantic_mongo.instrumentation import Instrumentation
+from pydantic_mongo.query_cache import QueryCache
+from tests.unit.base import BaseTest
+
+
+class TestQueryCache(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.cache = QueryCache()
+        self.cache.clear()
+        self.max_bytes = self.cache.max_bytes
+        Instrumentation().reset()
+
+    def tearDown(self):
+        self.cache.max_bytes = self.max_bytes
+        self.cache.clear()
+        super().tearDown()
+
+    def test_singleton(self):
+        self.assertIs(QueryCache(), QueryCache())
+
+    def test_get_key(self):
+        obj_id = ObjectId()
+
+        self.assertEqual(
+            QueryCache.get_key("find", {"a": 1, "b": {"$gt": 1, "$lt": 5}, "_id": obj_id}),
+            QueryCache.get_key("find", {"_id": obj_id, "b": {"$lt": 5, "$gt": 1}, "a": 1})
+        )
+        self.assertEqual(
+            QueryCache.get_key("find", {"$or": [{"a": 1, "b": 2}], "c": {"$elemMatch": {"x": 1, "y": 2}}}),
+            QueryCache.get_key("find", {"c": {"$elemMatch": {"y": 2, "x": 1}}, "$or": [{"b": 2, "a": 1}]})
+        )
+        self.assertNotEqual(
+            QueryCache.get_key("find", {"a": {"x": 1, "y": 2}}),
+            QueryCache.get_key("find", {"a": {"y": 2, "x": 1}})
+        )
+        self.assertNotEqual(QueryCache.get_key("find", {"a": 1}), QueryCache.get_key("find_one", {"a": 1}))
+        self.assertNotEqual(
+            QueryCache.get_key("find", {"a": 1}, sort=[("a", 1)]),
+            QueryCache.get_key("find", {"a": 1}, sort=[("a", -1)])
+        )
+        self.assertNotEqual(
+            QueryCache.get_key("find", {"a": 1}, projection={"a": True}),
+            QueryCache.get_key("find", {"a": 1})
+        )
+        with self.assertRaises(TypeError):
+            QueryCache.get_key("find", {"a": object()})
+
+    def test_get_and_set(self):
+        docs = [{"_id": ObjectId(), "tags": ["a"]}]
+        version = self.cache.version("test")
+
+        self.assertIsNone(self.cache.get("test", "key"))
+        self.cache.set("test", "key", QueryCache.encode(docs), version)
+
+        cached = self.cache.get("test", "key")
+        self.assertEqual(docs, cached)
+        cached[0]["tags"].append("b")
+        self.assertEqual(docs, self.cache.get("test", "key"))
+
+        self.assertEqual(2, Instrumentation().get("query_cache_hits", "test"))
+        self.assertEqual(1, Instrumentation().get("query_cache_misses", "test"))
+
+    def test_write_version(self):
+        version = self.cache.version("test")
+        self.cache.set("test", "key", QueryCache.encode([{"a": 1}]), version)
+
+        self.cache.bump("test")
+        self.assertIsNone(self.cache.get("test", "key"))
+        self.assertEqual(0, len(self.cache))
+
+        self.cache.set("test", "key", QueryCache.encode([{"a": 1}]), version)
+        self.assertEqual(0, len(self.cache))
+
+        self.cache.invalidate_ids("test", ["id"])
+        self.assertEqual(version + 2, self.cache.version("test"))
+
+    def test_memory_budget(self):
+        raw_docs = QueryCache.encode([{"a": 1}])
+        size = len(raw_docs[0])
+        self.cache.max_bytes = size * 2
+
+        self.cache.set("test", "a", raw_docs, self.cache.version("test"))
+        self.cache.set("test", "b", raw_docs, self.cache.version("test"))
+        self.cache.get("test", "a")
+        self.cache.set("test", "c", raw_docs, self.cache.version("test"))
+
+        self.assertEqual(2, len(self.cache))
+        self.assertEqual(size * 2, self.cache.size)
+        self.assertIsNone(self.cache.get("test", "b"))
+        self.assertIsNotNone(self.cache.get("test", "a"))
+        self.assertEqual(1, Instrumentation().get("query_cache_evictions", "test"))
+
+        self.cache.set("test", "big", raw_docs * 3, self.cache.version("test"))
+        self.assertIsNone(self.cache.get("test", "big"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+from unittest.mock import patch
+
+from bson import ObjectId
+
+from pydantic_mongo.instrumentation import Instrumentation
+from pydantic_mongo.read_cache import ReadCache
+from tests.unit.base import BaseTest
+
+
+class TestReadCache(BaseTest):
+    def setUp(self):
+        super().setUp()
+        Instrumentation().reset()
+
+    def test_get_and_set(self):
+        cache = ReadCache("test", 10)
+        obj_id = ObjectId()
+        doc = {"_id": obj_id, "tags": ["a"]}
+
+        self.assertIsNone(cache.get(obj_id))
+        cache.set(obj_id, doc)
+        doc["tags"].append("b")
+
+        cached = cache.get(str(obj_id))
+        self.assertEqual({"_id": obj_id, "tags": ["a"]}, cached)
+        cached["tags"].append("c")
+        self.assertEqual(["a"], cache.get(obj_id)["tags"])
+
+        self.assertEqual(2, Instrumentation().get("cache_hits", "test"))
+        self.assertEqual(1, Instrumentation().get("cache_misses", "test"))
+
+    def test_lru_eviction(self):
+        cache = ReadCache("test", 2)
+        cache.set("a", {})
+        cache.set("b", {})
+        cache.get("a")
+        cache.set("c", {})
+
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertEqual(1, Instrumentation().get("cache_evictions", "test"))
+
+    def test_ttl(self):
+        cache = ReadCache("test", 2, ttl=10)
+        with patch("pydantic_mongo.read_cache.time.monotonic", return_value=100):
+            cache.set("a", {})
+        with patch("pydantic_mongo.read_cache.time.monotonic", return_value=105):
+            self.assertIsNotNone(cache.get("a"))
+        with patch("pydantic_mongo.read_cache.time.monotonic", return_value=111):
+            self.assertIsNone(cache.get("a"))
+
+        self.assertEqual(0, len(cache))
+        self.assertEqual(1, Instrumentation().get("cache_evictions", "test"))
+
+    def test_invalidate(self):
+        cache = ReadCache("test", 2)
+        cache.set("a", {})
+        cache.set("b", {})
+
+        cache.invalidate("a")
+        cache.invalidate("a")
+        self.assertIsNone(cache.get("a"))
+
+        cache.clear()
+        self.assertEqual(0, len(cache))
+
+    def test_for_collection(self):
+        cache = ReadCache.for_collection("test_for_collection", 2)
+        self.assertIs(cache, ReadCache.for_collection("test_for_collection", 2))
+        self.assertIsNot(cache, ReadCache.for_collection("other_for_collection", 2))
+
+        cache.set("a", {})
+        ReadCache.clear_all()
+        self.assertEqual(0, len(cache))
+
+    def test_wrong_size(self):
+        with self.assertRaises(ValueError):
+            ReadCache("test", 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from pydantic_mongo.ref_loader import AsyncRefLoader, gather_unloaded
+
+
+class TestAsyncRefLoader(unittest.IsolatedAsyncioTestCase):
+    @staticmethod
+    def model_cls(collection_name, docs):
+        return MagicMock(collection_name=collection_name, _aget_docs_by_ids=AsyncMock(return_value=docs))
+
+    async def test_get(self):
+        self.assertIs(AsyncRefLoader.get(), AsyncRefLoader.get())
+        self.assertIs(asyncio.get_running_loop(), AsyncRefLoader.get().loop)
+
+    async def test_load_batches_by_collection(self):
+        users = self.model_cls("users", {"1": {"_id": "1"}, "2": {"_id": "2"}})
+        docs = self.model_cls("docs", {"3": {"_id": "3"}})
+        loader = AsyncRefLoader.get()
+
+        results = await asyncio.gather(
+            loader.load(users, "1"), loader.load(users, "2"), loader.load(users, "1"),
+            loader.load(docs, "3"), loader.load(docs, "4"),
+        )
+        self.assertEqual([{"_id": "1"}, {"_id": "2"}, {"_id": "1"}, {"_id": "3"}, None], results)
+        users._aget_docs_by_ids.assert_awaited_once_with(["1", "2"])
+        docs._aget_docs_by_ids.assert_awaited_once_with(["3", "4"])
+
+        await loader.load(users, "2")
+        self.assertEqual(2, users._aget_docs_by_ids.await_count)
+
+    async def test_load_error(self):
+        users = self.model_cls("users", {})
+        users._aget_docs_by_ids.side_effect = ValueError("test")
+
+        with self.assertRaises(ValueError):
+            await AsyncRefLoader.get().load(users, "1")
+
+    async def test_gather_unloaded(self):
+        loaded = MagicMock(__is_loaded__=True, _aload=AsyncMock())
+        unloaded = MagicMock(__is_loaded__=False, _aload=AsyncMock())
+
+        await gather_unloaded([loaded, unloaded, unloaded])
+        loaded._aload.assert_not_awaited()
+        unloaded._aload.assert_awaited_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from bson import ObjectId
+
+from pydantic_mongo.instrumentation import Instrumentation
+from pydantic_mongo.replica import CollectionReplica
+from tests.unit.base import BaseTest
+
+
+class TestCollectionReplica(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.us_id, self.de_id = ObjectId(), ObjectId()
+        self.docs = [
+            {"_id": self.us_id, "code": "US", "tags": ["north", "america"], "active": True},
+            {"_id": self.de_id, "code": "DE", "tags": ["europe"], "active": 1},
+        ]
+        self.loader = MagicMock(side_effect=lambda: iter(self.docs))
+        Instrumentation().reset()
+
+    def test_find_one(self):
+        replica = CollectionReplica("countries", self.loader, ["code", "tags"])
+
+        self.assertEqual(self.docs[1], replica.find_one({"code": "DE"}))
+        self.assertEqual(self.docs[0], replica.find_one({"_id": self.us_id}))
+        self.assertEqual(self.docs[0], replica.find_one({"tags": "america"}))
+        self.assertEqual(self.docs[0], replica.find_one({"code": "US", "tags": "north"}))
+        self.assertEqual(self.docs[0], replica.find_one({"active": True}))
+        self.assertIsNone(replica.find_one({"code": "US", "tags": "europe"}))
+        self.assertIsNone(replica.find_one({"_id": ObjectId()}))
+        self.assertEqual(self.docs[1], replica.find_one({"active": 1}))
+
+        self.loader.assert_called_once()
+        self.assertEqual(2, len(replica))
+        self.assertEqual(8, Instrumentation().get("replica_hits", "countries"))
+
+    def test_copy_on_read(self):
+        replica = CollectionReplica("countries", self.loader)
+
+        replica.find_one({"code": "US"})["tags"].append("changed")
+
+        self.assertEqual(["north", "america"], replica.find_one({"code": "US"})["tags"])
+
+    def test_supports(self):
+        replica = CollectionReplica("countries", self.loader)
+
+        self.assertTrue(replica.supports({"_id": self.us_id}))
+        self.assertTrue(replica.supports({"code": "US", "active": None}))
+        self.assertFalse(replica.supports({"code": {"$in": ["US"]}}))
+        self.assertFalse(replica.supports({"$or": [{"code": "US"}]}))
+        self.assertFalse(replica.supports({"address.city": "Berlin"}))
+
+    def test_refresh(self):
+        replica = CollectionReplica("countries", self.loader, refresh_interval=10)
+        self.assertFalse(replica.is_fresh)
+
+        with patch("pydantic_mongo.replica.time.monotonic", return_value=100):
+            replica.find_one({"code": "US"})
+            self.assertTrue(replica.is_fresh)
+        with patch("pydantic_mongo.replica.time.monotonic", return_value=105):
+            replica.find_one({"code": "US"})
+        self.assertEqual(1, self.loader.call_count)
+
+        with patch("pydantic_mongo.replica.time.monotonic", return_value=111):
+            self.assertFalse(replica.is_fresh)
+            replica.find_one({"code": "US"})
+        self.assertEqual(2, self.loader.call_count)
+
+    def test_invalidate(self):
+        replica = CollectionReplica.for_collection("test_replica_countries", self.loader, ["code"])
+        self.assertIs(replica, CollectionReplica.for_collection("test_replica_countries", self.loader))
+
+        self.assertIsNone(replica.find_one({"code": "FR"}))
+        self.docs.append({"_id": ObjectId(), "code": "FR"})
+        self.assertIsNone(replica.find_one({"code": "FR"}))
+
+        CollectionReplica.invalidate_ids("test_replica_countries", ["id"])
+        CollectionReplica.invalidate_ids("not_replicated", ["id"])
+        self.assertEqual("FR", replica.find_one({"code": "FR"})["code"])
+        self.assertEqual(2, self.loader.call_count)
+
+
+    def test_invalidate_while_loading(self):
+        replica = CollectionReplica("countries", self.loader)
+
+        def load():
+            replica.invalidate()
+            return iter(self.docs)
+
+        self.loader.side_effect = load
+        replica.find_one({"code": "US"})
+        # documents loaded before invalidation may miss the write
+        self.assertFalse(replica.is_fresh)
+
+        self.loader.side_effect = lambda: iter(self.docs)
+        replica.find_one({"code": "US"})
+        self.assertTrue(replica.is_fresh)
+        self.assertEqual(2, self.loader.call_count)
+
+    def test_concurrent_refresh(self):
+        started, release = threading.Event(), threading.Event()
+
+        def load():
+            started.set()
+            release.wait(5)
+            return iter(self.docs)
+
+        self.loader.side_effect = load
+        replica = CollectionReplica("countries", self.loader)
+        threads = [threading.Thread(target=replica.find_one, args=({"code": "US"},)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        started.wait(5)
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.loader.assert_called_once()
+
+        replica.refresh()
+        self.assertEqual(2, self.loader.call_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import gc
+import unittest
+
+from pydantic_mongo.session import IdentityMap, session
+from tests.unit.base import BaseTest
+
+
+class Instance:
+    pass
+
+
+class TestSession(BaseTest):
+    def test_session(self):
+        self.assertIsNone(IdentityMap.current())
+
+        with session() as identity_map:
+            self.assertIs(identity_map, IdentityMap.current())
+
+            with session() as nested_identity_map:
+                self.assertIs(nested_identity_map, IdentityMap.current())
+
+            self.assertIs(identity_map, IdentityMap.current())
+
+        self.assertIsNone(IdentityMap.current())
+
+    def test_identity_map(self):
+        identity_map = IdentityMap()
+        instance = Instance()
+
+        identity_map.add("test", "id", instance)
+        self.assertIs(instance, identity_map.get("test", "id"))
+        self.assertIsNone(identity_map.get("other", "id"))
+        self.assertEqual(1, len(identity_map))
+
+        identity_map.remove("test", "id")
+        identity_map.remove("test", "id")
+        self.assertIsNone(identity_map.get("test", "id"))
+
+        identity_map.add("test", "id", instance)
+        identity_map.clear()
+        self.assertEqual(0, len(identity_map))
+
+    def test_weak_references(self):
+        identity_map = IdentityMap()
+        identity_map.add("test", "id", Instance())
+        gc.collect()
+
+        self.assertIsNone(identity_map.get("test", "id"))
+        self.assertEqual(0, len(identity_map))
+
+
+if __name__ == '__main__':
+    unittest.main()
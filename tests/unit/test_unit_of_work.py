@@ -0,0 +1,156 @@
+import unittest
+from typing import Optional
+from unittest.mock import MagicMock, patch
+
+from bson import ObjectId
+from pymongo import DeleteOne, InsertOne, UpdateOne
+
+from pydantic_mongo.base_pm_model import BasePydanticMongoModel
+from pydantic_mongo.session import session
+from pydantic_mongo.unit_of_work import UnitOfWork, unit_of_work
+from tests.unit.base import BaseTest
+
+
+class Owner(BasePydanticMongoModel):
+    name: str
+
+
+class Item(BasePydanticMongoModel):
+    title: str
+    owner: Optional[Owner] = None
+
+
+class TestUnitOfWork(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.owners = MagicMock()
+        self.items = MagicMock()
+        self.patches = [
+            patch.object(Owner, 'collection', return_value=self.owners),
+            patch.object(Item, 'collection', return_value=self.items),
+        ]
+        for collection_patch in self.patches:
+            collection_patch.start()
+
+    def tearDown(self):
+        for collection_patch in self.patches:
+            collection_patch.stop()
+        super().tearDown()
+
+    def test_unit_of_work(self):
+        self.assertIsNone(UnitOfWork.current())
+
+        with unit_of_work() as work:
+            self.assertIs(work, UnitOfWork.current())
+
+        self.assertIsNone(UnitOfWork.current())
+
+    def test_save_is_recorded(self):
+        with unit_of_work() as work:
+            owner = Owner(name="owner")
+            item = Item(title="item", owner=owner)._save()
+
+            self.assertIsNotNone(item.id)
+            self.assertIsNotNone(owner.id)
+            self.assertEqual(2, len(work))
+            self.items.insert_one.assert_not_called()
+            self.items.bulk_write.assert_not_called()
+
+            item.title = "changed"
+            item._save()
+            self.assertEqual(2, len(work))
+
+        self.items.bulk_write.assert_called_once()
+        requests = self.items.bulk_write.call_args.args[0]
+        self.assertEqual(1, len(requests))
+        self.assertIsInstance(requests[0], InsertOne)
+        self.assertEqual("changed", requests[0]._doc["title"])
+        self.assertEqual(ObjectId(item.id), requests[0]._doc["_id"])
+        self.assertEqual(owner.id, requests[0]._doc["owner"].id)
+        self.assertFalse(self.items.bulk_write.call_args.kwargs["ordered"])
+        self.owners.bulk_write.assert_called_once()
+        self.assertEqual(0, len(work))
+
+    def test_update_and_delete(self):
+        owner = Owner(name="owner")
+        owner.id = str(ObjectId())
+        other_owner = Owner(name="other")
+        other_owner.id = str(ObjectId())
+
+        with unit_of_work():
+            owner._save()
+            other_owner._delete()
+
+        requests = self.owners.bulk_write.call_args.args[0]
+        self.assertIsInstance(requests[0], UpdateOne)
+        self.assertEqual({"_id": ObjectId(owner.id)}, requests[0]._filter)
+        self.assertIsInstance(requests[1], DeleteOne)
+        self.assertEqual({"_id": ObjectId(other_owner.id)}, requests[1]._filter)
+        self.owners.update_one.assert_not_called()
+        self.owners.delete_one.assert_not_called()
+
+    def test_cascade_delete(self):
+        owner = Owner(name="owner")
+        owner.id = str(ObjectId())
+        other_owner = Owner(name="other")
+        other_owner.id = str(ObjectId())
+
+        with patch.object(Owner, "_apply_delete_rules") as apply_delete_rules:
+            with unit_of_work():
+                owner._delete(cascade=True)
+                other_owner._delete()
+                apply_delete_rules.assert_not_called()
+
+            apply_delete_rules.assert_called_once_with(
+                [ObjectId(owner.id)], {(Owner.collection_name, owner.id)}
+            )
+
+    def test_delete_of_new_model(self):
+        with unit_of_work() as work:
+            owner = Owner(name="owner")._save()
+            owner._delete()
+            self.assertEqual(0, len(work))
+
+        self.owners.bulk_write.assert_not_called()
+
+    def test_flush(self):
+        with unit_of_work() as work:
+            owner = Owner(name="owner")._save()
+            work.flush()
+            self.owners.bulk_write.assert_called_once()
+
+            owner._save()
+            self.assertEqual(1, len(work))
+
+        self.assertIsInstance(self.owners.bulk_write.call_args.args[0][0], UpdateOne)
+
+    def test_failed_flush(self):
+        self.owners.bulk_write.side_effect = RuntimeError
+
+        work = UnitOfWork()
+        work.register_save(Item(title="item"))
+        work.register_save(Owner(name="owner"))
+
+        with self.assertRaises(RuntimeError):
+            work.flush()
+
+        self.items.bulk_write.assert_called_once()
+        self.assertEqual(1, len(work))
+
+    def test_rollback(self):
+        with session() as identity_map:
+            with self.assertRaises(RuntimeError):
+                with unit_of_work() as work:
+                    owner = Owner(name="owner")._save()
+                    obj_id = owner.id
+                    self.assertIs(owner, identity_map.get(Owner.collection_name, obj_id))
+                    raise RuntimeError
+
+            self.assertIsNone(owner.id)
+            self.assertIsNone(identity_map.get(Owner.collection_name, obj_id))
+            self.assertEqual(0, len(work))
+            self.owners.bulk_write.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
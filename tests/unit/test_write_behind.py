@@ -0,0 +1,101 @@
+import unittest
+from unittest.mock import MagicMock
+
+from pydantic_mongo.write_behind import WriteBehindBuffer
+from tests.unit.base import BaseTest
+
+
+class TestWriteBehindBuffer(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.collection = MagicMock()
+        self.on_error = MagicMock()
+        self.on_written = MagicMock()
+
+    def get_buffer(self, **kwargs) -> WriteBehindBuffer:
+        buffer = WriteBehindBuffer("events", lambda: self.collection, on_error=self.on_error,
+                                   on_written=self.on_written, **kwargs)
+        self.addCleanup(buffer.close)
+        return buffer
+
+    def test_flush(self):
+        buffer = self.get_buffer(batch_size=2, flush_interval=60)
+
+        for index in range(5):
+            buffer.put({"_id": index})
+        buffer.flush()
+
+        self.assertEqual(0, len(buffer))
+        written = [doc["_id"] for call in self.collection.insert_many.call_args_list for doc in call.args[0]]
+        self.assertEqual([0, 1, 2, 3, 4], written)
+        self.assertTrue(all(len(call.args[0]) <= 2 for call in self.collection.insert_many.call_args_list))
+        self.assertFalse(self.collection.insert_many.call_args.kwargs["ordered"])
+        self.assertEqual(5, sum(len(call.args[0]) for call in self.on_written.call_args_list))
+
+    def test_flush_with_taken_batch(self):
+        buffer = self.get_buffer(batch_size=3, flush_interval=60)
+        for index in range(5):
+            buffer._queue.put_nowait({"_id": index})
+        taken = [buffer._queue.get_nowait()]
+
+        # documents taken by the thread before flush was requested are written together with the queue
+        buffer._write_batches(taken)
+
+        self.assertEqual(
+            [[0, 1, 2], [3, 4]],
+            [[doc["_id"] for doc in call.args[0]] for call in self.collection.insert_many.call_args_list]
+        )
+
+    def test_flush_interval(self):
+        buffer = self.get_buffer(flush_interval=0.01)
+
+        buffer.put({"_id": 1})
+        for _ in range(100):
+            if self.collection.insert_many.called:
+                break
+            buffer._thread.join(0.01)
+
+        self.collection.insert_many.assert_called_once_with([{"_id": 1}], ordered=False)
+
+    def test_backpressure(self):
+        buffer = self.get_buffer(max_size=1, put_timeout=0.01)
+        buffer._start = MagicMock()
+
+        self.assertTrue(buffer.try_put({"_id": 1}))
+        self.assertFalse(buffer.try_put({"_id": 2}))
+        with self.assertRaises(TimeoutError):
+            buffer.put({"_id": 2})
+
+        buffer.flush()
+        self.collection.insert_many.assert_called_once_with([{"_id": 1}], ordered=False)
+
+    def test_error_callback(self):
+        error = RuntimeError("failed")
+        self.collection.insert_many.side_effect = error
+        self.on_error.side_effect = ValueError
+        buffer = self.get_buffer()
+
+        buffer.put({"_id": 1})
+        buffer.flush()
+
+        self.on_error.assert_called_once_with(error, [{"_id": 1}])
+        self.on_written.assert_not_called()
+        self.assertEqual(0, len(buffer))
+
+    def test_close(self):
+        buffer = WriteBehindBuffer.for_collection("test_close_events", lambda: self.collection, flush_interval=60)
+        self.assertIs(buffer, WriteBehindBuffer.for_collection("test_close_events", lambda: self.collection))
+
+        buffer.put({"_id": 1})
+        WriteBehindBuffer.close_all()
+
+        self.assertIsNone(buffer._thread)
+        self.collection.insert_many.assert_called_once_with([{"_id": 1}], ordered=False)
+
+    def test_wrong_size(self):
+        with self.assertRaises(ValueError):
+            WriteBehindBuffer("events", lambda: self.collection, batch_size=0)
+
+
+if __name__ == '__main__':
+    unittest.main()